@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (cumulative, Prometheus-style) that is cheap
+    enough to update on every request.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "buckets": dict(zip(self.buckets, self._counts)),
+                "count": self._count,
+                "sum": self._sum
+            }
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MicroBatcher:
+    """
+    Collects concurrently submitted items into batches and hands each
+    batch to `batch_fn` on a single worker thread.
+
+    A batch is dispatched once it reaches `max_batch_size` or once the
+    oldest item has waited `max_wait_ms`. `batch_fn` receives a list of
+    items and must return a list of results in the same order.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.name = name
+
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram(LATENCY_BUCKETS)
+        self.forward_hist = Histogram(LATENCY_BUCKETS)
+        self.latency_hist = Histogram(LATENCY_BUCKETS)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item):
+        """
+        Queues one item and returns a Future resolving to its result.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stats(self):
+        return {
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+            "forward_seconds": self.forward_hist.snapshot(),
+            "latency_seconds": self.latency_hist.snapshot(),
+            "pending": self._queue.qsize()
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=self.name,
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Anything already queued rides along even if the deadline passed.
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [
+                entry for entry in self._collect()
+                if entry[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+
+            for _, _, submitted in batch:
+                self.queue_wait_hist.observe(started - submitted)
+            self.batch_size_hist.observe(len(batch))
+
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+            except Exception as exc:
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            finished = time.perf_counter()
+            self.forward_hist.observe(finished - started)
+
+            for (_, future, submitted), result in zip(batch, results):
+                self.latency_hist.observe(finished - submitted)
+                future.set_result(result)
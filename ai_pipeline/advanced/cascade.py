@@ -0,0 +1,113 @@
+import numpy as np
+
+from advanced.anomaly import AnomalyDetector
+from advanced.config import CASCADE_MARGIN, CASCADE_MIN_WORDS
+from baseline.explain import compute_feature_stats, explain_anomaly
+from baseline.features import extract_features
+from interpretation.explanation import compute_z_score
+from interpretation.risk_policy import HIGH_DISTANCE_Z, HIGH_RISK, LOW_RISK, interpret_risk
+
+RULE_CHECKS = ("subtotal_matches_items", "total_matches_subtotal_tax")
+
+
+def document_text(pdf_path) -> str:
+    """
+    The text the first tier is trained on: PyPDF2's text layer, pages
+    joined, exactly as the backend's DocumentContext.text.
+    """
+    from PyPDF2 import PdfReader
+
+    texts = []
+    for page in PdfReader(pdf_path).pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return "\n".join(texts).strip()
+
+
+def _standardize(features: dict, stats: dict) -> np.ndarray:
+    values = np.array([features[name] for name in stats["features"]], dtype=np.float64)
+    return (values - np.array(stats["centroid"])) / np.array(stats["scale"])
+
+
+def train_first_tier(texts: list) -> tuple:
+    """
+    Fits the text-statistics detector on reference invoice texts and
+    returns it with the feature ranges used for explanations and the
+    distance statistics used for the structural-deviation override.
+    """
+    feature_list = [extract_features(text) for text in texts]
+    detector = AnomalyDetector()
+    detector.train(feature_list)
+
+    names = list(feature_list[0].keys())
+    matrix = np.array([[features[name] for name in names] for features in feature_list], dtype=np.float64)
+    scale = matrix.std(axis=0)
+    # A feature constant across the references must not divide by zero
+    scale[scale == 0] = 1.0
+    stats = {
+        "features": names,
+        "feature_stats": compute_feature_stats(feature_list),
+        "centroid": matrix.mean(axis=0).tolist(),
+        "scale": scale.tolist()
+    }
+    distances = np.array([np.linalg.norm(_standardize(features, stats)) for features in feature_list])
+    stats["mean_distance"] = float(distances.mean())
+    stats["std_distance"] = float(distances.std())
+    return detector, stats
+
+
+def rules_failed(rules: dict | None) -> bool:
+    """
+    True unless the rules stage completed and every arithmetic check
+    passed. A missing result, a non-ok status or a check that could not
+    be evaluated (None) all count as failed.
+    """
+    if not rules or rules.get("status") != "ok":
+        return True
+    checks = rules.get("checks") or {}
+    return not all(checks.get(check) is True for check in RULE_CHECKS)
+
+
+def escalation_reason(
+    score: float,
+    word_count: int,
+    rules: dict | None = None,
+    margin: float = CASCADE_MARGIN,
+    min_words: int = CASCADE_MIN_WORDS
+) -> str | None:
+    """
+    Why this invoice needs LayoutLMv3, or None when the first tier's
+    score can stand.
+    """
+    if word_count < min_words:
+        return "sparse_text_layer"
+    if rules_failed(rules):
+        return "rules_failed"
+    if any(abs(score - threshold) <= margin for threshold in (LOW_RISK, HIGH_RISK)):
+        return "uncertain_score"
+    return None
+
+
+def score_first_tier(detector, stats: dict, text: str) -> dict:
+    features = extract_features(text)
+    raw_score = detector.score(features)
+    distance = float(np.linalg.norm(_standardize(features, stats)))
+    return {
+        # Same squashing as the LayoutLMv3 score, so one risk policy applies
+        "score": float(1 / (1 + np.exp(-raw_score))),
+        "word_count": features["num_words"],
+        "distance_z": compute_z_score(distance, stats["mean_distance"], stats["std_distance"]),
+        "deviations": explain_anomaly(features, stats["feature_stats"])
+    }
+
+
+def first_tier_risk(first_tier: dict) -> tuple:
+    """
+    Risk level and review decision of a first-tier score, with the same
+    structural-deviation override as the full model.
+    """
+    if first_tier["distance_z"] >= HIGH_DISTANCE_Z:
+        return "HIGH", True
+    return interpret_risk(first_tier["score"])
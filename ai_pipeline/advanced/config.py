@@ -0,0 +1,65 @@
+import os
+
+MODEL_NAME = "microsoft/layoutlmv3-base"
+
+# Micro-batching knobs: concurrent callers are grouped into one forward
+# pass of up to MAX_BATCH_SIZE documents, waiting at most MAX_BATCH_WAIT_MS
+# for the batch to fill.
+MAX_BATCH_SIZE = int(os.getenv("LAYOUTLM_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("LAYOUTLM_MAX_BATCH_WAIT_MS", "10"))
+
+# Where LayoutLMv3 gets its words and boxes from:
+#   "ocr"  - always rasterize and OCR (default)
+#   "auto" - PDF text layer when present, Tesseract OCR otherwise
+# Either way the detector must be trained with the same setting; the
+# setting is part of embedding_model_id().
+TEXT_SOURCE = os.getenv("LAYOUTLM_TEXT_SOURCE", "ocr").lower()
+
+# Pages with fewer text-layer words than this are treated as scanned.
+MIN_TEXT_LAYER_WORDS = int(os.getenv("LAYOUTLM_MIN_TEXT_LAYER_WORDS", "5"))
+
+# Unix socket of the LayoutLMv3 inference sidecar (advanced.inference_server).
+# When set, API workers only tokenize and the sidecar, the one process
+# holding the weights, runs every forward pass. Unset: in-process model.
+SIDECAR_SOCKET = os.getenv("LAYOUTLM_SIDECAR_SOCKET") or None
+SIDECAR_TIMEOUT = float(os.getenv("LAYOUTLM_SIDECAR_TIMEOUT_SECONDS", "60"))
+
+# Two-tier scoring: the text-statistics model scores every invoice and
+# only these escalate to LayoutLMv3:
+#   - a first-tier score within CASCADE_MARGIN of LOW_RISK or HIGH_RISK,
+#     where the risk level (and at LOW_RISK the review decision) flips
+#   - fewer than CASCADE_MIN_WORDS text-layer words (scans: the
+#     statistics describe nothing)
+#   - a failed arithmetic rule check
+# Calibrate the margin with backend/calibrate_cascade.py.
+CASCADE_ENABLED = os.getenv("AI_CASCADE", "0") == "1"
+CASCADE_MARGIN = float(os.getenv("AI_CASCADE_MARGIN", "0.05"))
+CASCADE_MIN_WORDS = int(os.getenv("AI_CASCADE_MIN_WORDS", "20"))
+
+# Inference precision on CPU:
+#   "fp32" - full precision (reference)
+#   "int8" - dynamically quantized nn.Linear layers
+#   "bf16" - bfloat16 weights/activations, only on CPUs with native bf16
+# Validate a mode with `python -m advanced.precision_check --precision int8`.
+PRECISIONS = ("fp32", "int8", "bf16")
+PRECISION = os.getenv("LAYOUTLM_PRECISION", "fp32").lower()
+if PRECISION not in PRECISIONS:
+    raise ValueError(f"LAYOUTLM_PRECISION must be one of {PRECISIONS}, got {PRECISION!r}")
+
+EMBEDDING_DIM = 768
+
+# Bump when page rendering or OCR for the model changes (resolution,
+# colour, OCR engine): the pixels or words, and so the embeddings, differ.
+RASTER_VERSION = "r3"
+
+# Resolution of the page renders Tesseract reads; part of the embedding
+# model id because the words and boxes it finds depend on it.
+OCR_DPI = int(os.getenv("RASTER_OCR_DPI", "300"))
+
+
+def embedding_model_id():
+    """
+    Identifies everything that changes the embedding for a given file.
+    Cached embeddings are only reused under the same id.
+    """
+    return f"{MODEL_NAME}:cls:page1:{TEXT_SOURCE}:{PRECISION}:{RASTER_VERSION}-{OCR_DPI}dpi"
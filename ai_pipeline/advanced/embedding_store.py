@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process writers only
+    fcntl = None
+
+from advanced.config import EMBEDDING_DIM, embedding_model_id
+
+DEFAULT_STORE_DIR = Path(__file__).resolve().parents[1] / "embedding_cache"
+STORE_DIR = Path(os.getenv("EMBEDDING_STORE_DIR", str(DEFAULT_STORE_DIR)))
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.log"
+LOCK_FILE = ".lock"
+
+
+def compute_file_hash(file_path):
+    """
+    SHA-256 of the file bytes, matching Invoice.file_hash in the backend.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class EmbeddingStore:
+    """
+    Persistent, content-addressed embedding cache.
+
+    Each embedding model id gets its own directory holding an append-only
+    float32 matrix (read through np.memmap) and an append-only key log
+    mapping file hashes to row numbers. Vectors are written and fsync'ed
+    before their key, so a key never points at missing data, and appends
+    from several processes are serialized with a lock file.
+    """
+
+    def __init__(self, root=STORE_DIR, model_id=None, dim=EMBEDDING_DIM):
+        self.model_id = model_id or embedding_model_id()
+        self.dim = dim
+        self.dir = Path(root) / _dir_name(self.model_id)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        self.vectors_path = self.dir / VECTORS_FILE
+        self.keys_path = self.dir / KEYS_FILE
+        self.lock_path = self.dir / LOCK_FILE
+
+        self._index = {}
+        self._keys_offset = 0
+        self._keys_inode = None
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, file_hash):
+        return self.get(file_hash) is not None
+
+    def __len__(self):
+        with self._lock:
+            self._refresh_index()
+            return len(self._index)
+
+    def get(self, file_hash):
+        with self._lock:
+            row = self._index.get(file_hash)
+            if row is None or not self._mapped(row):
+                # Unknown key, or a row this process has not mapped yet:
+                # re-read the key log, which also notices a pruned store
+                self._refresh_index()
+                row = self._index.get(file_hash)
+                if row is None:
+                    return None
+            try:
+                return np.array(self._row(row))
+            except FileNotFoundError:
+                # Pruned between the key log read and the vector read
+                self._reset(None)
+                return None
+
+    def put(self, file_hash, embedding):
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(
+                f"Expected a {self.dim}-d embedding, got {vector.shape[0]}"
+            )
+
+        with self._lock:
+            # Recreate the directory if prune_embedding_stores removed it
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with _FileLock(self.lock_path):
+                self._append(file_hash, vector)
+
+    def _append(self, file_hash, vector):
+        self._refresh_index()
+        if file_hash in self._index:
+            return
+
+        row_bytes = self.dim * 4
+        with open(self.vectors_path, "ab") as f:
+            size = f.tell()
+            if size % row_bytes:
+                # Drop a torn write left behind by a crashed writer.
+                size -= size % row_bytes
+                f.truncate(size)
+            row = size // row_bytes
+            f.write(vector.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.keys_path, "a") as f:
+            f.write(f"{file_hash} {row}\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._index[file_hash] = row
+
+    def get_or_compute(self, file_hash, compute_fn):
+        """
+        Returns the cached embedding for `file_hash`, computing and storing
+        it with `compute_fn()` on a miss.
+        """
+        cached = self.get(file_hash)
+        if cached is not None:
+            return cached
+
+        embedding = compute_fn()
+        self.put(file_hash, embedding)
+        return embedding
+
+    def _refresh_index(self):
+        # Pick up keys appended by other processes since the last read.
+        try:
+            with open(self.keys_path, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._keys_inode:
+                    # New or recreated store: forget rows of the old files
+                    self._reset(inode)
+                f.seek(self._keys_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            if self._keys_inode is not None:
+                self._reset(None)
+            return
+
+        complete, _, _ = chunk.rpartition(b"\n")
+        if not complete:
+            return
+
+        for line in complete.decode("ascii").splitlines():
+            file_hash, _, row = line.partition(" ")
+            if row:
+                self._index[file_hash] = int(row)
+        self._keys_offset += len(complete) + 1
+
+    def _reset(self, inode):
+        self._index = {}
+        self._keys_offset = 0
+        self._keys_inode = inode
+        self._matrix = None
+
+    def _mapped(self, row):
+        return self._matrix is not None and row < self._matrix.shape[0]
+
+    def _row(self, row):
+        if not self._mapped(row):
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._matrix = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dim)
+            )
+        return self._matrix[row]
+
+
+def _dir_name(model_id):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_id)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(model_id=None):
+    """
+    Returns the process-wide store for `model_id` (current model by default).
+    """
+    model_id = model_id or embedding_model_id()
+    with _stores_lock:
+        store = _stores.get(model_id)
+        if store is None:
+            store = EmbeddingStore(model_id=model_id)
+            _stores[model_id] = store
+        return store
+
+
+def prune_embedding_stores(root=STORE_DIR, keep=None):
+    """
+    Deletes the stores of every embedding model id but `keep` (the current
+    one by default): once the detector is retrained under a new id, their
+    vectors can never be scored again. Returns the removed directory names.
+    """
+    keep = _dir_name(keep or embedding_model_id())
+    root = Path(root)
+    if not root.is_dir():
+        return []
+
+    removed = []
+    for path in sorted(root.iterdir()):
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+    return removed
@@ -0,0 +1,228 @@
+"""
+LayoutLMv3 inference sidecar: one process per node holds the weights and
+the micro-batcher; API workers tokenize locally and send encodings here
+over a Unix socket, so node memory stays flat as workers are added.
+
+    cd ai_pipeline
+    python -m advanced.inference_server --socket /run/veripay/layoutlm.sock
+
+Then start the API workers with LAYOUTLM_SIDECAR_SOCKET pointing at the
+same path. Frames are length-prefixed .npz archives loaded with
+allow_pickle=False, so a peer can never make either side unpickle data;
+the socket itself is created 0600.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+from advanced.config import SIDECAR_SOCKET, SIDECAR_TIMEOUT, embedding_model_id
+
+ENCODING_KEYS = ("input_ids", "attention_mask", "bbox", "pixel_values")
+# Refuse absurd frames instead of allocating them (a page encoding is ~1 MB)
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+logger = logging.getLogger(__name__)
+
+
+def _recv_exact(sock, size):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(min(size - len(chunks), 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("sidecar connection closed")
+        chunks += chunk
+    return bytes(chunks)
+
+
+def send_frame(sock, arrays: dict) -> None:
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    payload = buffer.getvalue()
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock) -> dict:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+    with np.load(io.BytesIO(_recv_exact(sock, size)), allow_pickle=False) as archive:
+        return {key: archive[key] for key in archive.files}
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def _handle(frame: dict) -> dict:
+    from advanced import layoutlm_features
+
+    op = str(frame.get("op", "embed"))
+    if op == "ping":
+        # Lets clients check they produce the embeddings their detector expects
+        return {"ok": np.array(True), "model_id": np.array(embedding_model_id())}
+    if op == "stats":
+        return {"stats": np.array(json.dumps(layoutlm_features.engine.stats()))}
+
+    import torch
+
+    encoding = {key: torch.from_numpy(frame[key]) for key in ENCODING_KEYS}
+    # Requests from every worker meet in the same batcher
+    embedding = layoutlm_features.engine.submit(encoding).result()
+    return {"embedding": np.asarray(embedding, dtype=np.float32)}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One persistent connection per client thread; serve until it closes
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            except ValueError as exc:
+                logger.warning("Dropping sidecar client: %s", exc)
+                return
+
+            try:
+                response = _handle(frame)
+            except Exception as exc:
+                logger.exception("Sidecar request failed")
+                response = {"error": np.array(str(exc))}
+
+            try:
+                send_frame(self.request, response)
+            except OSError:
+                return
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            # Stale socket from a previous run
+            os.unlink(self.server_address)
+        # Created owner-only from the start, not chmod'ed after the fact
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+
+def serve(path: str) -> None:
+    from advanced.layoutlm_features import warm_up_local
+
+    warm_up_local()
+    with InferenceServer(path, _Handler) as server:
+        logger.info("LayoutLMv3 sidecar listening on %s", path)
+        try:
+            server.serve_forever()
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class SidecarClient:
+    """
+    Thread-safe client; each calling thread keeps its own connection so
+    concurrent requests reach the sidecar's batcher together.
+    """
+
+    def __init__(self, path: str, timeout: float = SIDECAR_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def request(self, arrays: dict) -> dict:
+        # One retry covers a sidecar restart between requests. A timeout is
+        # not retried: the sidecar is busy, and resending doubles its load.
+        for attempt in (1, 2):
+            try:
+                sock = self._connection()
+                send_frame(sock, arrays)
+                response = recv_frame(sock)
+                break
+            except TimeoutError:
+                self._drop_connection()
+                raise
+            except (ConnectionError, OSError):
+                self._drop_connection()
+                if attempt == 2:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"LayoutLMv3 sidecar: {response['error']}")
+        return response
+
+    def embed(self, encoding) -> np.ndarray:
+        arrays = {key: encoding[key].numpy() for key in ENCODING_KEYS}
+        return self.request(arrays)["embedding"]
+
+    def ping(self) -> str:
+        """
+        Embedding model id the sidecar serves.
+        """
+        return str(self.request({"op": np.array("ping")})["model_id"])
+
+    def stats(self) -> dict:
+        return json.loads(str(self.request({"op": np.array("stats")})["stats"]))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> SidecarClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SidecarClient(SIDECAR_SOCKET)
+    return _client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve LayoutLMv3 embeddings over a Unix socket.")
+    parser.add_argument("--socket", default=SIDECAR_SOCKET, required=not SIDECAR_SOCKET)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,270 @@
+import threading
+import time
+
 import torch
 from transformers import LayoutLMv3Processor, LayoutLMv3Model
-from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import warnings
+
+from advanced.batching import LATENCY_BUCKETS, Histogram, MicroBatcher
+from advanced.config import (
+    MODEL_NAME,
+    MAX_BATCH_SIZE,
+    MAX_BATCH_WAIT_MS,
+    TEXT_SOURCE,
+    MIN_TEXT_LAYER_WORDS,
+    PRECISION,
+    SIDECAR_SOCKET,
+    embedding_model_id
+)
+from advanced.inference_server import get_client
+from advanced.ocr_pool import ocr_image
+from advanced.rasterize import render_page
+from advanced.text_layer import extract_text_layer
+
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
-# Load once (pretrained, frozen)
-processor = LayoutLMv3Processor.from_pretrained(
-    "microsoft/layoutlmv3-base",
-    apply_ocr=True
-)
+# Weights are loaded on first use (or by warm_up), not at import time
+_processor = None
+_model = None
+_load_lock = threading.Lock()
 
-model = LayoutLMv3Model.from_pretrained(
-    "microsoft/layoutlmv3-base"
-)
-model.eval()  # inference mode
+
+def bf16_supported():
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
 
 
-def extract_layoutlm_embedding(pdf_path):
+def load_model(precision=PRECISION):
     """
-    Returns a single document-level embedding vector
-    using LayoutLMv3.
+    Loads LayoutLMv3 for CPU inference at the requested precision.
+    """
+    base = LayoutLMv3Model.from_pretrained(
+        MODEL_NAME
+    )
+    base.eval()  # inference mode
+
+    if precision == "int8":
+        return torch.ao.quantization.quantize_dynamic(
+            base,
+            {torch.nn.Linear},
+            dtype=torch.qint8
+        )
+
+    if precision == "bf16":
+        if not bf16_supported():
+            raise RuntimeError("LAYOUTLM_PRECISION=bf16 requires a CPU with native bf16 support")
+        return base.to(torch.bfloat16)
+
+    return base
+
+
+def get_processor():
+    """
+    Returns the shared processor, loading it once. Words and boxes always
+    come from the text layer or the OCR pool, never from the processor.
     """
+    global _processor
+    if _processor is None:
+        with _load_lock:
+            if _processor is None:
+                _processor = LayoutLMv3Processor.from_pretrained(
+                    MODEL_NAME,
+                    apply_ocr=False
+                )
+    return _processor
+
 
-    # Convert first page of PDF to image
-    images = convert_from_path(pdf_path, first_page=1, last_page=1)
-    image = images[0].convert("RGB")
+def get_model():
+    """
+    Returns the shared (pretrained, frozen) model at the configured precision.
+    """
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                _model = load_model(PRECISION)
+    return _model
 
-    # Prepare inputs
-    encoding = processor(
+
+def _encode(image, words, boxes):
+    """
+    Tokenizes one page image with its words and boxes (possibly none, for
+    a blank page) into a batch dimension of 1.
+    """
+    return get_processor()(
         image,
+        words,
+        boxes=boxes,
         return_tensors="pt",
         truncation=True
     )
 
+
+def _read_text_layer(pdf_path):
+    if TEXT_SOURCE == "ocr":
+        return None, None
+
+    words, boxes = extract_text_layer(pdf_path, page=1)
+    if len(words) < MIN_TEXT_LAYER_WORDS:
+        # Scanned / image-only page: let Tesseract handle it
+        return None, None
+
+    return words, boxes
+
+
+def _collate(encodings):
+    """
+    Right-pads single-document encodings into one batch.
+    """
+    pad_id = get_processor().tokenizer.pad_token_id
+    max_len = max(enc["input_ids"].shape[1] for enc in encodings)
+    size = len(encodings)
+
+    input_ids = torch.full((size, max_len), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((size, max_len), dtype=torch.long)
+    bbox = torch.zeros((size, max_len, 4), dtype=torch.long)
+
+    for i, enc in enumerate(encodings):
+        length = enc["input_ids"].shape[1]
+        input_ids[i, :length] = enc["input_ids"][0]
+        attention_mask[i, :length] = enc["attention_mask"][0]
+        bbox[i, :length] = enc["bbox"][0]
+
+    pixel_values = torch.cat([enc["pixel_values"] for enc in encodings], dim=0)
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "bbox": bbox,
+        "pixel_values": pixel_values
+    }
+
+
+def run_model(target_model, encodings, precision=PRECISION):
+    """
+    One forward pass over a list of single-document encodings; returns
+    one CLS embedding (float32 ndarray) per document.
+    """
+    batch = _collate(encodings)
+    if precision == "bf16":
+        batch["pixel_values"] = batch["pixel_values"].to(torch.bfloat16)
+
     with torch.no_grad():
-        outputs = model(**encoding)
+        outputs = target_model(**batch)
 
     # Use CLS token as document representation
-    cls_embedding = outputs.last_hidden_state[:, 0, :]
+    cls_embeddings = outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
 
-    return cls_embedding.squeeze().cpu().numpy()
+    return list(cls_embeddings)
+
+
+def _forward_batch(encodings):
+    return run_model(get_model(), encodings)
+
+
+engine = MicroBatcher(
+    _forward_batch,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+    name="layoutlm-batcher"
+)
+
+
+# Pre-batcher work per invoice: text-layer read, OCR (scanned pages
+# only), rendering and tokenization
+encode_stage_seconds = {
+    stage: Histogram(LATENCY_BUCKETS)
+    for stage in ("render", "text_layer", "tokenize", "ocr")
+}
+
+
+def encode_stats():
+    return {stage: hist.snapshot() for stage, hist in encode_stage_seconds.items()}
+
+
+def encode_invoice(pdf_path, file_hash=None):
+    """
+    Renders and tokenizes the first page of a PDF for LayoutLMv3.
+    """
+
+    # Prepare inputs (born-digital PDFs skip OCR entirely)
+    started = time.perf_counter()
+    words, boxes = _read_text_layer(pdf_path)
+    read = time.perf_counter()
+    encode_stage_seconds["text_layer"].observe(read - started)
+
+    if words is None:
+        # Scanned page: OCR a 300 DPI grayscale render on the shared pool
+        result = ocr_image(render_page(pdf_path, 1, "ocr", file_hash=file_hash))
+        words, boxes = list(result.words), result.normalized_boxes()
+        ocr_done = time.perf_counter()
+        encode_stage_seconds["ocr"].observe(ocr_done - read)
+        read = ocr_done
+
+    # The model only ever sees 224x224 pixels
+    image = render_page(pdf_path, 1, "pixels", file_hash=file_hash)
+    rendered = time.perf_counter()
+    encode_stage_seconds["render"].observe(rendered - read)
+
+    encoding = _encode(image, words, boxes)
+    encode_stage_seconds["tokenize"].observe(time.perf_counter() - rendered)
+    return encoding
+
+
+def extract_layoutlm_embedding(pdf_path, file_hash=None):
+    """
+    Returns a single document-level embedding vector
+    using LayoutLMv3.
+    """
+    encoding = encode_invoice(pdf_path, file_hash=file_hash)
+
+    if SIDECAR_SOCKET:
+        # The node's sidecar holds the only copy of the weights
+        return get_client().embed(encoding)
+
+    # Concurrent callers share one forward pass
+    return engine.submit(encoding).result()
+
+
+def batcher_stats():
+    return get_client().stats() if SIDECAR_SOCKET else engine.stats()
+
+
+def warm_up():
+    """
+    Loads what this process needs before the first request: the processor
+    only when a sidecar runs the model (checking it answers and serves
+    this worker's embedding model id), otherwise
+    the full local warm-up.
+    """
+    if SIDECAR_SOCKET:
+        get_processor()
+        served = get_client().ping()
+        if served != embedding_model_id():
+            raise RuntimeError(
+                f"LayoutLMv3 sidecar serves {served} embeddings, this worker expects {embedding_model_id()}"
+            )
+        return
+    warm_up_local()
+
+
+def warm_up_local():
+    """
+    Loads the processor and weights and pushes one dummy page through the
+    batching engine, so the first real request does not pay cold-start cost.
+    """
+    get_processor()
+    get_model()
+
+    image = Image.new("RGB", (224, 224), "white")
+    encoding = _encode(
+        image,
+        ["warm", "up"],
+        [[100, 100, 300, 150], [320, 100, 500, 150]]
+    )
+    return engine.submit(encoding).result()
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image
+
+try:
+    # Binds libtesseract directly: one engine per worker, loaded once
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+import pytesseract
+
+# Concurrent OCR jobs across the process. Pages beyond this queue up
+# instead of spawning more engines than there are cores.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Results cached by page image hash (entries, LRU)
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "1024"))
+# Explicit tesseract binary for the pytesseract fallback; PATH otherwise
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or shutil.which("tesseract")
+
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+
+@dataclass(frozen=True)
+class OcrResult:
+    """
+    Words with pixel boxes (x0, y0, x1, y1) on a width x height page,
+    plus the page text in reading order.
+    """
+    words: tuple
+    boxes: tuple
+    width: int
+    height: int
+    text: str
+
+    def normalized_boxes(self) -> list:
+        # LayoutLM's 0-1000 box space
+        def scale(value, extent):
+            return max(0, min(1000, int(round(1000 * value / extent))))
+
+        return [
+            [scale(x0, self.width), scale(y0, self.height), scale(x1, self.width), scale(y1, self.height)]
+            for x0, y0, x1, y1 in self.boxes
+        ]
+
+
+_local = threading.local()
+
+
+def _tesserocr_api():
+    api = getattr(_local, "api", None)
+    if api is None:
+        api = _local.api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+    return api
+
+
+def _ocr_tesserocr(image: Image.Image) -> OcrResult:
+    api = _tesserocr_api()
+    api.SetImage(image)
+    api.Recognize()
+
+    words, boxes = [], []
+    level = tesserocr.RIL.WORD
+    iterator = api.GetIterator()
+    for word in tesserocr.iterate_level(iterator, level):
+        text = word.GetUTF8Text(level)
+        if text and text.strip():
+            words.append(text.strip())
+            boxes.append(word.BoundingBox(level))
+
+    text = api.GetUTF8Text()
+    api.Clear()
+    return OcrResult(tuple(words), tuple(boxes), image.width, image.height, text.strip())
+
+
+def _ocr_pytesseract(image: Image.Image) -> OcrResult:
+    data = pytesseract.image_to_data(image, lang=OCR_LANG, output_type=pytesseract.Output.DICT)
+
+    words, boxes, lines = [], [], OrderedDict()
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text:
+            continue
+        left, top = data["left"][i], data["top"][i]
+        words.append(text)
+        boxes.append((left, top, left + data["width"][i], top + data["height"][i]))
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line, []).append(text)
+
+    text = "\n".join(" ".join(line_words) for line_words in lines.values())
+    return OcrResult(tuple(words), tuple(boxes), image.width, image.height, text)
+
+
+def _recognize(image: Image.Image) -> OcrResult:
+    if tesserocr is not None:
+        return _ocr_tesserocr(image)
+    return _ocr_pytesseract(image)
+
+
+class OcrPool:
+    """
+    Fixed pool of OCR workers. With tesserocr each worker thread keeps
+    its own initialized engine (no process spawn or traineddata load per
+    page, and the GIL is released while it runs); otherwise workers run
+    the tesseract CLI through pytesseract, still capped at `workers`
+    concurrent jobs.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, cache_size=OCR_CACHE_SIZE):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _key(image: Image.Image) -> str:
+        digest = hashlib.sha256(image.tobytes())
+        digest.update(f"{image.mode}:{image.size}:{OCR_LANG}".encode())
+        return digest.hexdigest()
+
+    def _cached(self, key):
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _store(self, key, result) -> None:
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _run(self, image: Image.Image, key: str) -> OcrResult:
+        result = _recognize(image)
+        self._store(key, result)
+        return result
+
+    def submit(self, image: Image.Image):
+        """
+        Future resolving to the page's OcrResult; cache hits resolve
+        immediately without occupying a worker.
+        """
+        key = self._key(image)
+        result = self._cached(key)
+        if result is not None:
+            return _completed(result)
+        return self._executor.submit(self._run, image, key)
+
+    def ocr_image(self, image: Image.Image) -> OcrResult:
+        return self.submit(image).result()
+
+    def ocr_pages(self, images: list) -> list:
+        # Pages of one document are recognized in parallel
+        futures = [self.submit(image) for image in images]
+        return [future.result() for future in futures]
+
+    def warm_up(self) -> None:
+        """
+        Initializes every worker's engine up front so the first pages do
+        not pay for it.
+        """
+        if tesserocr is None:
+            return
+        barrier = threading.Barrier(self.workers)
+
+        def init():
+            _tesserocr_api()
+            # Hold this worker until all have started, so each one inits
+            barrier.wait(timeout=30)
+
+        for future in [self._executor.submit(init) for _ in range(self.workers)]:
+            future.result()
+
+
+def _completed(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OcrPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OcrPool()
+    return _pool
+
+
+def ocr_image(image: Image.Image) -> OcrResult:
+    return get_ocr_pool().ocr_image(image)
+
+
+def ocr_pages(images: list) -> list:
+    return get_ocr_pool().ocr_pages(images)
@@ -1,9 +1,20 @@
-from advanced.layoutlm_features import extract_layoutlm_embedding
+from advanced.embedding_store import compute_file_hash, get_embedding_store
 
 
-def process_invoice_layoutlm(pdf_path):
+def process_invoice_layoutlm(pdf_path, file_hash=None):
     """
     Processes an invoice using LayoutLMv3 embeddings
     instead of handcrafted features.
+
+    Embeddings are cached by file hash, so an invoice is only rendered,
+    OCR'd and embedded once per embedding model.
     """
-    return extract_layoutlm_embedding(pdf_path)
+    if file_hash is None:
+        file_hash = compute_file_hash(pdf_path)
+
+    def compute():
+        # Imported lazily: cache hits never need torch or the model weights.
+        from advanced.layoutlm_features import extract_layoutlm_embedding
+        return extract_layoutlm_embedding(pdf_path, file_hash=file_hash)
+
+    return get_embedding_store().get_or_compute(file_hash, compute)
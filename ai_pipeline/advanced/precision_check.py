@@ -0,0 +1,120 @@
+import argparse
+import glob
+import json
+import pickle
+import sys
+
+import numpy as np
+
+from advanced import layoutlm_features as lf
+from advanced.config import PRECISION, PRECISIONS
+from interpretation.explanation import compute_z_score
+from interpretation.risk_policy import interpret_risk
+
+MODEL_PATH = "saved_models/anomaly_model.pkl"
+STATS_PATH = "saved_models/embedding_stats.json"
+
+MIN_COSINE = 0.99
+
+
+def _risk_level(detector, stats, embedding):
+    # Same decision path as deployment.analyze_invoice
+    raw_score = detector.score(dict(enumerate(embedding)))
+    normalized_score = 1 / (1 + np.exp(-raw_score))
+
+    distance = np.linalg.norm(embedding - np.array(stats["centroid"]))
+    distance_z = compute_z_score(
+        distance,
+        stats["mean_distance"],
+        stats["std_distance"]
+    )
+
+    risk, _ = interpret_risk(normalized_score)
+    if distance_z >= 2.5:
+        risk = "HIGH"
+
+    return risk, float(normalized_score)
+
+
+def _model_for(precision):
+    if precision == PRECISION:
+        return lf.get_model()
+    return lf.load_model(precision)
+
+
+def compare(precision, invoice_paths, min_cosine=MIN_COSINE):
+    """
+    Embeds each invoice with fp32 and with `precision` and compares the
+    embeddings and the resulting risk levels.
+    """
+    with open(MODEL_PATH, "rb") as f:
+        detector = pickle.load(f)
+    with open(STATS_PATH, "r") as f:
+        stats = json.load(f)
+
+    reference_model = _model_for("fp32")
+    candidate_model = _model_for(precision)
+
+    rows = []
+    for path in invoice_paths:
+        encoding = lf.encode_invoice(path)
+        reference = lf.run_model(reference_model, [encoding], precision="fp32")[0]
+        candidate = lf.run_model(candidate_model, [encoding], precision=precision)[0]
+
+        cosine = float(
+            np.dot(reference, candidate)
+            / (np.linalg.norm(reference) * np.linalg.norm(candidate))
+        )
+        reference_risk, reference_score = _risk_level(detector, stats, reference)
+        candidate_risk, candidate_score = _risk_level(detector, stats, candidate)
+
+        rows.append({
+            "invoice": path,
+            "cosine": round(cosine, 5),
+            "max_abs_diff": round(float(np.max(np.abs(reference - candidate))), 5),
+            "score_delta": round(candidate_score - reference_score, 4),
+            "fp32_risk": reference_risk,
+            f"{precision}_risk": candidate_risk,
+            "risk_match": reference_risk == candidate_risk
+        })
+
+    passed = all(r["cosine"] >= min_cosine and r["risk_match"] for r in rows)
+
+    return {
+        "precision": precision,
+        "min_cosine": min_cosine,
+        "passed": passed,
+        "invoices": rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a LayoutLMv3 precision mode against fp32."
+    )
+    parser.add_argument("--precision", choices=PRECISIONS, default=PRECISION)
+    parser.add_argument("--min-cosine", type=float, default=MIN_COSINE)
+    parser.add_argument("invoices", nargs="*")
+    args = parser.parse_args()
+
+    invoice_paths = args.invoices or glob.glob("sample_invoices/*.pdf")
+    if not invoice_paths:
+        raise ValueError("No invoices to compare")
+
+    report = compare(args.precision, invoice_paths, args.min_cosine)
+
+    print(f"\nPrecision check: {args.precision} vs fp32")
+    print("---------------------------------")
+    for r in report["invoices"]:
+        print(
+            f"{r['invoice']}: cosine={r['cosine']} "
+            f"max_abs_diff={r['max_abs_diff']} "
+            f"risk {r['fp32_risk']} -> {r[args.precision + '_risk']}"
+        )
+    print(f"\nResult: {'PASS' if report['passed'] else 'FAIL'}")
+
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
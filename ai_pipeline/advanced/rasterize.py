@@ -0,0 +1,198 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+
+from advanced.config import OCR_DPI, RASTER_VERSION
+from advanced.embedding_store import compute_file_hash
+
+# Concurrent pdftoppm processes across the whole process. Renders beyond
+# this wait for a slot instead of oversubscribing the CPU.
+RASTER_WORKERS = int(os.getenv("RASTER_WORKERS", str(os.cpu_count() or 2)))
+RASTER_TIMEOUT = int(os.getenv("RASTER_TIMEOUT_SECONDS", "60"))
+
+# Small renders of cached targets are kept on disk as PNGs keyed by file
+# hash, page, target and RASTER_VERSION, and evicted least-recently-used
+# beyond RASTER_CACHE_MAX_MB (0 disables the cache).
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / "raster_cache"
+CACHE_DIR = Path(os.getenv("RASTER_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+CACHE_MAX_BYTES = int(float(os.getenv("RASTER_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+
+@dataclass(frozen=True)
+class RenderTarget:
+    """
+    Resolution a consumer actually needs: either a fixed pixel size or a
+    DPI, optionally grayscale. Only `cached` targets use the render cache.
+    """
+    size: tuple | None = None
+    dpi: int | None = None
+    grayscale: bool = False
+    cached: bool = False
+
+    @property
+    def mode(self) -> str:
+        return "L" if self.grayscale else "RGB"
+
+
+TARGETS = {
+    # LayoutLMv3 pixel input: the processor resizes to 224x224 anyway.
+    # A few tens of KB, so cheap to keep for re-embedding.
+    "pixels": RenderTarget(size=(224, 224), cached=True),
+    # Tesseract wants ~300 DPI; colour adds nothing to recognition. Pages
+    # are megabytes and the OCR pool caches the words, so never stored.
+    "ocr": RenderTarget(dpi=OCR_DPI, grayscale=True)
+}
+
+_render_slots = threading.BoundedSemaphore(RASTER_WORKERS)
+
+
+class RenderCache:
+    """
+    Size-bounded directory of rendered pages (PNG). Writes are atomic
+    renames, so concurrent processes can share one directory; hits
+    refresh the file's mtime, which is the LRU order used for eviction.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        key = re.sub(r"[^A-Za-z0-9._-]+", "_", key)
+        return self.root / key[:2] / f"{key}.png"
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with Image.open(path) as image:
+                image.load()
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def put(self, key: str, image: Image.Image) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        # Fastest zlib level: the pages are tiny, decode time is what counts
+        image.save(temp_path, format="PNG", compress_level=1)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for path in self.root.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # Drop to 90% so a full cache is not rescanned on every put
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                path.unlink()
+                size -= entry_size
+            except FileNotFoundError:
+                pass
+        self._size = size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache()
+    return _cache
+
+
+def page_count(pdf_path) -> int:
+    return int(pdfinfo_from_path(pdf_path, timeout=RASTER_TIMEOUT)["Pages"])
+
+
+def _render(pdf_path, target: RenderTarget, first_page: int, last_page: int) -> list:
+    with _render_slots:
+        # No output_folder: pdftoppm streams the pages back over a pipe
+        # and they are decoded in memory, never written as PNGs.
+        images = convert_from_path(
+            pdf_path,
+            dpi=target.dpi or 72,
+            size=target.size,
+            grayscale=target.grayscale,
+            first_page=first_page,
+            last_page=last_page,
+            timeout=RASTER_TIMEOUT
+        )
+    return [image if image.mode == target.mode else image.convert(target.mode) for image in images]
+
+
+def render_pages(pdf_path, target="pixels", first_page=1, last_page=None, file_hash=None) -> list:
+    """
+    Renders pages first_page..last_page (1-based, inclusive; None means
+    to the end) at the resolution of `target` and returns PIL images.
+    For cached targets, pages in the render cache are served from it and
+    only the missing contiguous range is rendered.
+    """
+    spec = TARGETS[target]
+    if last_page is None:
+        last_page = page_count(pdf_path)
+    pages = range(first_page, last_page + 1)
+
+    cache = get_render_cache()
+    if not spec.cached or not cache.enabled:
+        return _render(pdf_path, spec, first_page, last_page)
+
+    if file_hash is None:
+        file_hash = compute_file_hash(pdf_path)
+    keys = {page: f"{file_hash}-{target}-{RASTER_VERSION}-{page}" for page in pages}
+
+    images = {page: cache.get(keys[page]) for page in pages}
+    missing = [page for page, image in images.items() if image is None]
+    if missing:
+        rendered = _render(pdf_path, spec, missing[0], missing[-1])
+        for page, image in zip(range(missing[0], missing[-1] + 1), rendered):
+            if images[page] is None:
+                images[page] = image
+                cache.put(keys[page], image)
+
+    return [images[page] for page in pages]
+
+
+def render_page(pdf_path, page=1, target="pixels", file_hash=None) -> Image.Image:
+    return render_pages(pdf_path, target, page, page, file_hash=file_hash)[0]
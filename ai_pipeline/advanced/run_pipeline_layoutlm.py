@@ -26,8 +26,7 @@ def main():
 
     # ---- Scoring ----
     results = []
-    for path in invoice_paths:
-        emb = process_invoice_layoutlm(path)
+    for path, emb in zip(invoice_paths, embeddings):
         score = detector.score(dict(enumerate(emb)))
 
         results.append({
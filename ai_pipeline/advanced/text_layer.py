@@ -0,0 +1,73 @@
+import shutil
+import subprocess
+import xml.etree.ElementTree as ET
+
+# pdftotext ships with poppler, which pdf2image already requires.
+PDFTOTEXT = shutil.which("pdftotext")
+
+
+def _elements(root, name):
+    # pdftotext emits namespaced XHTML; match on the local tag name.
+    return (el for el in root.iter() if el.tag.rsplit("}", 1)[-1] == name)
+
+
+def _normalize_box(x_min, y_min, x_max, y_max, width, height):
+    """
+    Scales PDF point coordinates to LayoutLM's 0-1000 box space.
+    """
+    def scale(value, extent):
+        return max(0, min(1000, int(round(1000 * value / extent))))
+
+    return [
+        scale(x_min, width),
+        scale(y_min, height),
+        scale(x_max, width),
+        scale(y_max, height)
+    ]
+
+
+def extract_text_layer(pdf_path, page=1, timeout=30):
+    """
+    Returns (words, boxes) for one page straight from the PDF text layer.
+
+    Boxes are normalized to 0-1000. Scanned or image-only pages, and
+    systems without pdftotext, yield empty lists so callers can fall back
+    to OCR.
+    """
+    if PDFTOTEXT is None:
+        return [], []
+
+    try:
+        result = subprocess.run(
+            [PDFTOTEXT, "-bbox", "-f", str(page), "-l", str(page), str(pdf_path), "-"],
+            capture_output=True,
+            timeout=timeout,
+            check=True
+        )
+        root = ET.fromstring(result.stdout)
+    except (subprocess.SubprocessError, ET.ParseError):
+        return [], []
+
+    words, boxes = [], []
+
+    for page_el in _elements(root, "page"):
+        width = float(page_el.get("width") or 0)
+        height = float(page_el.get("height") or 0)
+        if width <= 0 or height <= 0:
+            continue
+
+        for word_el in _elements(page_el, "word"):
+            text = (word_el.text or "").strip()
+            if not text:
+                continue
+            words.append(text)
+            boxes.append(_normalize_box(
+                float(word_el.get("xMin")),
+                float(word_el.get("yMin")),
+                float(word_el.get("xMax")),
+                float(word_el.get("yMax")),
+                width,
+                height
+            ))
+
+    return words, boxes
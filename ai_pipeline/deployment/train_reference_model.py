@@ -1,3 +1,4 @@
+import argparse
 import glob
 import os
 import pickle
@@ -6,13 +7,38 @@ import numpy as np
 
 from advanced.pipeline_layoutlm import process_invoice_layoutlm
 from advanced.anomaly import AnomalyDetector
+from advanced.cascade import document_text, train_first_tier
+from advanced.config import embedding_model_id
+from advanced.embedding_store import prune_embedding_stores
 
 MODEL_DIR = "saved_models"
 MODEL_PATH = f"{MODEL_DIR}/anomaly_model.pkl"
 STATS_PATH = f"{MODEL_DIR}/embedding_stats.json"
+BASELINE_MODEL_PATH = f"{MODEL_DIR}/baseline_model.pkl"
+BASELINE_STATS_PATH = f"{MODEL_DIR}/baseline_stats.json"
+
+
+def train_baseline(invoice_paths):
+    """
+    First tier of the scoring cascade: text statistics of the same
+    reference invoices.
+    """
+    detector, stats = train_first_tier([document_text(path) for path in invoice_paths])
+
+    with open(BASELINE_MODEL_PATH, "wb") as f:
+        pickle.dump(detector, f)
+
+    with open(BASELINE_STATS_PATH, "w") as f:
+        json.dump(stats, f, indent=2)
+
+    print(f"Baseline model saved to {BASELINE_MODEL_PATH}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the reference anomaly models.")
+    parser.add_argument("--baseline-only", action="store_true", help="Only (re)train the cascade's text-statistics tier")
+    args = parser.parse_args()
+
     os.makedirs(MODEL_DIR, exist_ok=True)
 
     invoice_paths = glob.glob("sample_invoices/*.pdf")
@@ -22,6 +48,11 @@ def main():
 
     print(f"Training reference model on {len(invoice_paths)} invoices")
 
+    # ---- Cascade first tier ----
+    train_baseline(invoice_paths)
+    if args.baseline_only:
+        return
+
     embeddings = []
 
     for path in invoice_paths:
@@ -44,7 +75,9 @@ def main():
         "mean_distance": float(distances.mean()),
         "std_distance": float(distances.std()),
         "avg_distance": float(distances.mean()),
-        "max_distance": float(distances.max())
+        "max_distance": float(distances.max()),
+        # The detector is only valid for embeddings produced the same way
+        "embedding_model_id": embedding_model_id()
     }
 
     # ---- Save model ----
@@ -58,6 +91,10 @@ def main():
     print(f"Model saved to {MODEL_PATH}")
     print(f"Embedding stats saved to {STATS_PATH}")
 
+    # Embeddings cached under any other model id can no longer be scored
+    for name in prune_embedding_stores():
+        print(f"Removed stale embedding cache {name}")
+
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,10 @@
 LOW_RISK = 0.4
 HIGH_RISK = 0.7
 
+# Distance z-score from the reference invoices at or above which risk is
+# HIGH whatever the anomaly score
+HIGH_DISTANCE_Z = 2.5
+
 
 def interpret_risk(normalized_score):
     """
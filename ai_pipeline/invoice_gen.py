@@ -1,3 +1,12 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+
 from fpdf import FPDF
 
 class PreciseAmazon(FPDF):
@@ -104,6 +113,430 @@ def create_precise_invoice(filename):
 
     pdf.output(filename)
 
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+LAYOUTS = ("amazon", "classic", "minimal")
+FONTS = ("Helvetica", "Times", "Courier")
+ERROR_KINDS = ("subtotal", "total", "tax")
+
+VENDOR_NAMES = (
+    "Northwind Traders", "Contoso Supplies", "Globex Industrial", "Initech Services",
+    "Umbrella Logistics", "Stark Components", "Wayne Office Goods", "Acme Hardware"
+)
+PRODUCTS = (
+    "Wireless keyboard", "USB-C docking station", "27in monitor", "Laser printer toner",
+    "Office chair", "Standing desk frame", "Network switch 24-port", "Copy paper (case)",
+    "Consulting hours", "Software licence (annual)", "Cloud storage 1TB", "HDMI cable 2m",
+    "Whiteboard markers", "External SSD 2TB", "Webcam 1080p", "Cleaning service"
+)
+CUSTOMERS = (
+    ("Jane Doe", "123 Maple Street", "Springfield, IL 62704"),
+    ("Blue Harbor LLC", "77 Wharf Road", "Portland, ME 04101"),
+    ("R. Patel", "9 Station Avenue", "Toronto, ON M5V 2T6"),
+    ("Vertex Analytics", "400 Market St, Suite 12", "San Francisco, CA 94105")
+)
+
+
+@dataclass
+class InvoiceSpec:
+    """
+    Everything needed to render one synthetic invoice. `errors` lists the
+    deliberate arithmetic mistakes; the printed amounts already include
+    them, the correct ones are kept for labelling.
+    """
+    invoice_number: str
+    issued: str
+    vendor_index: int
+    vendor_name: str
+    customer: tuple
+    layout: str
+    font: str
+    items: list
+    tax_rate: float
+    extra_pages: int = 0
+    errors: list = field(default_factory=list)
+    signed: bool = False
+    printed_subtotal: float = 0.0
+    printed_tax: float = 0.0
+    printed_total: float = 0.0
+
+
+def random_spec(
+    rng: random.Random,
+    index: int,
+    vendors: int = 4,
+    max_items: int = 25,
+    max_extra_pages: int = 2,
+    error_rate: float = 0.2,
+    signed_ratio: float = 0.5
+) -> InvoiceSpec:
+    vendor_index = rng.randrange(vendors)
+    items = [
+        (rng.choice(PRODUCTS), rng.randint(1, 12), round(rng.uniform(1.5, 900.0), 2))
+        for _ in range(rng.randint(1, max_items))
+    ]
+    tax_rate = rng.choice((0.0, 0.05, 0.08, 0.13, 0.2))
+
+    subtotal = round(sum(qty * price for _, qty, price in items), 2)
+    tax = round(subtotal * tax_rate, 2)
+    total = round(subtotal + tax, 2)
+
+    errors = []
+    if rng.random() < error_rate:
+        errors = rng.sample(ERROR_KINDS, rng.randint(1, 2))
+    if "subtotal" in errors:
+        subtotal = round(subtotal + rng.choice((-1, 1)) * rng.uniform(1, 50), 2)
+    if "tax" in errors:
+        tax = round(tax + rng.uniform(1, 25), 2)
+    if "total" in errors:
+        total = round(total + rng.choice((-1, 1)) * rng.uniform(1, 80), 2)
+    elif "subtotal" in errors or "tax" in errors:
+        # Keep the total consistent with what is printed so only the
+        # injected mistake is wrong
+        total = round(subtotal + tax, 2)
+
+    issued = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+
+    return InvoiceSpec(
+        invoice_number=f"INV-{index:06d}-{rng.randrange(16 ** 4):04X}",
+        issued=issued.isoformat(),
+        vendor_index=vendor_index,
+        vendor_name=VENDOR_NAMES[vendor_index % len(VENDOR_NAMES)],
+        customer=rng.choice(CUSTOMERS),
+        layout=rng.choice(LAYOUTS),
+        font=rng.choice(FONTS),
+        items=items,
+        tax_rate=tax_rate,
+        extra_pages=rng.randint(0, max_extra_pages),
+        errors=errors,
+        signed=rng.random() < signed_ratio,
+        printed_subtotal=subtotal,
+        printed_tax=tax,
+        printed_total=total
+    )
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _summary_rows(spec: InvoiceSpec) -> list:
+    return [
+        ("Subtotal:", _money(spec.printed_subtotal)),
+        (f"Tax ({spec.tax_rate:.0%}):", _money(spec.printed_tax)),
+        ("Invoice Total:", _money(spec.printed_total))
+    ]
+
+
+def _render_amazon(pdf: FPDF, spec: InvoiceSpec) -> None:
+    pdf.set_font(spec.font, "B", 16)
+    pdf.cell(120, 10, f"Final Details for Order #{spec.invoice_number}")
+    pdf.set_font(spec.font, "", 9)
+    pdf.cell(70, 10, f"Order Placed: {spec.issued}", align="R", ln=True)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(4)
+
+    pdf.set_font(spec.font, "B", 10)
+    pdf.cell(95, 5, "Shipping Address")
+    pdf.cell(95, 5, "Sold by", ln=True)
+    pdf.set_font(spec.font, "", 9)
+    for line in spec.customer:
+        pdf.cell(95, 5, line)
+        pdf.cell(95, 5, spec.vendor_name if line == spec.customer[0] else "", ln=True)
+    pdf.ln(8)
+
+    pdf.set_font(spec.font, "B", 9)
+    pdf.cell(140, 8, "Items Shipped")
+    pdf.cell(50, 8, "Price", align="R", ln=True)
+    pdf.set_font(spec.font, "", 9)
+    for name, qty, price in spec.items:
+        pdf.cell(140, 6, f"{qty} of: {name}")
+        pdf.cell(50, 6, _money(qty * price), align="R", ln=True)
+
+    pdf.ln(6)
+    for label, value in _summary_rows(spec):
+        pdf.set_x(120)
+        pdf.cell(50, 6, label)
+        pdf.cell(30, 6, value, align="R", ln=True)
+
+
+def _render_classic(pdf: FPDF, spec: InvoiceSpec) -> None:
+    pdf.set_font(spec.font, "B", 20)
+    pdf.cell(110, 12, spec.vendor_name)
+    pdf.set_font(spec.font, "B", 14)
+    pdf.cell(80, 12, "INVOICE", align="R", ln=True)
+    pdf.set_font(spec.font, "", 9)
+    pdf.cell(110, 5, "")
+    pdf.cell(80, 5, f"No. {spec.invoice_number}", align="R", ln=True)
+    pdf.cell(110, 5, "")
+    pdf.cell(80, 5, f"Date: {spec.issued}", align="R", ln=True)
+    pdf.ln(6)
+
+    pdf.set_font(spec.font, "B", 10)
+    pdf.cell(0, 6, "Bill To", ln=True)
+    pdf.set_font(spec.font, "", 9)
+    for line in spec.customer:
+        pdf.cell(0, 5, line, ln=True)
+    pdf.ln(6)
+
+    pdf.set_font(spec.font, "B", 9)
+    pdf.set_fill_color(230, 230, 230)
+    pdf.cell(15, 7, "Qty", border=1, fill=True)
+    pdf.cell(105, 7, "Description", border=1, fill=True)
+    pdf.cell(35, 7, "Unit", border=1, fill=True, align="R")
+    pdf.cell(35, 7, "Amount", border=1, fill=True, align="R", ln=True)
+    pdf.set_font(spec.font, "", 9)
+    for name, qty, price in spec.items:
+        pdf.cell(15, 6, str(qty), border=1)
+        pdf.cell(105, 6, name, border=1)
+        pdf.cell(35, 6, f"{price:,.2f}", border=1, align="R")
+        pdf.cell(35, 6, _money(qty * price), border=1, align="R", ln=True)
+
+    pdf.ln(4)
+    for label, value in _summary_rows(spec):
+        pdf.set_x(120)
+        pdf.cell(45, 6, label, border="B")
+        pdf.cell(35, 6, value, border="B", align="R", ln=True)
+
+
+def _render_minimal(pdf: FPDF, spec: InvoiceSpec) -> None:
+    pdf.set_font(spec.font, "", 11)
+    pdf.cell(0, 6, f"{spec.vendor_name} - Invoice {spec.invoice_number}", ln=True)
+    pdf.cell(0, 6, f"Issued {spec.issued} to {spec.customer[0]}", ln=True)
+    pdf.ln(6)
+    for name, qty, price in spec.items:
+        pdf.cell(0, 6, f"{name} x{qty} @ {price:,.2f}  {_money(qty * price)}", ln=True)
+    pdf.ln(4)
+    for label, value in _summary_rows(spec):
+        pdf.cell(0, 6, f"{label} {value}", ln=True)
+
+
+RENDERERS = {
+    "amazon": _render_amazon,
+    "classic": _render_classic,
+    "minimal": _render_minimal
+}
+
+
+def render_invoice(spec: InvoiceSpec) -> bytes:
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    RENDERERS[spec.layout](pdf, spec)
+
+    # Terms / remittance pages give the corpus a spread of page counts
+    for page in range(spec.extra_pages):
+        pdf.add_page()
+        pdf.set_font(spec.font, "B", 12)
+        pdf.cell(0, 8, f"Terms and Conditions ({page + 1})", ln=True)
+        pdf.set_font(spec.font, "", 9)
+        pdf.multi_cell(0, 5, "Payment is due within 30 days of the invoice date. " * 12)
+
+    return bytes(pdf.output())
+
+
+def create_signing_identity(common_name: str):
+    """
+    Self-signed RSA certificate and key (PEM bytes) for one synthetic
+    vendor. Verifies as intact but untrusted, like a vendor-issued cert.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, common_name),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, common_name)
+    ])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=3650))
+        .add_extension(
+            x509.KeyUsage(
+                digital_signature=True, content_commitment=True, key_encipherment=False,
+                data_encipherment=False, key_agreement=False, key_cert_sign=False,
+                crl_sign=False, encipher_only=False, decipher_only=False
+            ),
+            critical=True
+        )
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    return cert_pem, key_pem
+
+
+def load_signer(cert_pem: bytes, key_pem: bytes):
+    from asn1crypto import keys, pem, x509 as asn1_x509
+    from pyhanko.sign import signers
+    from pyhanko_certvalidator.registry import SimpleCertificateStore
+
+    cert = asn1_x509.Certificate.load(pem.unarmor(cert_pem)[2])
+    key = keys.PrivateKeyInfo.load(pem.unarmor(key_pem)[2])
+    return signers.SimpleSigner(
+        signing_cert=cert,
+        signing_key=key,
+        cert_registry=SimpleCertificateStore.from_certs([cert])
+    )
+
+
+def sign_pdf_bytes(data: bytes, signer) -> bytes:
+    from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+    from pyhanko.sign import signers
+
+    writer = IncrementalPdfFileWriter(io.BytesIO(data))
+    output = signers.sign_pdf(
+        writer,
+        signers.PdfSignatureMetadata(field_name="VendorSignature"),
+        signer=signer
+    )
+    return output.getvalue()
+
+
+def cert_fingerprint(cert_pem: bytes) -> str:
+    # Same fingerprint the backend stores for a registered vendor
+    from cryptography import x509
+    from cryptography.hazmat.primitives import serialization
+    import hashlib
+
+    cert = x509.load_pem_x509_certificate(cert_pem)
+    return hashlib.sha256(cert.public_bytes(serialization.Encoding.DER)).hexdigest()
+
+
+# Per-process signer cache for pool workers
+_signers = {}
+
+
+def _build_one(args) -> dict:
+    spec, out_dir, cert_dir = args
+    data = render_invoice(spec)
+    fingerprint = None
+
+    if spec.signed:
+        signer = _signers.get(spec.vendor_index)
+        if signer is None:
+            with open(os.path.join(cert_dir, f"vendor_{spec.vendor_index}.pem"), "rb") as f:
+                cert_pem = f.read()
+            with open(os.path.join(cert_dir, f"vendor_{spec.vendor_index}.key"), "rb") as f:
+                key_pem = f.read()
+            signer = _signers[spec.vendor_index] = (load_signer(cert_pem, key_pem), cert_fingerprint(cert_pem))
+        data = sign_pdf_bytes(data, signer[0])
+        fingerprint = signer[1]
+
+    filename = f"{spec.invoice_number}.pdf"
+    with open(os.path.join(out_dir, filename), "wb") as f:
+        f.write(data)
+
+    return {
+        "file": filename,
+        "bytes": len(data),
+        "signer_fingerprint": fingerprint,
+        **asdict(spec)
+    }
+
+
+def generate_corpus(
+    out_dir: str,
+    count: int,
+    seed: int = 0,
+    vendors: int = 4,
+    max_items: int = 25,
+    max_extra_pages: int = 2,
+    error_rate: float = 0.2,
+    signed_ratio: float = 0.5,
+    workers: int = 1
+) -> str:
+    """
+    Writes `count` invoices to `out_dir` plus manifest.jsonl (one line
+    per invoice: its spec, injected errors and signer fingerprint) and a
+    certs/ directory with each vendor's self-signed certificate. The same
+    seed always produces the same specs.
+    """
+    cert_dir = os.path.join(out_dir, "certs")
+    os.makedirs(cert_dir, exist_ok=True)
+
+    for vendor in range(vendors):
+        cert_path = os.path.join(cert_dir, f"vendor_{vendor}.pem")
+        if os.path.exists(cert_path):
+            continue
+        cert_pem, key_pem = create_signing_identity(VENDOR_NAMES[vendor % len(VENDOR_NAMES)])
+        with open(cert_path, "wb") as f:
+            f.write(cert_pem)
+        with open(os.path.join(cert_dir, f"vendor_{vendor}.key"), "wb") as f:
+            f.write(key_pem)
+
+    jobs = [
+        (
+            random_spec(
+                random.Random(f"{seed}:{index}"),
+                index,
+                vendors=vendors,
+                max_items=max_items,
+                max_extra_pages=max_extra_pages,
+                error_rate=error_rate,
+                signed_ratio=signed_ratio
+            ),
+            out_dir,
+            cert_dir
+        )
+        for index in range(count)
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            records = list(pool.map(_build_one, jobs, chunksize=16))
+    else:
+        records = [_build_one(job) for job in jobs]
+
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+    with open(manifest_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return manifest_path
+
+
 if __name__ == "__main__":
-    create_precise_invoice("amazon_precise_test.pdf")
-    print("Precise Amazon Invoice Generated.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic invoice PDFs.")
+    parser.add_argument("--out", default="synthetic_invoices", help="Output directory")
+    parser.add_argument("--count", type=int, default=0, help="Invoices to generate (0: the single Amazon sample)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vendors", type=int, default=4, help="Distinct signing vendors")
+    parser.add_argument("--max-items", type=int, default=25)
+    parser.add_argument("--max-extra-pages", type=int, default=2)
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Share of invoices with arithmetic errors")
+    parser.add_argument("--signed-ratio", type=float, default=0.5, help="Share of invoices that are signed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.count <= 0:
+        create_precise_invoice("amazon_precise_test.pdf")
+        print("Precise Amazon Invoice Generated.")
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        manifest = generate_corpus(
+            args.out,
+            args.count,
+            seed=args.seed,
+            vendors=args.vendors,
+            max_items=args.max_items,
+            max_extra_pages=args.max_extra_pages,
+            error_rate=args.error_rate,
+            signed_ratio=args.signed_ratio,
+            workers=args.workers
+        )
+        print(f"Generated {args.count} invoices; manifest at {manifest}")
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+AI_PIPELINE_DIR = Path(__file__).resolve().parents[1]
+if str(AI_PIPELINE_DIR) not in sys.path:
+    sys.path.insert(0, str(AI_PIPELINE_DIR))
+
+# The LayoutLMv3 setup check (Usage step 1) is a script that embeds a
+# sample invoice at import time; it is run directly, not collected.
+collect_ignore = ["test_layoutlm.py"]
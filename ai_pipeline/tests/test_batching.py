@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from advanced.batching import Histogram, MicroBatcher
+
+
+def test_concurrent_items_share_one_batch():
+    batches = []
+    release = threading.Event()
+
+    def batch_fn(items):
+        batches.append(list(items))
+        release.wait(1)
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(n) for n in range(5)]
+    release.set()
+
+    assert [future.result(timeout=2) for future in futures] == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["batch_size"]["count"] == 1
+
+
+def test_batches_never_exceed_the_maximum_size():
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_ms=50)
+    futures = [batcher.submit(n) for n in range(7)]
+
+    assert [future.result(timeout=2) for future in futures] == list(range(7))
+    assert max(sizes) <= 3
+    assert sum(sizes) == 7
+
+
+def test_a_lone_item_waits_at_most_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait_ms=20)
+
+    started = time.perf_counter()
+    assert batcher.submit("a").result(timeout=2) == "a"
+    assert time.perf_counter() - started < 0.5
+
+
+def test_a_failed_batch_fails_every_caller_and_the_worker_survives():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("forward pass failed")
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=100)
+    first = [batcher.submit(n) for n in range(2)]
+    for future in first:
+        with pytest.raises(RuntimeError, match="forward pass failed"):
+            future.result(timeout=2)
+
+    assert batcher.submit("next").result(timeout=2) == "next"
+
+
+def test_cancelled_items_are_not_computed():
+    computed = []
+    gate = threading.Event()
+
+    def batch_fn(items):
+        gate.wait(1)
+        computed.extend(items)
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+    blocking = batcher.submit("first")
+    cancelled = batcher.submit("second")
+    assert cancelled.cancel()
+    gate.set()
+
+    assert blocking.result(timeout=2) == "first"
+    assert batcher.submit("third").result(timeout=2) == "third"
+    assert computed == ["first", "third"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5, 10))
+    for value in (0.5, 3, 7, 20):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {1: 1, 5: 2, 10: 3}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 30.5
@@ -0,0 +1,131 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from advanced.embedding_store import EmbeddingStore, compute_file_hash, prune_embedding_stores
+
+DIM = 4
+
+
+def store(root, model_id="model:a"):
+    return EmbeddingStore(root, model_id=model_id, dim=DIM)
+
+
+def vector(value):
+    return np.full(DIM, value, dtype=np.float32)
+
+
+def test_round_trip_and_persistence(tmp_path):
+    first = store(tmp_path)
+    first.put("aaa", vector(1))
+    first.put("bbb", vector(2))
+
+    reopened = store(tmp_path)
+    assert np.array_equal(reopened.get("aaa"), vector(1))
+    assert np.array_equal(reopened.get("bbb"), vector(2))
+    assert reopened.get("ccc") is None
+    assert len(reopened) == 2
+
+
+def test_model_ids_do_not_share_vectors(tmp_path):
+    store(tmp_path, "model:a").put("aaa", vector(1))
+    assert store(tmp_path, "model:b").get("aaa") is None
+
+
+def test_keys_are_write_once(tmp_path):
+    cache = store(tmp_path)
+    cache.put("aaa", vector(1))
+    cache.put("aaa", vector(9))
+    assert np.array_equal(store(tmp_path).get("aaa"), vector(1))
+
+
+def test_wrong_dimension_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        store(tmp_path).put("aaa", np.ones(DIM + 1))
+
+
+def test_get_or_compute_computes_once(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return vector(3)
+
+    cache = store(tmp_path)
+    assert np.array_equal(cache.get_or_compute("aaa", compute), vector(3))
+    assert np.array_equal(cache.get_or_compute("aaa", compute), vector(3))
+    assert calls == [1]
+
+
+def test_appends_from_another_instance_are_seen(tmp_path):
+    reader = store(tmp_path)
+    reader.put("aaa", vector(1))
+    assert reader.get("bbb") is None
+
+    store(tmp_path).put("bbb", vector(2))
+    assert np.array_equal(reader.get("bbb"), vector(2))
+    assert np.array_equal(reader.get("aaa"), vector(1))
+
+
+def test_torn_vector_write_is_dropped(tmp_path):
+    cache = store(tmp_path)
+    cache.put("aaa", vector(1))
+    # A writer died halfway through a row, before writing its key
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\x00" * 6)
+
+    cache.put("bbb", vector(2))
+    reopened = store(tmp_path)
+    assert np.array_equal(reopened.get("aaa"), vector(1))
+    assert np.array_equal(reopened.get("bbb"), vector(2))
+
+
+def test_prune_keeps_only_the_current_model_id(tmp_path):
+    store(tmp_path, "model:a").put("aaa", vector(1))
+    store(tmp_path, "model:b").put("aaa", vector(2))
+
+    assert prune_embedding_stores(tmp_path, keep="model:b") == ["model_a"]
+    assert store(tmp_path, "model:a").get("aaa") is None
+    assert np.array_equal(store(tmp_path, "model:b").get("aaa"), vector(2))
+
+
+def test_live_store_notices_it_was_pruned(tmp_path):
+    live = store(tmp_path, "model:a")
+    live.put("aaa", vector(1))
+    live.put("bbb", vector(2))
+    prune_embedding_stores(tmp_path, keep="model:b")
+
+    assert live.get("ccc") is None
+    assert live.get("bbb") is None
+    live.put("ccc", vector(3))
+    assert len(live) == 1
+    assert np.array_equal(store(tmp_path, "model:a").get("ccc"), vector(3))
+
+
+def _append(root, start):
+    cache = store(root)
+    for n in range(start, start + 20):
+        cache.put(f"key{n}", vector(n))
+
+
+def test_concurrent_processes_append_without_clobbering(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_append, args=(str(tmp_path), start)) for start in (0, 100)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    cache = store(tmp_path)
+    assert len(cache) == 40
+    for n in (*range(20), *range(100, 120)):
+        assert np.array_equal(cache.get(f"key{n}"), vector(n))
+
+
+def test_file_hash_matches_sha256(tmp_path):
+    path = tmp_path / "invoice.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    assert compute_file_hash(path) == hashlib.sha256(b"%PDF-1.4 test").hexdigest()
@@ -0,0 +1,99 @@
+import os
+import socket
+import stat
+import threading
+
+import numpy as np
+import pytest
+
+from advanced import inference_server
+from advanced.inference_server import InferenceServer, SidecarClient, recv_frame, send_frame
+
+
+def test_frames_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {"input_ids": np.arange(6).reshape(1, 6), "op": np.array("embed")})
+        frame = recv_frame(right)
+
+    assert np.array_equal(frame["input_ids"], np.arange(6).reshape(1, 6))
+    assert str(frame["op"]) == "embed"
+
+
+def test_oversized_frames_are_refused(monkeypatch):
+    monkeypatch.setattr(inference_server, "MAX_FRAME_BYTES", 16)
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {"input_ids": np.zeros(64)})
+        with pytest.raises(ValueError, match="exceeds"):
+            recv_frame(right)
+
+
+def test_pickled_arrays_are_refused():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {"payload": np.array([{"evil": True}], dtype=object)})
+        with pytest.raises(ValueError):
+            recv_frame(right)
+
+
+def test_a_closed_peer_is_a_connection_error():
+    left, right = socket.socketpair()
+    with right:
+        left.close()
+        with pytest.raises(ConnectionError):
+            recv_frame(right)
+
+
+@pytest.fixture
+def sidecar(tmp_path, monkeypatch):
+    def handle(frame):
+        if "fail" in frame:
+            raise RuntimeError("forward pass failed")
+        return {"embedding": frame["input_ids"].astype(np.float32) * 2}
+
+    monkeypatch.setattr(inference_server, "_handle", handle)
+    path = str(tmp_path / "layoutlm.sock")
+
+    def start():
+        server = InferenceServer(path, inference_server._Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    servers = [start()]
+    yield path, servers, start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_socket_is_owner_only(sidecar):
+    path, _, _ = sidecar
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_client_round_trips_and_surfaces_errors(sidecar):
+    path, _, _ = sidecar
+    client = SidecarClient(path, timeout=5)
+
+    response = client.request({"input_ids": np.array([1, 2, 3])})
+    assert np.array_equal(response["embedding"], [2, 4, 6])
+
+    with pytest.raises(RuntimeError, match="forward pass failed"):
+        client.request({"input_ids": np.array([1]), "fail": np.array(True)})
+    # The connection survives a failed request
+    assert np.array_equal(client.request({"input_ids": np.array([5])})["embedding"], [10])
+
+
+def test_client_reconnects_after_a_sidecar_restart(sidecar):
+    path, servers, start = sidecar
+    client = SidecarClient(path, timeout=5)
+    client.request({"input_ids": np.array([1])})
+
+    servers[0].shutdown()
+    servers[0].server_close()
+    # A restarted sidecar process takes its open connections with it
+    client._local.sock.shutdown(socket.SHUT_RDWR)
+    servers[0] = start()
+
+    assert np.array_equal(client.request({"input_ids": np.array([4])})["embedding"], [8])
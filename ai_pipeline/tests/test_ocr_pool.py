@@ -0,0 +1,89 @@
+import threading
+import time
+
+from PIL import Image
+
+from advanced import ocr_pool
+from advanced.ocr_pool import OcrPool, OcrResult
+
+
+def page(colour):
+    return Image.new("L", (20, 10), colour)
+
+
+def result(text="total"):
+    return OcrResult(("total",), ((0, 0, 10, 5),), 20, 10, text)
+
+
+def test_repeated_pages_are_recognized_once(monkeypatch):
+    calls = []
+
+    def recognize(image):
+        calls.append(image.getpixel((0, 0)))
+        return result()
+
+    monkeypatch.setattr(ocr_pool, "_recognize", recognize)
+    pool = OcrPool(workers=2)
+
+    assert pool.ocr_image(page(255)) == result()
+    assert pool.ocr_image(page(255)) == result()
+    assert calls == [255]
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_pool, "_recognize", lambda image: calls.append(image.getpixel((0, 0))) or result())
+    pool = OcrPool(workers=1, cache_size=2)
+
+    for colour in (1, 2, 1, 3, 1, 2):
+        pool.ocr_image(page(colour))
+
+    assert calls == [1, 2, 3, 2]
+
+
+def test_pages_run_in_parallel_up_to_the_worker_cap(monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def recognize(image):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return result(str(image.getpixel((0, 0))))
+
+    monkeypatch.setattr(ocr_pool, "_recognize", recognize)
+    pool = OcrPool(workers=2)
+
+    results = pool.ocr_pages([page(colour) for colour in range(6)])
+
+    assert [r.text for r in results] == [str(colour) for colour in range(6)]
+    assert max(peak) == 2
+
+
+def test_pytesseract_fallback_groups_words_into_lines(monkeypatch):
+    data = {
+        "text": ["Invoice", "", "42", "Total"],
+        "left": [0, 0, 50, 0],
+        "top": [0, 0, 0, 20],
+        "width": [40, 0, 10, 30],
+        "height": [10, 0, 10, 10],
+        "block_num": [1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1],
+        "line_num": [1, 1, 1, 2]
+    }
+    monkeypatch.setattr(ocr_pool.pytesseract, "image_to_data", lambda *args, **kwargs: data)
+
+    recognized = ocr_pool._ocr_pytesseract(Image.new("L", (100, 40)))
+
+    assert recognized.words == ("Invoice", "42", "Total")
+    assert recognized.boxes == ((0, 0, 40, 10), (50, 0, 60, 10), (0, 20, 30, 30))
+    assert recognized.text == "Invoice 42\nTotal"
+
+
+def test_boxes_normalize_to_layoutlm_space():
+    recognized = OcrResult(("a", "b"), ((0, 0, 50, 20), (90, 30, 120, 40)), 100, 40, "a b")
+    assert recognized.normalized_boxes() == [[0, 0, 500, 500], [900, 750, 1000, 1000]]
@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from advanced import rasterize
+from advanced.rasterize import RenderCache, render_pages
+
+PAGES = 5
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """
+    Replaces pdftoppm with a fake that draws page N as a solid colour N
+    and records every (first_page, last_page, dpi, size) request.
+    """
+    calls = []
+
+    def convert_from_path(pdf_path, dpi, size, grayscale, first_page, last_page, timeout):
+        calls.append((first_page, last_page, dpi, size))
+        return [
+            Image.new("RGB", size or (8, 8), (page, page, page))
+            for page in range(first_page, last_page + 1)
+        ]
+
+    monkeypatch.setattr(rasterize, "convert_from_path", convert_from_path)
+    monkeypatch.setattr(rasterize, "pdfinfo_from_path", lambda path, timeout: {"Pages": PAGES})
+    monkeypatch.setattr(rasterize, "_cache", RenderCache(tmp_path / "cache", max_bytes=1024 * 1024))
+    return calls
+
+
+def colours(images):
+    return [image.getpixel((0, 0))[0] for image in images]
+
+
+def test_pixels_are_rendered_at_the_model_size(renders):
+    images = render_pages("invoice.pdf", "pixels", file_hash="abc")
+    assert colours(images) == [1, 2, 3, 4, 5]
+    assert {image.size for image in images} == {(224, 224)}
+    assert renders == [(1, PAGES, 72, (224, 224))]
+
+
+def test_cached_pages_are_not_rendered_again(renders):
+    render_pages("invoice.pdf", "pixels", 2, 3, file_hash="abc")
+    renders.clear()
+
+    images = render_pages("invoice.pdf", "pixels", 1, 4, file_hash="abc")
+    assert colours(images) == [1, 2, 3, 4]
+    # Only the missing span is rendered
+    assert renders == [(1, 4, 72, (224, 224))]
+
+    renders.clear()
+    render_pages("invoice.pdf", "pixels", 1, 4, file_hash="abc")
+    assert renders == []
+
+
+def test_ocr_renders_are_grayscale_and_never_cached(renders, tmp_path):
+    images = render_pages("invoice.pdf", "ocr", 1, 1, file_hash="abc")
+    assert images[0].mode == "L"
+    render_pages("invoice.pdf", "ocr", 1, 1, file_hash="abc")
+
+    assert [call[2] for call in renders] == [rasterize.OCR_DPI] * 2
+    assert not (tmp_path / "cache").exists()
+
+
+def test_other_files_miss_the_cache(renders):
+    render_pages("invoice.pdf", "pixels", 1, 1, file_hash="abc")
+    render_pages("other.pdf", "pixels", 1, 1, file_hash="def")
+    assert len(renders) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    image = Image.effect_noise((64, 64), 64).convert("RGB")
+    probe = RenderCache(tmp_path / "probe", max_bytes=1 << 30)
+    probe.put("probe", image)
+    entry_size = os.path.getsize(probe._path("probe"))
+
+    cache = RenderCache(tmp_path / "cache", max_bytes=int(entry_size * 2.5))
+    cache.put("a", image)
+    cache.put("b", image)
+    old = time.time() - 60
+    os.utime(cache._path("a"), (old, old))
+    os.utime(cache._path("b"), (old - 10, old - 10))
+    assert cache.get("b") is not None  # a hit makes b the most recent
+
+    cache.put("c", image)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+
+def test_disabled_cache_always_renders(renders, monkeypatch, tmp_path):
+    monkeypatch.setattr(rasterize, "_cache", RenderCache(tmp_path / "off", max_bytes=0))
+    render_pages("invoice.pdf", "pixels", 1, 1, file_hash="abc")
+    render_pages("invoice.pdf", "pixels", 1, 1, file_hash="abc")
+    assert len(renders) == 2
+    assert not (tmp_path / "off").exists()
@@ -1,6 +1,13 @@
-import pytesseract
 from PIL import Image
 
-def extract_text_from_image(image_path):
-    image = Image.open(image_path)
-    return pytesseract.image_to_string(image)
+from advanced.ocr_pool import ocr_image, ocr_pages
+
+def extract_text_from_image(image):
+    # Accepts an in-memory PIL image or, for older callers, a path
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    return ocr_image(image).text
+
+def extract_text_from_images(images):
+    # Pages are OCR'd in parallel on the shared worker pool
+    return [result.text for result in ocr_pages(images)]
@@ -1,17 +1,9 @@
-from pdf2image import convert_from_path
-import os
+from advanced.rasterize import render_pages
 
-def pdf_to_images(pdf_path, output_dir="temp_images"):
-    os.makedirs(output_dir, exist_ok=True)
 
-    images = convert_from_path(pdf_path)
-    image_paths = []
-
-    base = os.path.splitext(os.path.basename(pdf_path))[0]
-
-    for i, img in enumerate(images):
-        path = os.path.join(output_dir, f"{base}_page_{i}.png")
-        img.save(path, "PNG")
-        image_paths.append(path)
-
-    return image_paths
+def pdf_to_images(pdf_path, first_page=1, last_page=None, file_hash=None):
+    """
+    Renders the PDF's pages at OCR resolution and returns them as
+    in-memory PIL images (nothing is written to temp_images/).
+    """
+    return render_pages(pdf_path, "ocr", first_page, last_page, file_hash=file_hash)
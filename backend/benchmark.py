@@ -0,0 +1,339 @@
+"""
+End-to-end benchmark over a synthetic invoice corpus.
+
+    python ../ai_pipeline/invoice_gen.py --out ../bench_corpus --count 1000
+    cd backend
+    python benchmark.py ../bench_corpus --output results/local.json
+    python benchmark.py ../bench_corpus --mode api --url http://localhost:8000 --register-vendors
+
+"local" runs the same stage graph as POST /invoices/{id}/analyze in this
+process (vendor lookups use the configured database; nothing is written).
+It starts from empty embedding and render caches in a temp directory
+unless --reuse-caches is given, and never measures its warm-up documents.
+"api" drives a running server through upload + analyze and reads the
+per-stage breakdown from its Server-Timing headers.
+
+The JSON report holds latency percentiles per stage and end to end plus
+throughput, so runs can be diffed over time.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Knobs that change the numbers; recorded with every report
+CONFIG_ENV = (
+    "STAGE_THREADS", "LAYOUTLM_PRECISION", "LAYOUTLM_TEXT_SOURCE",
+    "LAYOUTLM_MAX_BATCH_SIZE", "LAYOUTLM_MAX_BATCH_WAIT_MS", "DB_POOL_SIZE",
+    "ANALYSIS_WORKERS", "INVOICE_STORE", "AI_CASCADE", "STAGE_POLICY"
+)
+# On-disk caches that turn repeat documents into lookups (--mode local)
+CACHE_ENV = ("EMBEDDING_STORE_DIR", "RASTER_CACHE_DIR")
+
+
+def load_corpus(corpus_dir: str, limit: int | None = None) -> list[dict]:
+    """
+    Documents of a corpus written by invoice_gen.py (manifest.jsonl), or
+    every PDF in the directory when there is no manifest.
+    """
+    manifest = os.path.join(corpus_dir, "manifest.jsonl")
+    if os.path.exists(manifest):
+        with open(manifest, "r") as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+        for document in documents:
+            document["path"] = os.path.join(corpus_dir, document["file"])
+    else:
+        documents = [
+            {"file": os.path.basename(path), "path": path}
+            for path in sorted(glob.glob(os.path.join(corpus_dir, "*.pdf")))
+        ]
+    return documents[:limit] if limit else documents
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float], errors: int = 0) -> dict:
+    if not samples:
+        return {"count": 0, "errors": errors}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p90_ms": round(_percentile(ordered, 0.90) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.stages: dict[str, list[float]] = {}
+        self.stage_errors: dict[str, int] = {}
+        self.end_to_end: list[float] = []
+        self.failed = 0
+
+    def stage(self, name: str, seconds: float, ok: bool = True) -> None:
+        self.stages.setdefault(name, []).append(seconds)
+        if not ok:
+            self.stage_errors[name] = self.stage_errors.get(name, 0) + 1
+
+    def report(self) -> dict:
+        return {
+            "end_to_end": summarize(self.end_to_end, self.failed),
+            "stages": {
+                name: summarize(samples, self.stage_errors.get(name, 0))
+                for name, samples in sorted(self.stages.items())
+            }
+        }
+
+
+async def _run_local(documents: list[dict], args, recorder: Recorder) -> None:
+    from conn_db import AsyncSessionLocal
+    from extraction.document_context import DocumentContext
+    from extraction.pdf_extractor import extract_pdf_content
+    from models.invoice import Invoice
+    from services.invoice_analysis import build_analysis_stages
+    from services.stage_graph import run_stage_graph
+    from utils.metrics import collect_timings, timed
+
+    wanted = set(args.stages.split(",")) if args.stages else None
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(document: dict) -> None:
+        async with limit, AsyncSessionLocal() as db:
+            with collect_timings() as timings:
+                started = time.perf_counter()
+                try:
+                    path = document["path"]
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    file_hash = hashlib.sha256(data).hexdigest()
+                    recorder.stage("read_and_hash", time.perf_counter() - started)
+                    doc = DocumentContext(path, data=data, file_hash=file_hash)
+
+                    with timed("extraction"):
+                        extract_pdf_content(path, doc=doc)
+
+                    invoice = Invoice(file_path=path, file_hash=doc.file_hash)
+                    stages = build_analysis_stages(db, invoice, doc, "pdf")
+                    if wanted:
+                        stages = [stage for stage in stages if stage.name in wanted]
+                    results = await run_stage_graph(stages)
+                except Exception as exc:
+                    recorder.failed += 1
+                    print(f"{document['file']}: {exc}", flush=True)
+                    return
+
+                recorder.end_to_end.append(time.perf_counter() - started)
+                for name, result in results.items():
+                    recorder.stage(f"graph.{name}", result.elapsed, result.ok)
+
+            # Inner timers (parsing, signature validation, embedding, db...)
+            for name, seconds in timings.items():
+                if name not in results:
+                    recorder.stage(name, seconds)
+
+    await asyncio.gather(*(one(document) for document in documents))
+
+
+def _parse_server_timing(header: str | None) -> dict:
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "dur" and name:
+                timings[name] = float(value) / 1000
+    return timings
+
+
+async def _register_vendors(client, corpus_dir: str) -> None:
+    for cert_path in sorted(glob.glob(os.path.join(corpus_dir, "certs", "*.pem"))):
+        with open(cert_path, "rb") as f:
+            response = await client.post(
+                "/vendors/",
+                data={"vendor_name": os.path.splitext(os.path.basename(cert_path))[0]},
+                files={"certificate": (os.path.basename(cert_path), f.read(), "application/x-pem-file")}
+            )
+        # 400: already registered by an earlier run
+        if response.status_code not in (201, 400):
+            raise RuntimeError(f"Registering {cert_path} failed: {response.status_code} {response.text}")
+
+
+async def _run_api(documents: list[dict], args, recorder: Recorder) -> None:
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("--mode api needs httpx (pip install httpx)")
+
+    limit = asyncio.Semaphore(args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+        if args.register_vendors:
+            await _register_vendors(client, args.corpus)
+
+        async def request(name: str, method: str, url: str, **kwargs):
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            recorder.stage(name, time.perf_counter() - started, response.is_success)
+            for stage, seconds in _parse_server_timing(response.headers.get("server-timing")).items():
+                recorder.stage(f"{name}.{stage}", seconds)
+            return response
+
+        async def one(document: dict) -> None:
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    with open(document["path"], "rb") as f:
+                        upload = await request(
+                            "upload", "POST", "/invoices/upload",
+                            files={"file": (document["file"], f.read(), "application/pdf")}
+                        )
+                    if upload.status_code == 409:
+                        recorder.failed += 1
+                        print(f"{document['file']}: already uploaded (use a fresh database or corpus)", flush=True)
+                        return
+                    upload.raise_for_status()
+
+                    invoice_id = upload.json()["invoice_id"]
+                    analysis = await request(
+                        "analyze", "POST", f"/invoices/{invoice_id}/analyze",
+                        params={"force": "true"}
+                    )
+                    analysis.raise_for_status()
+                except Exception as exc:
+                    recorder.failed += 1
+                    print(f"{document['file']}: {exc}", flush=True)
+                    return
+                recorder.end_to_end.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one(document) for document in documents))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _cache_state(fresh: bool) -> dict:
+    return {
+        "fresh": fresh,
+        **{key: os.environ.get(key) for key in CACHE_ENV}
+    }
+
+
+async def _run(documents: list[dict], args) -> dict:
+    # Warm-up documents load models and pools; they are not measured, and
+    # are not measured again afterwards (their embeddings are now cached)
+    warmup, measured = documents[:args.warmup], documents[args.warmup:]
+    if warmup:
+        await (_run_api if args.mode == "api" else _run_local)(warmup, args, Recorder())
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    await (_run_api if args.mode == "api" else _run_local)(measured, args, recorder)
+    wall = time.perf_counter() - started
+
+    if args.mode == "local":
+        from conn_db import async_engine
+        await async_engine.dispose()
+
+    completed = len(recorder.end_to_end)
+    return {
+        "run": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "mode": args.mode,
+            "url": args.url if args.mode == "api" else None,
+            "corpus": os.path.abspath(args.corpus),
+            "commit": _git_commit(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "stages": args.stages,
+            "config": {key: os.environ[key] for key in CONFIG_ENV if key in os.environ},
+            # The server's caches are not ours to inspect in api mode
+            "caches": _cache_state(not args.reuse_caches) if args.mode == "local" else None
+        },
+        "warmup_documents": len(warmup),
+        "documents": len(measured),
+        "completed": completed,
+        "failed": recorder.failed,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(completed / wall, 3) if wall else None,
+        **recorder.report()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark over an invoice corpus.")
+    parser.add_argument("corpus", help="Directory written by ai_pipeline/invoice_gen.py (or any folder of PDFs)")
+    parser.add_argument("--mode", choices=("local", "api"), default="local")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL (--mode api)")
+    parser.add_argument("--register-vendors", action="store_true", help="Register the corpus certs as vendors first (--mode api)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Invoices in flight at once")
+    parser.add_argument("--limit", type=int, help="Only the first N documents")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured documents run first (--mode local)")
+    parser.add_argument("--reuse-caches", action="store_true", help="Keep the configured embedding/render caches instead of fresh empty ones (--mode local)")
+    parser.add_argument("--stages", help="Comma-separated stage-graph subset, e.g. integrity,vendor,rules (--mode local)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds (--mode api)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus, args.limit)
+    if not documents:
+        raise SystemExit(f"No invoices found in {args.corpus}")
+    if args.mode == "api":
+        # Re-uploading the same bytes is a 409, so API runs never warm up
+        # on documents they will measure
+        args.warmup = 0
+    if args.warmup >= len(documents):
+        raise SystemExit(f"--warmup {args.warmup} leaves none of the {len(documents)} documents to measure")
+
+    cache_dir = None
+    if args.mode == "local" and not args.reuse_caches:
+        # Set before anything imports the ai_pipeline modules that read them
+        cache_dir = tempfile.mkdtemp(prefix="veripay-bench-")
+        os.environ["EMBEDDING_STORE_DIR"] = os.path.join(cache_dir, "embeddings")
+        os.environ["RASTER_CACHE_DIR"] = os.path.join(cache_dir, "raster")
+
+    try:
+        report = asyncio.run(_run(documents, args))
+    finally:
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(
+            f"{report['completed']}/{report['documents']} invoices in {report['wall_seconds']}s "
+            f"({report['throughput_per_second']}/s); report at {args.output}"
+        )
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Calibrates the AI cascade's escalation margin against the full model.
+
+    cd backend
+    python calibrate_cascade.py ../bench_corpus --output results/cascade.json
+
+Every invoice is scored by both tiers (LayoutLMv3 via
+run_ai_analysis(cascade=False)), then candidate margins around the risk
+thresholds are replayed offline. The escalation rate is the share of
+invoices LayoutLMv3 would still see; agreement is the share whose cascade
+risk level (and review decision) equals the full model's. The recommended
+margin is the one with the lowest escalation rate that still meets
+--target-agreement.
+"""
+import argparse
+import json
+import os
+from collections import Counter
+
+from benchmark import load_corpus
+from extraction.document_context import DocumentContext
+from services.analysis_service import run_ai_analysis
+from services.model_registry import baseline_registry
+from services.rules_service import run_rules_checks
+
+# ai_pipeline is importable once analysis_service has put it on sys.path
+from advanced.cascade import escalation_reason, first_tier_risk, score_first_tier
+from advanced.config import CASCADE_MARGIN, CASCADE_MIN_WORDS
+
+
+def score_corpus(documents: list[dict]) -> list[dict]:
+    baseline = baseline_registry.get()
+    if baseline is None:
+        raise SystemExit(
+            "No first-tier model. Train it first: "
+            "cd ../ai_pipeline && python -m deployment.train_reference_model --baseline-only"
+        )
+
+    rows = []
+    for document in documents:
+        path = document["path"]
+        doc = DocumentContext(path)
+        rules = run_rules_checks(path, doc=doc)
+        first_tier = score_first_tier(baseline.detector, baseline.stats, doc.text)
+        full = run_ai_analysis(path, doc=doc, cascade=False)
+        if full.get("status") != "ok":
+            print(f"{document['file']}: {full.get('message')}", flush=True)
+            continue
+
+        rows.append({
+            "file": document["file"],
+            "first_tier": {key: first_tier[key] for key in ("score", "word_count", "distance_z")},
+            "rules": rules,
+            "full_score": full["anomaly_score"],
+            "full_risk": full["risk_level"],
+            "full_review": full["review_required"]
+        })
+    return rows
+
+
+def evaluate(rows: list[dict], margin: float, min_words: int) -> dict:
+    reasons = Counter()
+    risk_agree = review_agree = 0
+    for row in rows:
+        first_tier = row["first_tier"]
+        reason = escalation_reason(first_tier["score"], first_tier["word_count"], row["rules"], margin, min_words)
+        if reason:
+            reasons[reason] += 1
+            risk, review = row["full_risk"], row["full_review"]
+        else:
+            risk, review = first_tier_risk(first_tier)
+        risk_agree += risk == row["full_risk"]
+        review_agree += review == row["full_review"]
+
+    count = len(rows)
+    return {
+        "margin": round(margin, 3),
+        "escalation_rate": round(sum(reasons.values()) / count, 4),
+        "risk_agreement": round(risk_agree / count, 4),
+        "review_agreement": round(review_agree / count, 4),
+        "escalations": dict(reasons)
+    }
+
+
+def sweep(rows: list[dict], min_words: int, step: float) -> list[dict]:
+    # Past half a unit every score is within the margin of a threshold
+    margins = [round(i * step, 6) for i in range(int(round(0.5 / step)) + 1)]
+    return [evaluate(rows, margin, min_words) for margin in margins]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalation rate vs. agreement of the AI scoring cascade.")
+    parser.add_argument("corpus", help="Directory written by ai_pipeline/invoice_gen.py (or any folder of PDFs)")
+    parser.add_argument("--limit", type=int, help="Only the first N documents")
+    parser.add_argument("--min-words", type=int, default=CASCADE_MIN_WORDS, help="Text-layer words below which an invoice always escalates")
+    parser.add_argument("--target-agreement", type=float, default=0.98, help="Risk-level agreement the recommended margin must reach")
+    parser.add_argument("--step", type=float, default=0.01, help="Margin granularity of the sweep")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus, args.limit)
+    if not documents:
+        raise SystemExit(f"No invoices found in {args.corpus}")
+
+    rows = score_corpus(documents)
+    if not rows:
+        raise SystemExit("No invoice could be scored by the full model")
+
+    margins = sweep(rows, args.min_words, args.step)
+    passing = [margin for margin in margins if margin["risk_agreement"] >= args.target_agreement]
+    passing.sort(key=lambda margin: (margin["escalation_rate"], -margin["risk_agreement"]))
+
+    report = {
+        "corpus": os.path.abspath(args.corpus),
+        "invoices": len(rows),
+        "min_words": args.min_words,
+        "target_agreement": args.target_agreement,
+        "current": evaluate(rows, CASCADE_MARGIN, args.min_words),
+        "recommended": passing[0] if passing else None,
+        # Cheapest margins meeting the target, for picking a different trade-off
+        "candidates": passing[:20],
+        "full_model_risk_levels": dict(Counter(row["full_risk"] for row in rows))
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    current = report["current"]
+    print(
+        f"Current margin {current['margin']}: {current['escalation_rate']:.1%} escalated, "
+        f"{current['risk_agreement']:.1%} risk agreement"
+    )
+    recommended = report["recommended"]
+    if recommended:
+        print(
+            f"Recommended: AI_CASCADE_MARGIN={recommended['margin']} "
+            f"({recommended['escalation_rate']:.1%} escalated, {recommended['risk_agreement']:.1%} agreement)"
+        )
+    else:
+        print(f"No margin reaches {args.target_agreement:.0%} agreement; keep the cascade off or escalate everything")
+
+
+if __name__ == "__main__":
+    main()
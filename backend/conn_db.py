@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 from pathlib import Path
@@ -8,15 +9,45 @@ import os
 env_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-DATABASE_URL = (
-    f"postgresql://{os.getenv('DB_USER')}:"
+_DB_LOCATION = (
+    f"{os.getenv('DB_USER')}:"
     f"{os.getenv('DB_PASSWORD')}@"
     f"{os.getenv('DB_HOST')}:"
     f"{os.getenv('DB_PORT')}/"
     f"{os.getenv('DB_NAME')}"
 )
 
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = f"postgresql://{_DB_LOCATION}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{_DB_LOCATION}"
+
+# Connection pool, per engine and per worker process. Keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under Postgres' max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds to wait for a free pooled connection before failing the request.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Recycle connections older than this (seconds) so idle-killing proxies
+# never hand us a dead socket.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection on checkout; survives database restarts.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Server-side cap on any single statement (milliseconds, 0 = no limit).
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+_POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING
+}
+
+# Sync engine: schema management, CLI tools and sync (threadpool) routes
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+    **_POOL_OPTIONS
+)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -24,13 +55,21 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
-Base = declarative_base()
+# Async engine: request handlers and analysis workers, so a DB round trip
+# never blocks the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}},
+    **_POOL_OPTIONS
+)
 
+# expire_on_commit=False: attributes stay readable after commit without
+# an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
-# ✅ REQUIRED for FastAPI dependency injection
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+Base = declarative_base()
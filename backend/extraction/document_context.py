@@ -0,0 +1,127 @@
+import hashlib
+import io
+import threading
+
+from PyPDF2 import PdfReader
+from pyhanko.pdf_utils.reader import PdfFileReader
+
+from utils.metrics import timed
+
+
+def _page_fonts(page) -> set[str]:
+    fonts = set()
+    resources = page.get("/Resources")
+    try:
+        resources_obj = resources.get_object() if resources else None
+    except Exception:
+        resources_obj = resources
+
+    if resources_obj and "/Font" in resources_obj:
+        font_dict = resources_obj["/Font"]
+        try:
+            font_keys = font_dict.keys()
+        except Exception:
+            try:
+                font_keys = font_dict.get_object().keys()
+            except Exception:
+                font_keys = []
+        for key in font_keys:
+            fonts.add(str(key))
+
+    return fonts
+
+
+class DocumentContext:
+    """
+    One uploaded file, read and parsed at most once per request.
+
+    Integrity, rules and AI stages share this object instead of each
+    re-opening the file: the bytes, the PyPDF2 and pyhanko readers, the
+    extracted text/fonts and the embedded signature list are all computed
+    lazily on first use and then cached. Safe to share across the threads
+    of a single request.
+    """
+
+    def __init__(self, file_path: str, data: bytes | None = None, file_hash: str | None = None):
+        self.file_path = file_path
+        self._data = data
+        self._file_hash = file_hash
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    def _cached(self, key, factory):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = factory()
+            return self._cache[key]
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    with open(self.file_path, "rb") as f:
+                        self._data = f.read()
+        return self._data
+
+    @property
+    def file_hash(self) -> str:
+        if self._file_hash is None:
+            self._file_hash = hashlib.sha256(self.data).hexdigest()
+        return self._file_hash
+
+    @property
+    def pdf_reader(self) -> PdfReader:
+        def parse():
+            with timed("pypdf2_parse"):
+                return PdfReader(io.BytesIO(self.data))
+
+        return self._cached("pdf_reader", parse)
+
+    @property
+    def pyhanko_reader(self) -> PdfFileReader:
+        def parse():
+            with timed("pyhanko_parse"):
+                return PdfFileReader(io.BytesIO(self.data))
+
+        return self._cached("pyhanko_reader", parse)
+
+    @property
+    def page_texts(self) -> list[str]:
+        def extract():
+            reader = self.pdf_reader
+            texts = []
+            with timed("text_extraction"):
+                for page in reader.pages:
+                    try:
+                        texts.append(page.extract_text() or "")
+                    except Exception:
+                        texts.append("")
+            return texts
+
+        return self._cached("page_texts", extract)
+
+    @property
+    def text(self) -> str:
+        return self._cached("text", lambda: "\n".join(self.page_texts).strip())
+
+    @property
+    def fonts(self) -> list[str]:
+        def extract():
+            fonts = set()
+            for page in self.pdf_reader.pages:
+                fonts |= _page_fonts(page)
+            return sorted(fonts)
+
+        return self._cached("fonts", extract)
+
+    @property
+    def embedded_signatures(self) -> list:
+        return self._cached(
+            "embedded_signatures",
+            lambda: list(self.pyhanko_reader.embedded_signatures)
+        )
@@ -1,12 +1,19 @@
-import pytesseract
+import sys
+
 from PIL import Image
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from services.model_registry import AI_PIPELINE_DIR
+
+if str(AI_PIPELINE_DIR) not in sys.path:
+    sys.path.append(str(AI_PIPELINE_DIR))
+
+# Tesseract is located via TESSERACT_CMD or PATH by the OCR pool
+from advanced.ocr_pool import ocr_image
 
 def extract_image_content(file_path: str) -> dict:
     image = Image.open(file_path)
 
-    text = pytesseract.image_to_string(image)
+    text = ocr_image(image).text
 
     return {
         "text": text.strip(),
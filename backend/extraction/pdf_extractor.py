@@ -1,15 +1,15 @@
-from PyPDF2 import PdfReader
+from extraction.document_context import DocumentContext
 from integrity.signature_detection import detect_signature
 
-def extract_pdf_content(file_path: str) -> dict:
-    reader = PdfReader(file_path)
+def extract_pdf_content(file_path: str, doc: DocumentContext | None = None) -> dict:
+    doc = doc or DocumentContext(file_path)
 
     text_content = ""
-    for page in reader.pages:
-        if page.extract_text():
-            text_content += page.extract_text() + "\n"
+    for page_text in doc.page_texts:
+        if page_text:
+            text_content += page_text + "\n"
 
-    signature_info = detect_signature(file_path)
+    signature_info = detect_signature(file_path, doc=doc)
 
     return {
         "text": text_content.strip(),
@@ -1,8 +1,13 @@
+from extraction.document_context import DocumentContext
 from integrity.signature_detection import detect_signature
 from integrity.signature_verifier import verify_signature
 
 
-async def evaluate_integrity(file_path: str, file_type: str) -> dict:
+async def evaluate_integrity(
+    file_path: str,
+    file_type: str,
+    doc: DocumentContext | None = None
+) -> dict:
 
     if file_type != "pdf":
         return {
@@ -13,7 +18,8 @@ async def evaluate_integrity(file_path: str, file_type: str) -> dict:
             "signer_fingerprint": None
         }
 
-    detection = detect_signature(file_path)
+    doc = doc or DocumentContext(file_path)
+    detection = detect_signature(file_path, doc=doc)
 
     if not detection.get("present"):
         return {
@@ -24,14 +30,18 @@ async def evaluate_integrity(file_path: str, file_type: str) -> dict:
             "signer_fingerprint": None
         }
 
-    verification = await verify_signature(file_path)
+    verification = await verify_signature(file_path, doc=doc)
 
-    integrity = "valid" if verification.get("valid") else "invalid"
+    if verification.get("reason") == "validation_error":
+        integrity = "error"
+    else:
+        integrity = "valid" if verification.get("valid") else "invalid"
     trust = "public" if verification.get("trusted") else "private"
 
     return {
     "signature_present": True,
     "signature_integrity": integrity,
     "certificate_trust": trust,
+    "signature_coverage": verification.get("coverage"),
     "signer_fingerprint": verification.get("fingerprint")
 }
\ No newline at end of file
@@ -1,15 +1,14 @@
-from pyhanko.pdf_utils.reader import PdfFileReader
+from extraction.document_context import DocumentContext
 
-def detect_signature(pdf_path: str) -> dict:
+def detect_signature(pdf_path: str, doc: DocumentContext | None = None) -> dict:
     try:
-        with open(pdf_path, "rb") as f:
-            reader = PdfFileReader(f)
-            sigs = reader.embedded_signatures
+        doc = doc or DocumentContext(pdf_path)
+        sigs = doc.embedded_signatures
 
-            return {
-                "present": bool(sigs),
-                "count": len(sigs)
-            }
+        return {
+            "present": bool(sigs),
+            "count": len(sigs)
+        }
 
     except Exception as e:
         return {
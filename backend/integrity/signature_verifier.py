@@ -1,49 +1,69 @@
-from pyhanko.pdf_utils.reader import PdfFileReader
-from pyhanko.sign.validation import async_validate_pdf_signature
+from pyhanko.sign.validation import SignatureCoverageLevel, async_validate_pdf_signature
 from pyhanko_certvalidator import ValidationContext
 
+from extraction.document_context import DocumentContext
+from utils.metrics import timed
 
-async def verify_signature(pdf_path: str) -> dict:
-    with open(pdf_path, "rb") as f:
-        reader = PdfFileReader(f)
-        sigs = reader.embedded_signatures
 
-        if not sigs:
-            return {
-                "valid": False,
-                "trusted": False,
-                "intact": False,
-                "fingerprint": None,
-                "reason": "no_signature"
-            }
+def _coverage(sig) -> str:
+    """
+    How much of the file the signature covers; anything short of
+    "entire_file" means bytes were added after signing.
+    """
+    try:
+        level = sig.evaluate_signature_coverage()
+    except Exception:
+        level = SignatureCoverageLevel.UNCLEAR
+    return level.name.lower()
 
-        sig = sigs[0]
 
-        try:
+async def verify_signature(pdf_path: str, doc: DocumentContext | None = None) -> dict:
+    doc = doc or DocumentContext(pdf_path)
+    sigs = doc.embedded_signatures
+
+    if not sigs:
+        return {
+            "valid": False,
+            "trusted": False,
+            "intact": False,
+            "fingerprint": None,
+            "reason": "no_signature"
+        }
+
+    sig = sigs[0]
+    coverage = _coverage(sig)
+
+    try:
+        with timed("signature_validation"):
             status = await async_validate_pdf_signature(
                 sig,
                 ValidationContext(allow_fetching=False)
             )
 
-            cert = status.signing_cert
-            fingerprint = cert.sha256.hex() if cert else None
-
-            return {
-                "valid": status.valid,
-                "trusted": status.trusted,
-                "intact": status.intact,
-                "fingerprint": fingerprint
-            }
-
-        except Exception as e:
-            # Self-signed or untrusted certs land here
-            cert = sig.signer_cert
-            fingerprint = cert.sha256.hex() if cert else None
-
-            return {
-                "valid": True,
-                "trusted": False,
-                "intact": True,
-                "fingerprint": fingerprint,
-                "reason": "self_signed_or_untrusted"
-            }
+        cert = status.signing_cert
+        fingerprint = cert.sha256.hex() if cert else None
+
+        return {
+            "valid": status.valid,
+            "trusted": status.trusted,
+            "intact": status.intact,
+            "coverage": coverage,
+            "fingerprint": fingerprint
+        }
+
+    except Exception as e:
+        # Self-signed or untrusted certs come back as a status (trusted is
+        # False); only a validation that crashed lands here, and a crash
+        # proves nothing about the document
+        cert = sig.signer_cert
+        fingerprint = cert.sha256.hex() if cert else None
+
+        return {
+            "valid": False,
+            "trusted": False,
+            "intact": False,
+            "coverage": coverage,
+            "fingerprint": fingerprint,
+            "reason": "validation_error",
+            "error": str(e)
+        }
@@ -1,11 +1,34 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from conn_db import engine, Base
+from fastapi.responses import JSONResponse, PlainTextResponse
+from conn_db import async_engine, engine
 from routers import vendor as vendor_router
 from routers import invoice as invoice_router
+from routers import review as review_router
 from routers import auth as auth_router
+from services.job_queue import start_workers, stop_workers
+from services.readiness import readiness_report, start_warm_up
+from utils.metrics import ServerTimingMiddleware, instrument_engine, render_metrics
+
+# Statement timings feed the "db" entry of Server-Timing and /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 
-app = FastAPI(title="VeriPay API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models, DB schema and tool checks warm up in the background; the
+    # worker accepts connections immediately and /ready tracks progress.
+    start_warm_up()
+    start_workers()
+    yield
+    await stop_workers()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="VeriPay API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,15 +36,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
-
-Base.metadata.create_all(bind=engine)
+# Per-stage Server-Timing header on every response
+app.add_middleware(ServerTimingMiddleware)
 
 # ✅ INCLUDE ALL ROUTERS
 app.include_router(auth_router.router)
 app.include_router(vendor_router.router)
 app.include_router(invoice_router.router)
+app.include_router(review_router.router)
+
 
 @app.get("/")
 def root():
     return {"status": "VeriPay backend running"}
+
+
+@app.get("/ready")
+def ready():
+    report = readiness_report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,3 +1,4 @@
 from .vendor import Vendor
 from .invoice import Invoice
 from .analysis_result import AnalysisResult
+from .analysis_job import AnalysisJob
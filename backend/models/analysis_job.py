@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Index
+from datetime import datetime
+from conn_db import Base
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.invoice_id"), index=True, nullable=False)
+
+    # queued -> running -> done | failed
+    status = Column(String, default="queued", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(String, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_results.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
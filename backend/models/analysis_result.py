@@ -1,17 +1,52 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON, String, Float
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON, String, Float, Index, Boolean
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 from conn_db import Base
 
+# JSONB on Postgres (indexable, compact), plain JSON elsewhere
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
+    __table_args__ = (
+        # Reuse lookup: has this exact input been analyzed by this code?
+        Index("ix_analysis_results_reuse", "file_hash", "model_version", "rules_version"),
+        # Review queue / dashboard filters, newest first
+        Index("ix_analysis_results_review", "is_latest", "review_required", "risk_level", "id"),
+        Index("ix_analysis_results_risk_created", "risk_level", "created_at"),
+        Index("ix_analysis_results_vendor_created", "vendor_id", "created_at"),
+        # Containment queries on fields not promoted to columns
+        Index("ix_analysis_results_crypto_gin", "crypto_json", postgresql_using="gin"),
+        Index("ix_analysis_results_ai_gin", "ai_json", postgresql_using="gin"),
+        Index("ix_analysis_results_rules_gin", "rules_json", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_id = Column(Integer, ForeignKey("invoices.invoice_id"), index=True, nullable=False)
     prediction = Column(Integer, nullable=False)
     confidence = Column(Float, nullable=False)
     model_version = Column(String, nullable=False)
+    # Inputs the result depends on (nullable: rows predate these columns)
+    file_hash = Column(String, nullable=True)
+    rules_version = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    crypto_json = Column(JSON, nullable=False)
-    ai_json = Column(JSON, nullable=False)
-    rules_json = Column(JSON, nullable=False)
+    crypto_json = Column(JSONDocument, nullable=False)
+    ai_json = Column(JSONDocument, nullable=False)
+    rules_json = Column(JSONDocument, nullable=False)
+
+    # Hot fields copied out of the JSON documents so dashboards can filter
+    # and aggregate on indexed columns
+    is_latest = Column(Boolean, default=True, nullable=True)
+    risk_level = Column(String, nullable=True)
+    review_required = Column(Boolean, nullable=True)
+    anomaly_score = Column(Float, nullable=True)
+    signer_identity = Column(String, nullable=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.vendor_id"), nullable=True)
+    rules_status = Column(String, nullable=True)
+    subtotal_matches_items = Column(Boolean, nullable=True)
+    total_matches_subtotal_tax = Column(Boolean, nullable=True)
+
+    # Run/skip/defer decisions of the stage policy and their inputs, for
+    # audit (null when the policy is off)
+    stage_decisions = Column(JSONDocument, nullable=True)
@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from datetime import datetime
 from conn_db import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # Composite (filter, invoice_id) indexes back the keyset-paginated
+    # listing: each filter seeks straight to its rows in cursor order.
+    __table_args__ = (
+        Index("ix_invoices_status_id", "status", "invoice_id"),
+        Index("ix_invoices_signed_valid_id", "is_signed", "crypto_valid", "invoice_id"),
+        Index("ix_invoices_signer_id", "signer_fingerprint", "invoice_id"),
+        Index("ix_invoices_created_id", "created_at", "invoice_id"),
+    )
 
     invoice_id = Column(Integer, primary_key=True, index=True)
 
@@ -0,0 +1,77 @@
+"""
+Re-scores stored invoices after a model retrain or a risk_policy change.
+
+    cd backend
+    python reanalyze.py --model-version "layoutlmv3-isolation-forest@3f2a9c0d1b7e/microsoft/layoutlmv3-base:cls:page1:ocr:fp32:r3-300dpi+risk@0.4-0.7"
+    python reanalyze.py --status uploaded --from 2026-01-01 --to 2026-02-01
+
+Progress is checkpointed after every committed page; re-running the same
+command resumes where the previous run stopped.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from conn_db import AsyncSessionLocal
+from services.reanalysis import (
+    REANALYZE_BATCH_SIZE,
+    REANALYZE_CONCURRENCY,
+    ReanalysisFilter,
+    reanalyze
+)
+
+
+def _print_progress(state: dict, elapsed: float) -> None:
+    rate = state["processed"] / elapsed if elapsed else 0.0
+    print(
+        f"processed={state['processed']} failed={state['failed']} "
+        f"last_invoice_id={state['last_invoice_id']} ({rate:.1f} invoices/s)",
+        flush=True
+    )
+
+
+async def _run(filters: ReanalysisFilter, args) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await reanalyze(
+            db,
+            filters,
+            checkpoint_path=args.checkpoint,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            progress=_print_progress
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch re-analysis of stored invoices.")
+    parser.add_argument("--status", help="Only invoices with this status")
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, help="Created at or after (ISO date)")
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, help="Created before (ISO date)")
+    parser.add_argument("--model-version", help="Only invoices whose latest analysis used this model version")
+    parser.add_argument("--checkpoint", default="reanalyze.checkpoint.json")
+    parser.add_argument("--batch-size", type=int, default=REANALYZE_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=REANALYZE_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    filters = ReanalysisFilter(
+        status=args.status,
+        created_from=args.created_from,
+        created_to=args.created_to,
+        model_version=args.model_version
+    )
+
+    summary = asyncio.run(_run(filters, args))
+
+    print(
+        f"\nDone: {summary['processed']} re-analyzed, {summary['failed']} failed "
+        f"in {summary['elapsed_seconds']}s"
+    )
+    if summary["failed_ids"]:
+        print(f"Failed invoice ids: {summary['failed_ids']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from schemas.auth import LoginRequest
 from services.auth import authenticate_user
-from conn_db import get_db
+from dependencies import get_db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from schemas.auth import RegisterRequest
-from conn_db import get_db
+from dependencies import get_db
 from services.auth.register_service import register_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -1,20 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import os
-import uuid
+from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from extraction.document_context import DocumentContext
 from extraction.pdf_extractor import extract_pdf_content
 from extraction.image_extractor import extract_image_content
 from integrity.integrity_service import evaluate_integrity
 from integrity.vendor_identity_service import verify_vendor_identity
-from utils.hashing import compute_sha256
+from utils.metrics import timed
+from utils.uploads import MAX_UPLOAD_BYTES, UploadTooLarge, stage_upload
+from storage import get_invoice_store
 from models.invoice import Invoice
+from models.analysis_job import AnalysisJob
 from models.analysis_result import AnalysisResult
-from models.vendor import Vendor
-from dependencies import get_db
-from services.analysis_service import run_ai_analysis
-from services.rules_service import run_rules_checks
+from dependencies import get_async_db
+from services.bulk_ingest import ingest_bulk, stage_bulk_files
+from services.invoice_analysis import (
+    analyze_invoice_record,
+    find_reusable_analysis,
+    reuse_analysis,
+    serialize_analysis
+)
+from services.job_queue import enqueue_analysis
+from services.stage_policy import deferred_stages
+from services.reanalysis import ReanalysisFilter, enqueue_reanalysis
+from services.vendor_index import lookup_vendor
 
 
 router = APIRouter(
@@ -29,30 +46,84 @@ ALLOWED_MIME_TYPES = {
     "image/jpg": "image"
 }
 
-INVOICE_DIR = "invoices"
-os.makedirs(INVOICE_DIR, exist_ok=True)
+
+LIST_FIELDS = (
+    "invoice_id",
+    "status",
+    "file_hash",
+    "is_signed",
+    "crypto_valid",
+    "signer_fingerprint",
+    "created_at"
+)
+DEFAULT_LIST_LIMIT = 100
+MAX_LIST_LIMIT = 500
+
 
 @router.get("/")
-def list_invoices(db: Session = Depends(get_db)):
-    invoices = db.query(Invoice).order_by(Invoice.invoice_id.desc()).all()
+async def list_invoices(
+    response: Response,
+    limit: int = Query(DEFAULT_LIST_LIMIT, ge=1, le=MAX_LIST_LIMIT),
+    cursor: int | None = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    status: str | None = None,
+    is_signed: bool | None = None,
+    crypto_valid: bool | None = None,
+    signer_fingerprint: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    fields: str | None = Query(None, description=f"Comma-separated subset of {', '.join(LIST_FIELDS)}"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Newest-first page of invoices. Pages are keyed on invoice_id rather
+    than OFFSET, so every page costs the same however deep it is; the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    selected = LIST_FIELDS
+    if fields:
+        selected = tuple(name.strip() for name in fields.split(",") if name.strip())
+        unknown = [name for name in selected if name not in LIST_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    # invoice_id is always read: it is the cursor
+    columns = ["invoice_id"] + [name for name in selected if name != "invoice_id"]
+    query = select(*(getattr(Invoice, name) for name in columns))
+
+    if cursor is not None:
+        query = query.where(Invoice.invoice_id < cursor)
+    if status is not None:
+        query = query.where(Invoice.status == status)
+    if is_signed is not None:
+        query = query.where(Invoice.is_signed == is_signed)
+    if crypto_valid is not None:
+        query = query.where(Invoice.crypto_valid == crypto_valid)
+    if signer_fingerprint is not None:
+        query = query.where(Invoice.signer_fingerprint == signer_fingerprint)
+    if created_from is not None:
+        query = query.where(Invoice.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Invoice.created_at < created_to)
+
+    # One extra row tells us whether another page exists
+    rows = (await db.execute(
+        query.order_by(Invoice.invoice_id.desc()).limit(limit + 1)
+    )).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].invoice_id)
+
     return [
-        {
-            "invoice_id": invoice.invoice_id,
-            "status": invoice.status,
-            "file_hash": invoice.file_hash,
-            "is_signed": invoice.is_signed,
-            "crypto_valid": invoice.crypto_valid,
-            "signer_fingerprint": invoice.signer_fingerprint,
-            "created_at": invoice.created_at,
-        }
-        for invoice in invoices
+        {name: getattr(row, name) for name in selected}
+        for row in rows
     ]
 
 
 @router.post("/upload")
 async def upload_invoice(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # 1️⃣ Basic sanity check
     if not file.filename:
@@ -73,51 +144,62 @@ async def upload_invoice(
     if file_category == "image" and extension not in [".png", ".jpg", ".jpeg"]:
         raise HTTPException(status_code=400, detail="Expected image")
 
-    # 4️⃣ Read file bytes
-    contents = await file.read()
-    if not contents:
+    # 4️⃣ Stream to a temp file, hashing (SHA-256) as chunks arrive
+    store = get_invoice_store()
+    try:
+        staged = await stage_upload(file, store.staging_dir, suffix=extension)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit"
+        )
+
+    if staged.size == 0:
+        staged.discard()
         raise HTTPException(status_code=400, detail="Empty file")
 
-    # 🔐 STEP 1 — Compute SHA-256 (duplicate detection)
-    file_hash = compute_sha256(contents)
+    # 🔐 STEP 1 — Duplicate detection
+    file_hash = staged.file_hash
 
-    existing = db.query(Invoice).filter(
-        Invoice.file_hash == file_hash
-    ).first()
+    existing = (await db.execute(
+        select(Invoice.invoice_id).where(Invoice.file_hash == file_hash)
+    )).first()
 
     if existing:
+        staged.discard()
         raise HTTPException(
             status_code=409,
             detail="Duplicate invoice detected"
         )
 
-    # 5️⃣ Persist file
-    safe_filename = f"{uuid.uuid4()}{extension}"
-    file_path = os.path.join(INVOICE_DIR, safe_filename)
+    # 5️⃣ Persist file under its content hash (write-once)
+    file_path = await run_in_threadpool(store.put, staged.temp_path, file_hash, extension)
+    local_path = store.local_path(file_path)
 
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    # Every stage below shares one parse of the stored bytes
+    doc = DocumentContext(local_path, file_hash=file_hash)
 
-    # 6️⃣ Extract content (used later by AI, not crypto)
-    if file_category == "pdf":
-        _ = extract_pdf_content(file_path)
-    else:
-        _ = extract_image_content(file_path)
+    # 6️⃣ Extract content (used later by AI, not crypto), off the event loop
+    with timed("extraction"):
+        if file_category == "pdf":
+            _ = await run_in_threadpool(extract_pdf_content, local_path, doc=doc)
+        else:
+            # OCR: on the capped OCR worker pool
+            _ = await run_in_threadpool(extract_image_content, local_path)
 
     # 🔐 STEP 2 — Cryptographic integrity evaluation
-    crypto_raw = await evaluate_integrity(
-        file_path=file_path,
-        file_type=file_category
-    )
+    with timed("integrity"):
+        # pyhanko parses and validates synchronously behind its async API:
+        # give it a private event loop on a pool thread
+        crypto_raw = await run_in_threadpool(asyncio.run, evaluate_integrity(
+            file_path=local_path,
+            file_type=file_category,
+            doc=doc
+        ))
 
     # 🔐 STEP 3 — Vendor cryptographic identity binding (fingerprint-based)
-    vendor = None
     fingerprint = crypto_raw.get("signer_fingerprint")
-
-    if fingerprint:
-        vendor = db.query(Vendor).filter(
-            Vendor.public_key_fingerprint == fingerprint
-        ).first()
+    vendor = await lookup_vendor(db, fingerprint)
 
     vendor_result = verify_vendor_identity(
     signature_integrity=crypto_raw["signature_integrity"],
@@ -142,8 +224,7 @@ async def upload_invoice(
     )
 
     db.add(invoice)
-    db.commit()
-    db.refresh(invoice)
+    await db.commit()
 
     # 9️⃣ Final response (clean, minimal, AI-ready)
     return {
@@ -155,89 +236,181 @@ async def upload_invoice(
     }
 
 
+@router.post("/upload/bulk")
+async def upload_invoices_bulk(files: list[UploadFile] = File(...)):
+    """
+    Ingests many invoices at once: any number of PDF/image parts and/or
+    ZIP archives of them. Each file's outcome is streamed back as one
+    NDJSON line (stored / duplicate / error) as soon as it is settled,
+    followed by a summary line.
+
+    Multipart requests are capped at 1000 parts by the form parser; send
+    larger batches as a ZIP.
+    """
+    store = get_invoice_store()
+
+    # 1️⃣ Stage every part now - the parts are closed once we return
+    items = await stage_bulk_files(files, store)
+
+    # 2️⃣ Dedupe, store, integrity-check and insert while streaming results
+    return StreamingResponse(
+        ingest_bulk(items, store),
+        media_type="application/x-ndjson"
+    )
+
+
+def _analysis_response(request: Request, body: dict, cache_control: str = "no-cache") -> Response:
+    """
+    Analyses are immutable once stored, so the analysis id is a strong
+    ETag; a matching If-None-Match gets an empty 304.
+    """
+    etag = f'"analysis-{body["analysis_id"]}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=jsonable_encoder(body), headers=headers)
+
+
 @router.post("/{invoice_id}/analyze")
 async def analyze_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    run_async: bool = Query(False, alias="async"),
+    force: bool = Query(False, description="Recompute even if a stored result is still valid"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    invoice = db.query(Invoice).filter(Invoice.invoice_id == invoice_id).first()
+    invoice = await db.get(Invoice, invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
-    file_path = invoice.file_path
-    extension = os.path.splitext(file_path)[1].lower()
-    file_type = "pdf" if extension == ".pdf" else "image"
+    # ♻️ Same bytes, same model, same rules -> the stored AI and rules
+    # results still hold (integrity and vendor binding are re-checked)
+    if not force:
+        analysis = await find_reusable_analysis(db, invoice)
+        if analysis is not None:
+            return _analysis_response(request, await reuse_analysis(db, invoice, analysis))
 
-    crypto_raw = await evaluate_integrity(
-        file_path=file_path,
-        file_type=file_type
-    )
+    # ⏳ Queue the work and return immediately; poll /invoices/jobs/{job_id}
+    if run_async:
+        job = await enqueue_analysis(db, invoice.invoice_id)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job.id,
+                "invoice_id": invoice.invoice_id,
+                "status": job.status
+            }
+        )
 
-    vendor = None
-    fingerprint = crypto_raw.get("signer_fingerprint")
+    result = await analyze_invoice_record(db, invoice, allow_defer=True)
 
-    if fingerprint:
-        vendor = db.query(Vendor).filter(
-            Vendor.public_key_fingerprint == fingerprint
-        ).first()
+    # 🧭 Stages the stage policy deferred finish on the job queue
+    if deferred_stages(result["stage_decisions"]):
+        job = await enqueue_analysis(db, invoice.invoice_id)
+        result = {**result, "deferred_job_id": job.id}
 
-    vendor_result = verify_vendor_identity(
-        signature_integrity=crypto_raw["signature_integrity"],
-        certificate_trust=crypto_raw["certificate_trust"],
-        signer_fingerprint=fingerprint,
-        vendor=vendor
+    return _analysis_response(request, result)
+
+
+@router.get("/{invoice_id}/analysis")
+async def get_latest_analysis(
+    invoice_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    invoice = await db.get(Invoice, invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    analysis = (await db.execute(
+        select(AnalysisResult)
+        .where(AnalysisResult.invoice_id == invoice_id)
+        .order_by(AnalysisResult.id.desc())
+        .limit(1)
+    )).scalars().first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Invoice has not been analyzed")
+
+    return _analysis_response(request, serialize_analysis(invoice, analysis))
+
+
+@router.get("/{invoice_id}/analysis/{analysis_id}")
+async def get_analysis(
+    invoice_id: int,
+    analysis_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    analysis = await db.get(AnalysisResult, analysis_id)
+    if not analysis or analysis.invoice_id != invoice_id:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    invoice = await db.get(Invoice, invoice_id)
+
+    # A given analysis never changes
+    return _analysis_response(
+        request,
+        serialize_analysis(invoice, analysis),
+        cache_control="private, max-age=31536000, immutable"
     )
 
-    crypto = {
-        **crypto_raw,
-        **vendor_result
-    }
 
-    ai_result = None
-    if file_type == "pdf":
-        ai_result = run_ai_analysis(file_path)
-        rules_result = run_rules_checks(file_path)
-    else:
-        ai_result = {
-            "status": "not_supported",
-            "message": "AI analysis is only available for PDF invoices."
-        }
-        rules_result = {
-            "status": "not_supported",
-            "message": "Rules analysis is only available for PDF invoices."
-        }
-
-    prediction = -1
-    confidence = 0.0
-    model_version = "layoutlmv3-isolation-forest"
-
-    if ai_result.get("status") == "ok":
-        risk = ai_result.get("risk_level")
-        if risk == "LOW":
-            prediction = 0
-        elif risk == "MEDIUM":
-            prediction = 1
-        elif risk == "HIGH":
-            prediction = 2
-        confidence = float(ai_result.get("anomaly_score") or confidence)
-
-    analysis = AnalysisResult(
-        invoice_id=invoice.invoice_id,
-        prediction=prediction,
-        confidence=confidence,
-        model_version=model_version,
-        crypto_json=crypto,
-        ai_json=ai_result,
-        rules_json=rules_result
+@router.post("/reanalyze")
+async def reanalyze_invoices(
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    model_version: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queues re-analysis jobs for every matching invoice. For a full
+    archive re-score prefer `python reanalyze.py`, which batches and
+    checkpoints.
+    """
+    filters = ReanalysisFilter(
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        model_version=model_version
     )
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
+    queued = await enqueue_reanalysis(db, filters)
 
-    return {
-        "invoice_id": invoice.invoice_id,
-        "file_type": file_type,
-        "crypto": crypto,
-        "ai": ai_result,
-        "rules": rules_result
+    return JSONResponse(
+        status_code=202,
+        content={"queued": queued, "filters": filters.to_json()}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.get(AnalysisJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {
+        "job_id": job.id,
+        "invoice_id": job.invoice_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": None
     }
+
+    if job.status == "done" and job.analysis_id is not None:
+        analysis = await db.get(AnalysisResult, job.analysis_id)
+        invoice = await db.get(Invoice, job.invoice_id)
+        if analysis and invoice:
+            response["result"] = serialize_analysis(invoice, analysis)
+
+    return response
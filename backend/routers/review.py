@@ -0,0 +1,183 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dependencies import get_async_db
+from models.analysis_result import AnalysisResult
+from models.invoice import Invoice
+from models.vendor import Vendor
+
+router = APIRouter(
+    prefix="/review",
+    tags=["Review"]
+)
+
+DEFAULT_QUEUE_LIMIT = 50
+MAX_QUEUE_LIMIT = 500
+TOP_VENDORS = 10
+
+
+def _latest_analyses(
+    vendor_id: int | None,
+    created_from: datetime | None,
+    created_to: datetime | None
+) -> list:
+    # Only each invoice's newest analysis counts; re-analyses supersede
+    conditions = [AnalysisResult.is_latest.is_(True)]
+    if vendor_id is not None:
+        conditions.append(AnalysisResult.vendor_id == vendor_id)
+    if created_from is not None:
+        conditions.append(AnalysisResult.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(AnalysisResult.created_at < created_to)
+    return conditions
+
+
+@router.get("/queue")
+async def review_queue(
+    response: Response,
+    risk_level: str | None = None,
+    review_required: bool = True,
+    vendor_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: int = Query(DEFAULT_QUEUE_LIMIT, ge=1, le=MAX_QUEUE_LIMIT),
+    cursor: int | None = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Newest-first invoices awaiting review, read entirely from indexed
+    analysis columns. Keyset-paginated on the analysis id.
+    """
+    conditions = _latest_analyses(vendor_id, created_from, created_to)
+    conditions.append(AnalysisResult.review_required.is_(review_required))
+    if risk_level is not None:
+        conditions.append(AnalysisResult.risk_level == risk_level.upper())
+    if cursor is not None:
+        conditions.append(AnalysisResult.id < cursor)
+
+    query = (
+        select(
+            AnalysisResult.id,
+            AnalysisResult.invoice_id,
+            AnalysisResult.created_at,
+            AnalysisResult.risk_level,
+            AnalysisResult.review_required,
+            AnalysisResult.anomaly_score,
+            AnalysisResult.signer_identity,
+            AnalysisResult.vendor_id,
+            AnalysisResult.rules_status,
+            AnalysisResult.subtotal_matches_items,
+            AnalysisResult.total_matches_subtotal_tax,
+            AnalysisResult.model_version,
+            Invoice.status,
+            Invoice.file_hash
+        )
+        .join(Invoice, Invoice.invoice_id == AnalysisResult.invoice_id)
+        .where(*conditions)
+        .order_by(AnalysisResult.id.desc())
+        .limit(limit + 1)
+    )
+    rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+    return [
+        {
+            "analysis_id": row.id,
+            "invoice_id": row.invoice_id,
+            "invoice_status": row.status,
+            "file_hash": row.file_hash,
+            "analyzed_at": row.created_at,
+            "risk_level": row.risk_level,
+            "review_required": row.review_required,
+            "anomaly_score": row.anomaly_score,
+            "signer_identity": row.signer_identity,
+            "vendor_id": row.vendor_id,
+            "rules_status": row.rules_status,
+            "subtotal_matches_items": row.subtotal_matches_items,
+            "total_matches_subtotal_tax": row.total_matches_subtotal_tax,
+            "model_version": row.model_version
+        }
+        for row in rows
+    ]
+
+
+@router.get("/stats")
+async def review_stats(
+    vendor_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Dashboard aggregates over each invoice's latest analysis. Every
+    figure is a GROUP BY / filtered COUNT on indexed columns; no JSON is
+    read.
+    """
+    conditions = _latest_analyses(vendor_id, created_from, created_to)
+
+    totals = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(AnalysisResult.review_required.is_(True)).label("review_required"),
+            func.avg(AnalysisResult.anomaly_score).label("avg_anomaly_score"),
+            func.count().filter(AnalysisResult.subtotal_matches_items.is_(False)).label("subtotal_mismatch"),
+            func.count().filter(AnalysisResult.total_matches_subtotal_tax.is_(False)).label("total_mismatch")
+        ).where(*conditions)
+    )).one()
+
+    by_risk = (await db.execute(
+        select(AnalysisResult.risk_level, func.count())
+        .where(*conditions)
+        .group_by(AnalysisResult.risk_level)
+    )).all()
+
+    by_identity = (await db.execute(
+        select(AnalysisResult.signer_identity, func.count())
+        .where(*conditions)
+        .group_by(AnalysisResult.signer_identity)
+    )).all()
+
+    high_risk = func.count().filter(AnalysisResult.risk_level == "HIGH")
+    top_vendors = (await db.execute(
+        select(
+            AnalysisResult.vendor_id,
+            Vendor.vendor_name,
+            high_risk.label("high_risk"),
+            func.count().label("total")
+        )
+        .join(Vendor, Vendor.vendor_id == AnalysisResult.vendor_id)
+        .where(*conditions)
+        .group_by(AnalysisResult.vendor_id, Vendor.vendor_name)
+        .order_by(high_risk.desc(), func.count().desc())
+        .limit(TOP_VENDORS)
+    )).all()
+
+    return {
+        "total": totals.total,
+        "review_required": totals.review_required,
+        "avg_anomaly_score": (
+            round(float(totals.avg_anomaly_score), 3)
+            if totals.avg_anomaly_score is not None else None
+        ),
+        "by_risk_level": {level or "unscored": count for level, count in by_risk},
+        "by_signer_identity": {identity or "unknown": count for identity, count in by_identity},
+        "rules_failures": {
+            "subtotal_mismatch": totals.subtotal_mismatch,
+            "total_mismatch": totals.total_mismatch
+        },
+        "top_vendors_by_high_risk": [
+            {
+                "vendor_id": row.vendor_id,
+                "vendor_name": row.vendor_name,
+                "high_risk": row.high_risk,
+                "total": row.total
+            }
+            for row in top_vendors
+        ]
+    }
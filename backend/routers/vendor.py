@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 import hashlib
 from cryptography.hazmat.primitives import serialization
 
 from models.vendor import Vendor
-from dependencies import get_db
+from dependencies import get_async_db
+from services.vendor_index import lookup_vendor, notify_vendor_changed, vendor_index
 
 router = APIRouter(
     prefix="/vendors",
@@ -18,7 +20,7 @@ router = APIRouter(
 async def register_vendor(
     vendor_name: str = Form(...),
     certificate: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     cert_bytes = await certificate.read()
 
@@ -33,9 +35,7 @@ async def register_vendor(
     fingerprint = hashlib.sha256(
     cert.public_bytes(serialization.Encoding.DER)).hexdigest()
 
-    existing = db.query(Vendor).filter(
-        Vendor.public_key_fingerprint == fingerprint
-    ).first()
+    existing = await lookup_vendor(db, fingerprint)
 
     if existing:
         raise HTTPException(
@@ -50,8 +50,21 @@ async def register_vendor(
     )
 
     db.add(vendor)
-    db.commit()
-    db.refresh(vendor)
+    await notify_vendor_changed(db, fingerprint)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered meanwhile through another worker whose notification
+        # has not reached our index yet
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Vendor with this certificate already exists"
+        )
+    await db.refresh(vendor)
+
+    # Our own index sees the vendor immediately; other workers via NOTIFY
+    vendor_index.upsert(vendor)
 
     return {
         "vendor_id": vendor.vendor_id,
@@ -1,75 +1,256 @@
-import json
-import pickle
-from pathlib import Path
 import sys
-import shutil
 
 import numpy as np
 
-AI_PIPELINE_DIR = Path(__file__).resolve().parents[2] / "ai_pipeline"
-MODEL_PATH = AI_PIPELINE_DIR / "saved_models" / "anomaly_model.pkl"
-STATS_PATH = AI_PIPELINE_DIR / "saved_models" / "embedding_stats.json"
+from extraction.document_context import DocumentContext
+from services.model_registry import AI_PIPELINE_DIR, baseline_registry, check_tools, registry
+from utils.metrics import register_collector, render_histogram, timed
 
 if str(AI_PIPELINE_DIR) not in sys.path:
     sys.path.append(str(AI_PIPELINE_DIR))
 
+from advanced.config import (
+    CASCADE_ENABLED,
+    CASCADE_MARGIN,
+    CASCADE_MIN_WORDS,
+    TEXT_SOURCE,
+    embedding_model_id
+)
+from interpretation.risk_policy import HIGH_DISTANCE_Z, HIGH_RISK, LOW_RISK
 
-def run_ai_analysis(invoice_path: str) -> dict:
-    tesseract_path = shutil.which("tesseract")
-    if not tesseract_path:
+_tesseract_configured = False
+
+
+def _layoutlm_metrics() -> list[str]:
+    # Read only once the AI stage has imported the module: scraping
+    # /metrics must never be what loads torch
+    module = sys.modules.get("advanced.layoutlm_features")
+    if module is None:
+        return []
+
+    lines = []
+    # In-process batcher, or the node's inference sidecar
+    batcher = module.batcher_stats()
+    for key in ("batch_size", "queue_wait_seconds", "forward_seconds", "latency_seconds"):
+        name = f"veripay_layoutlm_batch_{key}"
+        snapshot = batcher[key]
+        lines += [f"# TYPE {name} histogram"]
+        lines += render_histogram(name, "", snapshot["buckets"], snapshot["count"], snapshot["sum"])
+    lines += [
+        "# TYPE veripay_layoutlm_batch_pending gauge",
+        f"veripay_layoutlm_batch_pending {batcher['pending']}",
+        "# TYPE veripay_layoutlm_encode_seconds histogram"
+    ]
+    for stage, snapshot in module.encode_stats().items():
+        lines += render_histogram(
+            "veripay_layoutlm_encode_seconds",
+            f'stage="{stage}"',
+            snapshot["buckets"],
+            snapshot["count"],
+            snapshot["sum"]
+        )
+    return lines
+
+
+register_collector(_layoutlm_metrics)
+
+
+def _configure_tesseract(tesseract_path: str) -> None:
+    global _tesseract_configured
+    if _tesseract_configured:
+        return
+
+    import pytesseract
+
+    pytesseract.pytesseract.tesseract_cmd = tesseract_path
+    _tesseract_configured = True
+
+
+def _cascade_baseline(enabled: bool = CASCADE_ENABLED):
+    """
+    First-tier snapshot when the cascade is on and its model is trained;
+    None means every invoice goes straight to LayoutLMv3.
+    """
+    if not enabled:
+        return None
+    return baseline_registry.get()
+
+
+def _model_version(snapshot, baseline) -> str:
+    # The detector only means something for the embeddings it was trained
+    # on (text source, precision, rendering), and risk levels are derived
+    # from the thresholds: a change to either must not reuse old results
+    version = f"{snapshot.model_version}/{embedding_model_id()}+risk@{LOW_RISK:g}-{HIGH_RISK:g}"
+    if baseline is not None:
+        # Either tier may decide, and which one does depends on the
+        # margin and the sparse-text cut-off
+        version += f"+cascade@{baseline.version}:m{CASCADE_MARGIN:g}:w{CASCADE_MIN_WORDS}"
+    return version
+
+
+def embedding_mismatch(snapshot) -> str | None:
+    """
+    Why the detector cannot score this process's embeddings, or None when
+    it was trained on exactly the embeddings this process produces. A
+    detector that does not record its embedding model id is refused too:
+    nothing says what it was trained on.
+    """
+    trained_on = snapshot.stats.get("embedding_model_id")
+    if trained_on == embedding_model_id():
+        return None
+    if trained_on is None:
+        return (
+            "The anomaly model does not record which embeddings it was trained on. "
+            "Retrain the reference model."
+        )
+    return (
+        f"The anomaly model was trained on {trained_on} embeddings but this "
+        f"process produces {embedding_model_id()}. Retrain the reference model."
+    )
+
+
+def current_model_version() -> str | None:
+    """
+    Version string run_ai_analysis would stamp on a result right now, or
+    None when no anomaly model is loaded.
+    """
+    snapshot = registry.get()
+    if snapshot is None:
+        return None
+    return _model_version(snapshot, _cascade_baseline())
+
+
+def warm_up_layoutlm() -> None:
+    tesseract_path = check_tools()["tesseract"]
+    if tesseract_path:
+        _configure_tesseract(tesseract_path)
+
+    from advanced.layoutlm_features import warm_up
+    from advanced.ocr_pool import get_ocr_pool
+
+    get_ocr_pool().warm_up()
+    warm_up()
+
+
+def _first_tier_analysis(snapshot, baseline, first_tier: dict) -> dict:
+    from advanced.cascade import first_tier_risk
+
+    score = first_tier["score"]
+    risk, review_required = first_tier_risk(first_tier)
+
+    explanations = [f"Text statistics: {deviation}." for deviation in first_tier["deviations"]]
+    if first_tier["distance_z"] >= HIGH_DISTANCE_Z:
+        explanations.append(
+            "The invoice's text statistics are far from those of previously verified invoices."
+        )
+    explanations.append(
+        "Scored from text statistics alone; the score was not close enough to a risk threshold to need layout analysis."
+    )
+
+    return {
+        "status": "ok",
+        "model_version": _model_version(snapshot, baseline),
+        "anomaly_score": float(round(score, 3)),
+        "risk_level": risk,
+        "review_required": review_required,
+        "embedding_distance": None,
+        "distance_z_score": float(round(first_tier["distance_z"], 2)),
+        "explanations": explanations
+    }
+
+
+def run_ai_analysis(
+    invoice_path: str,
+    file_hash: str | None = None,
+    doc: DocumentContext | None = None,
+    rules: dict | None = None,
+    cascade: bool = CASCADE_ENABLED
+) -> dict:
+    """
+    Scores an invoice. In cascade mode (AI_CASCADE=1) the text-statistics
+    model scores it first and LayoutLMv3 only runs when that score is
+    near a risk threshold, the text layer is too sparse or `rules` (the
+    rules stage result) is missing or did not pass every check.
+    cascade=False forces the full model (calibration compares against it).
+    """
+    snapshot = registry.get()
+    if snapshot is None:
         return {
             "status": "error",
-            "message": "Tesseract OCR is not installed. Run: brew install tesseract"
+            "message": "AI model files are missing. Train or copy saved_models first."
         }
 
-    if not shutil.which("pdftoppm"):
+    mismatch = embedding_mismatch(snapshot)
+    if mismatch:
+        return {"status": "error", "message": mismatch}
+
+    baseline = _cascade_baseline(cascade)
+    cascade_info = None
+    if baseline is not None:
+        from advanced.cascade import escalation_reason, score_first_tier
+
+        doc = doc or DocumentContext(invoice_path, file_hash=file_hash)
+        with timed("first_tier_scoring"):
+            first_tier = score_first_tier(baseline.detector, baseline.stats, doc.text)
+        reason = escalation_reason(first_tier["score"], first_tier["word_count"], rules)
+        cascade_info = {
+            "tier": "layoutlm" if reason else "baseline",
+            "escalation_reason": reason,
+            "first_tier_score": float(round(first_tier["score"], 3)),
+            "first_tier_model": baseline.model_version
+        }
+        if reason is None:
+            return {**_first_tier_analysis(snapshot, baseline, first_tier), "cascade": cascade_info}
+
+    tools = check_tools()
+    tesseract_path = tools["tesseract"]
+    # Born-digital PDFs use their text layer; Tesseract is only a hard
+    # requirement when OCR is forced for every invoice.
+    if not tesseract_path and TEXT_SOURCE == "ocr":
         return {
             "status": "error",
-            "message": "Poppler is not installed. Run: brew install poppler"
+            "message": "Tesseract OCR is not installed. Run: brew install tesseract"
         }
 
-    if not MODEL_PATH.exists() or not STATS_PATH.exists():
+    if not tools["pdftoppm"]:
         return {
             "status": "error",
-            "message": "AI model files are missing. Train or copy saved_models first."
+            "message": "Poppler is not installed. Run: brew install poppler"
         }
 
-    import pytesseract
     from advanced.pipeline_layoutlm import process_invoice_layoutlm
     from interpretation.explanation import compute_z_score, generate_explanations
     from interpretation.risk_policy import interpret_risk
 
-    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
-    with open(MODEL_PATH, "rb") as f:
-        detector = pickle.load(f)
-
-    with open(STATS_PATH, "r") as f:
-        stats = json.load(f)
+    if tesseract_path:
+        _configure_tesseract(tesseract_path)
 
     try:
-        embedding = process_invoice_layoutlm(invoice_path)
+        if file_hash is None and doc is not None:
+            file_hash = doc.file_hash
+        with timed("embedding"):
+            embedding = process_invoice_layoutlm(invoice_path, file_hash=file_hash)
     except Exception as exc:
         return {
             "status": "error",
             "message": f"AI analysis failed: {exc}"
         }
 
-    raw_score = detector.score(dict(enumerate(embedding)))
-    normalized_score = 1 / (1 + np.exp(-raw_score))
+    with timed("anomaly_scoring"):
+        raw_score = snapshot.detector.score(dict(enumerate(embedding)))
+        normalized_score = 1 / (1 + np.exp(-raw_score))
 
-    centroid = np.array(stats["centroid"])
-    distance = float(np.linalg.norm(embedding - centroid))
+        distance = float(np.linalg.norm(embedding - snapshot.centroid))
 
     distance_z = compute_z_score(
         distance,
-        stats["mean_distance"],
-        stats["std_distance"]
+        snapshot.mean_distance,
+        snapshot.std_distance
     )
 
     risk, review_required = interpret_risk(normalized_score)
 
-    if distance_z >= 2.5:
+    if distance_z >= HIGH_DISTANCE_Z:
         risk = "HIGH"
         review_required = True
 
@@ -77,10 +258,13 @@ def run_ai_analysis(invoice_path: str) -> dict:
 
     return {
         "status": "ok",
+        # e.g. layoutlmv3-isolation-forest@3f2a9c0d1b7e/microsoft/layoutlmv3-base:cls:page1:ocr:fp32:r3-300dpi+risk@0.4-0.7
+        "model_version": _model_version(snapshot, baseline),
         "anomaly_score": float(round(normalized_score, 3)),
         "risk_level": risk,
         "review_required": review_required,
         "embedding_distance": float(round(distance, 2)),
         "distance_z_score": float(round(distance_z, 2)),
-        "explanations": explanations
+        "explanations": explanations,
+        **({"cascade": cascade_info} if cascade_info else {})
     }
@@ -0,0 +1,433 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from conn_db import AsyncSessionLocal
+from extraction.document_context import DocumentContext
+from extraction.image_extractor import extract_image_content
+from extraction.pdf_extractor import extract_pdf_content
+from integrity.integrity_service import evaluate_integrity
+from integrity.vendor_identity_service import verify_vendor_identity
+from models.invoice import Invoice
+from models.vendor import Vendor
+from services.stage_graph import get_thread_pool
+from services.vendor_index import vendor_index
+from storage import InvoiceStore
+from utils.metrics import timed
+from utils.uploads import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, UploadTooLarge, StagedUpload, stage_upload
+
+# Files (multipart parts plus archive members) accepted per bulk request.
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "5000"))
+# Size cap for an uploaded ZIP archive (bytes).
+BULK_MAX_ARCHIVE_BYTES = int(os.getenv("BULK_MAX_ARCHIVE_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Files stored and integrity-checked at once; the rest wait their turn so a
+# month-end batch cannot take over the stage pool analysis shares.
+BULK_CONCURRENCY = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "4"))
+# Hashes per duplicate-check query.
+DEDUPE_CHUNK = 500
+
+EXTENSION_CATEGORIES = {
+    ".pdf": "pdf",
+    ".png": "image",
+    ".jpg": "image",
+    ".jpeg": "image"
+}
+ZIP_MIME_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkItem:
+    name: str
+    extension: str = ""
+    file_category: str | None = None
+    staged: StagedUpload | None = None
+    error: str | None = None
+
+
+def _is_archive(file: UploadFile) -> bool:
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    return extension == ".zip" or file.content_type in ZIP_MIME_TYPES
+
+
+def _stage_archive_members(archive_path: str, staging_dir: str, limit: int) -> list[BulkItem]:
+    """
+    Copies every supported member of a ZIP into its own staged file,
+    hashing on the way. Sizes are counted while decompressing, so a
+    member that lies about its size in the central directory still
+    cannot exceed MAX_UPLOAD_BYTES.
+    """
+    items = []
+
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if len(items) >= limit:
+                items.append(BulkItem(name=info.filename, error="Too many files in request"))
+                break
+
+            extension = os.path.splitext(info.filename)[1].lower()
+            category = EXTENSION_CATEGORIES.get(extension)
+            if category is None:
+                items.append(BulkItem(name=info.filename, error="Unsupported file type"))
+                continue
+
+            fd, temp_path = tempfile.mkstemp(dir=staging_dir, prefix=".upload-", suffix=extension)
+            sha256 = hashlib.sha256()
+            size = 0
+            try:
+                with os.fdopen(fd, "wb") as out, archive.open(info) as member:
+                    while chunk := member.read(UPLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_UPLOAD_BYTES:
+                            raise UploadTooLarge()
+                        sha256.update(chunk)
+                        out.write(chunk)
+            except UploadTooLarge:
+                os.unlink(temp_path)
+                items.append(BulkItem(
+                    name=info.filename,
+                    error=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit"
+                ))
+                continue
+            except Exception as exc:
+                os.unlink(temp_path)
+                items.append(BulkItem(name=info.filename, error=f"Unreadable archive member: {exc}"))
+                continue
+
+            items.append(BulkItem(
+                name=info.filename,
+                extension=extension,
+                file_category=category,
+                staged=StagedUpload(temp_path=temp_path, file_hash=sha256.hexdigest(), size=size)
+            ))
+
+    return items
+
+
+async def stage_bulk_files(files: list[UploadFile], store: InvoiceStore) -> list[BulkItem]:
+    """
+    Streams every part of a bulk request into the store's staging area.
+
+    This must finish inside the request handler: the multipart parts are
+    closed as soon as the handler returns, while the NDJSON body is still
+    being produced.
+    """
+    items: list[BulkItem] = []
+
+    for file in files:
+        name = file.filename or "unnamed"
+        if len(items) >= BULK_MAX_FILES:
+            items.append(BulkItem(name=name, error="Too many files in request"))
+            continue
+
+        if _is_archive(file):
+            try:
+                archive = await stage_upload(file, store.staging_dir, suffix=".zip", max_bytes=BULK_MAX_ARCHIVE_BYTES)
+            except UploadTooLarge:
+                items.append(BulkItem(
+                    name=name,
+                    error=f"Archive exceeds the {BULK_MAX_ARCHIVE_BYTES} byte limit"
+                ))
+                continue
+            try:
+                items += await run_in_threadpool(
+                    _stage_archive_members,
+                    archive.temp_path,
+                    store.staging_dir,
+                    BULK_MAX_FILES - len(items)
+                )
+            except zipfile.BadZipFile:
+                items.append(BulkItem(name=name, error="Invalid ZIP archive"))
+            finally:
+                archive.discard()
+            continue
+
+        extension = os.path.splitext(name)[1].lower()
+        category = EXTENSION_CATEGORIES.get(extension)
+        if category is None:
+            items.append(BulkItem(name=name, error="Unsupported file type"))
+            continue
+
+        try:
+            staged = await stage_upload(file, store.staging_dir, suffix=extension)
+        except UploadTooLarge:
+            items.append(BulkItem(
+                name=name,
+                error=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit"
+            ))
+            continue
+
+        if staged.size == 0:
+            staged.discard()
+            items.append(BulkItem(name=name, error="Empty file"))
+            continue
+
+        items.append(BulkItem(
+            name=name,
+            extension=extension,
+            file_category=category,
+            staged=staged
+        ))
+
+    return items
+
+
+async def _existing_hashes(db: AsyncSession, hashes: list[str]) -> dict[str, int]:
+    existing = {}
+    for start in range(0, len(hashes), DEDUPE_CHUNK):
+        chunk = hashes[start:start + DEDUPE_CHUNK]
+        rows = await db.execute(
+            select(Invoice.file_hash, Invoice.invoice_id).where(Invoice.file_hash.in_(chunk))
+        )
+        existing.update({file_hash: invoice_id for file_hash, invoice_id in rows})
+    return existing
+
+
+def _store_and_check(store: InvoiceStore, item: BulkItem) -> tuple[str, dict]:
+    """
+    Stores one file and runs extraction plus integrity on it. Runs on a
+    pool thread; pyhanko's async validation gets a private event loop.
+    """
+    file_path = store.put(item.staged.temp_path, item.staged.file_hash, item.extension)
+    local_path = store.local_path(file_path)
+    doc = DocumentContext(local_path, file_hash=item.staged.file_hash)
+
+    with timed("extraction"):
+        if item.file_category == "pdf":
+            _ = extract_pdf_content(local_path, doc=doc)
+        else:
+            _ = extract_image_content(local_path)
+
+    with timed("integrity"):
+        crypto_raw = asyncio.run(evaluate_integrity(
+            file_path=local_path,
+            file_type=item.file_category,
+            doc=doc
+        ))
+    return file_path, crypto_raw
+
+
+def _line(payload: dict) -> str:
+    return json.dumps(payload, default=str) + "\n"
+
+
+def _stored_line(item: BulkItem, invoice: Invoice, crypto: dict) -> dict:
+    return {
+        "file": item.name,
+        "status": "stored",
+        "invoice_id": invoice.invoice_id,
+        "file_hash": invoice.file_hash,
+        "file_type": item.file_category,
+        "crypto": crypto
+    }
+
+
+async def _commit_invoices(db: AsyncSession, pending: list[tuple[BulkItem, Invoice, dict]]) -> list[dict]:
+    """
+    Inserts a batch of invoices with one commit. If a concurrent upload
+    won the race for a hash, the batch is retried without the losers.
+    """
+    lines = []
+
+    db.add_all([invoice for _, invoice, _ in pending])
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        taken = await _existing_hashes(db, [invoice.file_hash for _, invoice, _ in pending])
+        for item, invoice, _ in pending:
+            if invoice.file_hash in taken:
+                lines.append({
+                    "file": item.name,
+                    "status": "duplicate",
+                    "file_hash": invoice.file_hash,
+                    "invoice_id": taken[invoice.file_hash]
+                })
+        pending = [entry for entry in pending if entry[1].file_hash not in taken]
+
+        # Insert the rest one by one, so a row that still fails only
+        # costs its own file rather than the whole stream
+        for item, invoice, crypto in pending:
+            file_hash = invoice.file_hash
+            db.add(invoice)
+            try:
+                await db.commit()
+            except IntegrityError as exc:
+                await db.rollback()
+                logger.warning("Bulk insert of %s failed: %s", item.name, exc.orig)
+                taken = await _existing_hashes(db, [file_hash])
+                if file_hash in taken:
+                    lines.append({
+                        "file": item.name,
+                        "status": "duplicate",
+                        "file_hash": file_hash,
+                        "invoice_id": taken[file_hash]
+                    })
+                else:
+                    lines.append({"file": item.name, "status": "error", "message": "Could not record invoice"})
+            else:
+                lines.append(_stored_line(item, invoice, crypto))
+        return lines
+
+    lines += [_stored_line(item, invoice, crypto) for item, invoice, crypto in pending]
+    return lines
+
+
+async def _bind_vendors(db: AsyncSession, results: list[tuple[BulkItem, str, dict]], vendors: dict) -> list[tuple[BulkItem, Invoice, dict]]:
+    """
+    Vendor binding for a batch of integrity results. Served from the
+    vendor index; until it has loaded, fingerprints not seen earlier in
+    the request are fetched with a single query.
+    """
+    unseen = {
+        crypto_raw.get("signer_fingerprint")
+        for _, _, crypto_raw in results
+        if crypto_raw.get("signer_fingerprint") and crypto_raw.get("signer_fingerprint") not in vendors
+    }
+    if unseen and not vendor_index.loaded:
+        found = (await db.execute(
+            select(Vendor).where(Vendor.public_key_fingerprint.in_(unseen))
+        )).scalars().all()
+        vendors.update({fingerprint: None for fingerprint in unseen})
+        vendors.update({vendor.public_key_fingerprint: vendor for vendor in found})
+
+    pending = []
+    for item, file_path, crypto_raw in results:
+        fingerprint = crypto_raw.get("signer_fingerprint")
+        vendor = None
+        if fingerprint:
+            vendor = vendor_index.get(fingerprint) if vendor_index.loaded else vendors.get(fingerprint)
+
+        vendor_result = verify_vendor_identity(
+            signature_integrity=crypto_raw["signature_integrity"],
+            certificate_trust=crypto_raw["certificate_trust"],
+            signer_fingerprint=fingerprint,
+            vendor=vendor
+        )
+        crypto = {**crypto_raw, **vendor_result}
+
+        invoice = Invoice(
+            file_path=file_path,
+            file_hash=item.staged.file_hash,
+            is_signed=crypto["signature_present"],
+            crypto_valid=(crypto["signature_integrity"] == "valid"),
+            signer_fingerprint=fingerprint,
+            status="uploaded"
+        )
+        pending.append((item, invoice, crypto))
+    return pending
+
+
+async def ingest_bulk(items: list[BulkItem], store: InvoiceStore) -> AsyncIterator[str]:
+    """
+    Stores, integrity-checks and inserts staged bulk items, yielding one
+    NDJSON line per file as soon as it is settled, then a summary line.
+
+    Duplicates (against the database and within the request) are found
+    with batched IN queries before any work is scheduled. Files that
+    finish together are inserted together with a single commit, so a busy
+    batch needs a handful of round trips rather than one per file.
+    """
+    summary = {"stored": 0, "duplicate": 0, "error": 0}
+    db = AsyncSessionLocal()
+    tasks: dict[asyncio.Future, BulkItem] = {}
+    # (item, pool future) for every file handed to a pool thread
+    submitted: list[tuple[BulkItem, Future]] = []
+
+    def emit(payload: dict) -> str:
+        summary[payload["status"]] += 1
+        return _line(payload)
+
+    try:
+        # 🔁 Dedupe in bulk before touching storage
+        staged = [item for item in items if item.staged is not None]
+        existing = await _existing_hashes(
+            db, sorted({item.staged.file_hash for item in staged})
+        )
+
+        seen: dict[str, str] = {}
+        work = []
+        for item in items:
+            if item.staged is None:
+                yield emit({"file": item.name, "status": "error", "message": item.error})
+                continue
+
+            file_hash = item.staged.file_hash
+            if file_hash in existing or file_hash in seen:
+                item.staged.discard()
+                yield emit({
+                    "file": item.name,
+                    "status": "duplicate",
+                    "file_hash": file_hash,
+                    "invoice_id": existing.get(file_hash),
+                    "duplicate_of": seen.get(file_hash)
+                })
+                continue
+
+            seen[file_hash] = item.name
+            work.append(item)
+
+        # ⚙️ Store + integrity on the shared pool, at most BULK_CONCURRENCY at once
+        limit = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def process(item: BulkItem):
+            async with limit:
+                future = get_thread_pool().submit(_store_and_check, store, item)
+                submitted.append((item, future))
+                file_path, crypto_raw = await asyncio.wrap_future(future)
+            return item, file_path, crypto_raw
+
+        tasks.update({asyncio.ensure_future(process(item)): item for item in work})
+        vendors: dict = {}
+
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+            finished = []
+            for task in done:
+                item = tasks.pop(task)
+                try:
+                    finished.append(task.result())
+                except Exception as exc:
+                    logger.exception("Bulk ingest of %s failed", item.name)
+                    item.staged.discard()
+                    yield emit({"file": item.name, "status": "error", "message": str(exc)})
+
+            if not finished:
+                continue
+
+            pending = await _bind_vendors(db, finished, vendors)
+            for payload in await _commit_invoices(db, pending):
+                yield emit(payload)
+
+        yield _line({"summary": summary})
+    finally:
+        # Client went away mid-stream: files still waiting never start, and
+        # a file a pool thread is storing is only dropped once it is done
+        for task in tasks:
+            task.cancel()
+        busy = set()
+        for item, future in submitted:
+            if not future.cancel() and not future.done():
+                busy.add(id(item))
+                future.add_done_callback(lambda _, staged=item.staged: staged.discard())
+        for item in items:
+            if item.staged is not None and id(item) not in busy:
+                item.staged.discard()
+        await db.close()
@@ -0,0 +1,333 @@
+import os
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from extraction.document_context import DocumentContext
+from integrity.integrity_service import evaluate_integrity
+from integrity.vendor_identity_service import verify_vendor_identity
+from models.analysis_result import AnalysisResult
+from models.invoice import Invoice
+from services.analysis_service import CASCADE_ENABLED, current_model_version, run_ai_analysis
+from services.model_registry import MODEL_FAMILY
+from services.rules_service import RULES_VERSION, run_rules_checks
+from services.stage_graph import Stage, StageResult, run_stage_graph
+from services.stage_policy import (
+    RUN,
+    STAGE_POLICY_ENABLED,
+    decide_stages,
+    flagged_before,
+    policy_failure,
+    policy_outcome,
+    stage_action
+)
+from services.vendor_index import lookup_vendor
+from storage import resolve_local_path
+
+# Per-stage time budgets (seconds). A stage that overruns is reported as
+# "timeout" and the rest of the analysis is still returned.
+INTEGRITY_TIMEOUT = float(os.getenv("ANALYZE_INTEGRITY_TIMEOUT", "30"))
+AI_TIMEOUT = float(os.getenv("ANALYZE_AI_TIMEOUT", "120"))
+RULES_TIMEOUT = float(os.getenv("ANALYZE_RULES_TIMEOUT", "30"))
+
+RISK_PREDICTIONS = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+# StageResult statuses of a stage that produced no result
+STAGE_FAILURES = ("error", "timeout", "skipped")
+
+
+def _stage_failure(result: StageResult, stage: str) -> dict:
+    return {
+        "status": result.status,
+        "message": result.error or f"{stage} stage did not complete"
+    }
+
+
+def _not_supported(kind: str) -> dict:
+    return {
+        "status": "not_supported",
+        "message": f"{kind} analysis is only available for PDF invoices."
+    }
+
+
+def invoice_file_type(invoice: Invoice) -> str:
+    extension = os.path.splitext(invoice.file_path)[1].lower()
+    return "pdf" if extension == ".pdf" else "image"
+
+
+def serialize_analysis(invoice: Invoice, analysis: AnalysisResult) -> dict:
+    """
+    Rebuilds the analyze response body from a stored AnalysisResult.
+    """
+    return {
+        "invoice_id": invoice.invoice_id,
+        "analysis_id": analysis.id,
+        "file_type": invoice_file_type(invoice),
+        "model_version": analysis.model_version,
+        "rules_version": analysis.rules_version,
+        "created_at": analysis.created_at,
+        "crypto": analysis.crypto_json,
+        "ai": analysis.ai_json,
+        "rules": analysis.rules_json,
+        "stage_decisions": analysis.stage_decisions
+    }
+
+
+def _hot_columns(crypto: dict, ai_result: dict, rules_result: dict) -> dict:
+    """
+    Fields promoted out of the JSON documents into indexed columns.
+    """
+    checks = rules_result.get("checks") or {}
+    return {
+        "risk_level": ai_result.get("risk_level"),
+        "review_required": ai_result.get("review_required"),
+        "anomaly_score": ai_result.get("anomaly_score"),
+        "signer_identity": crypto.get("signer_identity"),
+        "rules_status": rules_result.get("status"),
+        "subtotal_matches_items": checks.get("subtotal_matches_items"),
+        "total_matches_subtotal_tax": checks.get("total_matches_subtotal_tax")
+    }
+
+
+async def supersede_analyses(db: AsyncSession, invoice_ids: list[int]) -> None:
+    """
+    Clears is_latest on the current analyses of these invoices; call in
+    the transaction that inserts their replacements.
+    """
+    await db.execute(
+        update(AnalysisResult)
+        .where(
+            AnalysisResult.invoice_id.in_(invoice_ids),
+            AnalysisResult.is_latest.is_(True)
+        )
+        .values(is_latest=False)
+    )
+
+
+async def find_reusable_analysis(db: AsyncSession, invoice: Invoice) -> AnalysisResult | None:
+    """
+    Latest stored analysis of these exact bytes by the currently loaded
+    model and rules, if any. Results whose AI stage failed carry the bare
+    model family as their version and are never reused, nor are those
+    whose rules stage failed. Integrity and vendor binding are not part
+    of the key: reuse_analysis recomputes them.
+    """
+    model_version = current_model_version()
+    if model_version is None:
+        return None
+
+    result = await db.execute(
+        select(AnalysisResult)
+        .where(
+            AnalysisResult.file_hash == invoice.file_hash,
+            AnalysisResult.model_version == model_version,
+            AnalysisResult.rules_version == RULES_VERSION,
+            AnalysisResult.rules_status.notin_(STAGE_FAILURES)
+        )
+        .order_by(AnalysisResult.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+def _crypto_stages(db: AsyncSession, doc: DocumentContext, file_type: str) -> list[Stage]:
+    file_path = doc.file_path
+
+    async def integrity(_):
+        return await evaluate_integrity(
+            file_path=file_path,
+            file_type=file_type,
+            doc=doc
+        )
+
+    async def vendor_identity(inputs):
+        crypto_raw = inputs["integrity"]
+        fingerprint = crypto_raw.get("signer_fingerprint")
+        vendor = await lookup_vendor(db, fingerprint)
+
+        vendor_result = verify_vendor_identity(
+            signature_integrity=crypto_raw["signature_integrity"],
+            certificate_trust=crypto_raw["certificate_trust"],
+            signer_fingerprint=fingerprint,
+            vendor=vendor
+        )
+
+        return {
+            **crypto_raw,
+            **vendor_result
+        }
+
+    return [
+        Stage("integrity", integrity, executor="async", timeout=INTEGRITY_TIMEOUT),
+        Stage("vendor", vendor_identity, deps=("integrity",), executor="async")
+    ]
+
+
+def _crypto_result(results: dict[str, StageResult]) -> dict:
+    vendor_stage = results["vendor"]
+    if vendor_stage.ok:
+        return vendor_stage.value
+    if not results["integrity"].ok:
+        return _stage_failure(results["integrity"], "integrity")
+    return {
+        **results["integrity"].value,
+        **_stage_failure(vendor_stage, "vendor")
+    }
+
+
+def build_analysis_stages(
+    db: AsyncSession,
+    invoice: Invoice,
+    doc: DocumentContext,
+    file_type: str,
+    allow_defer: bool = False
+) -> list[Stage]:
+    file_path = doc.file_path
+    stages = _crypto_stages(db, doc, file_type)
+
+    if file_type != "pdf":
+        return stages
+
+    async def policy(inputs):
+        flagged = await flagged_before(db, invoice.file_hash)
+        return decide_stages(inputs["vendor"], inputs["rules"], flagged, allow_defer)
+
+    def ai(inputs):
+        decisions = inputs.get("policy")
+        if stage_action(decisions, "ai") != RUN:
+            return policy_outcome(decisions, "ai")
+        return run_ai_analysis(file_path, doc=doc, rules=inputs.get("rules"))
+
+    # AI waits for the (millisecond) rules stage in cascade mode, where
+    # failed checks escalate to LayoutLMv3, and for the policy's verdict.
+    # Soft dependencies: if either fails, AI still runs.
+    ai_inputs = ("rules",) if CASCADE_ENABLED else ()
+
+    stages.append(Stage(
+        "rules",
+        lambda _: run_rules_checks(file_path, doc=doc),
+        executor="thread",
+        timeout=RULES_TIMEOUT
+    ))
+    if STAGE_POLICY_ENABLED:
+        stages.append(Stage("policy", policy, soft_deps=("vendor", "rules"), executor="async"))
+        ai_inputs += ("policy",)
+    stages.append(Stage("ai", ai, soft_deps=ai_inputs, executor="thread", timeout=AI_TIMEOUT))
+
+    return stages
+
+
+async def build_analysis_result(db: AsyncSession, invoice: Invoice, allow_defer: bool = False) -> AnalysisResult:
+    """
+    Runs integrity, vendor binding, AI and rules for a stored invoice and
+    returns an unsaved AnalysisResult, so batch callers can insert many
+    at once.
+
+    Integrity -> vendor is the only dependency chain (plus rules -> AI in
+    cascade mode, and vendor + rules -> policy -> AI with the stage policy
+    on); AI and rules run concurrently with it on the stage thread pool.
+    `allow_defer` lets the policy defer stages to the job queue; the
+    caller enqueues them.
+    """
+    file_type = invoice_file_type(invoice)
+
+    doc = DocumentContext(
+        resolve_local_path(invoice.file_path),
+        file_hash=invoice.file_hash
+    )
+
+    results = await run_stage_graph(
+        build_analysis_stages(db, invoice, doc, file_type, allow_defer)
+    )
+
+    crypto = _crypto_result(results)
+
+    if file_type == "pdf":
+        ai_result = results["ai"].value if results["ai"].ok else _stage_failure(results["ai"], "ai")
+        rules_result = results["rules"].value if results["rules"].ok else _stage_failure(results["rules"], "rules")
+    else:
+        ai_result = _not_supported("AI")
+        rules_result = _not_supported("Rules")
+
+    stage_decisions = None
+    if "policy" in results:
+        policy_stage = results["policy"]
+        stage_decisions = policy_stage.value if policy_stage.ok else policy_failure(policy_stage.error)
+
+    prediction = -1
+    confidence = 0.0
+    model_version = ai_result.get("model_version") or MODEL_FAMILY
+
+    if ai_result.get("status") == "ok":
+        prediction = RISK_PREDICTIONS.get(ai_result.get("risk_level"), prediction)
+        confidence = float(ai_result.get("anomaly_score") or confidence)
+
+    vendor = await lookup_vendor(db, crypto.get("signer_fingerprint"))
+
+    return AnalysisResult(
+        invoice_id=invoice.invoice_id,
+        prediction=prediction,
+        confidence=confidence,
+        model_version=model_version,
+        file_hash=invoice.file_hash,
+        rules_version=RULES_VERSION,
+        crypto_json=crypto,
+        ai_json=ai_result,
+        rules_json=rules_result,
+        is_latest=True,
+        vendor_id=vendor.vendor_id if vendor else None,
+        stage_decisions=stage_decisions,
+        **_hot_columns(crypto, ai_result, rules_result)
+    )
+
+
+async def analyze_invoice_record(db: AsyncSession, invoice: Invoice, allow_defer: bool = False) -> dict:
+    """
+    Analyzes a stored invoice, persists the AnalysisResult and returns
+    the API response body.
+    """
+    analysis = await build_analysis_result(db, invoice, allow_defer)
+    await supersede_analyses(db, [invoice.invoice_id])
+    db.add(analysis)
+    await db.commit()
+
+    return serialize_analysis(invoice, analysis)
+
+
+async def reuse_analysis(db: AsyncSession, invoice: Invoice, analysis: AnalysisResult) -> dict:
+    """
+    Serves a reusable analysis with integrity and vendor binding
+    recomputed, since the vendor registry (or a transient failure) may
+    have changed them. A changed outcome is stored as a new analysis
+    carrying the reused AI and rules results.
+    """
+    doc = DocumentContext(
+        resolve_local_path(invoice.file_path),
+        file_hash=invoice.file_hash
+    )
+    results = await run_stage_graph(_crypto_stages(db, doc, invoice_file_type(invoice)))
+    crypto = _crypto_result(results)
+    if crypto == analysis.crypto_json:
+        return serialize_analysis(invoice, analysis)
+
+    vendor = await lookup_vendor(db, crypto.get("signer_fingerprint"))
+    refreshed = AnalysisResult(
+        invoice_id=invoice.invoice_id,
+        prediction=analysis.prediction,
+        confidence=analysis.confidence,
+        model_version=analysis.model_version,
+        file_hash=invoice.file_hash,
+        rules_version=analysis.rules_version,
+        crypto_json=crypto,
+        ai_json=analysis.ai_json,
+        rules_json=analysis.rules_json,
+        is_latest=True,
+        vendor_id=vendor.vendor_id if vendor else None,
+        stage_decisions=analysis.stage_decisions,
+        **_hot_columns(crypto, analysis.ai_json, analysis.rules_json)
+    )
+    await supersede_analyses(db, [invoice.invoice_id])
+    db.add(refreshed)
+    await db.commit()
+
+    return serialize_analysis(invoice, refreshed)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conn_db import AsyncSessionLocal
+from models.analysis_job import AnalysisJob
+from models.invoice import Invoice
+from services.invoice_analysis import analyze_invoice_record
+from services.readiness import is_ready
+
+# Number of jobs this API process analyzes concurrently (0 disables the
+# local workers, e.g. for a dedicated ingest-only deployment).
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Idle workers re-check the table at this interval; local enqueues wake
+# them immediately.
+POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_SECONDS", "2"))
+# A "running" job older than this is assumed orphaned by a dead worker.
+STALE_AFTER = float(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "900"))
+MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+
+logger = logging.getLogger(__name__)
+
+_wakeup: asyncio.Event | None = None
+_workers: list[asyncio.Task] = []
+
+
+async def enqueue_analysis(db: AsyncSession, invoice_id: int) -> AnalysisJob:
+    job = AnalysisJob(invoice_id=invoice_id, status="queued")
+    db.add(job)
+    await db.commit()
+
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+async def enqueue_analyses(db: AsyncSession, invoice_ids: list[int]) -> None:
+    """
+    Queues many jobs with a single INSERT round trip and commit.
+    """
+    db.add_all([
+        AnalysisJob(invoice_id=invoice_id, status="queued")
+        for invoice_id in invoice_ids
+    ])
+    await db.commit()
+
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def fail_exhausted_jobs(db: AsyncSession, stale_before: datetime) -> None:
+    """
+    Marks orphaned "running" jobs that already used every attempt as
+    failed; claim_next_job will never hand them out again.
+    """
+    await db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.status == "running",
+            AnalysisJob.started_at < stale_before,
+            AnalysisJob.attempts >= MAX_ATTEMPTS
+        )
+        .values(
+            status="failed",
+            error=f"Worker lost after {MAX_ATTEMPTS} attempts",
+            finished_at=datetime.utcnow()
+        )
+    )
+
+
+async def claim_next_job(db: AsyncSession) -> AnalysisJob | None:
+    """
+    Atomically moves the oldest runnable job to "running".
+
+    FOR UPDATE SKIP LOCKED lets any number of workers, in any number of
+    API processes, poll the same table without handing out a job twice.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=STALE_AFTER)
+    await fail_exhausted_jobs(db, stale_before)
+
+    result = await db.execute(
+        select(AnalysisJob)
+        .where(
+            or_(
+                AnalysisJob.status == "queued",
+                (AnalysisJob.status == "running") & (AnalysisJob.started_at < stale_before)
+            ),
+            AnalysisJob.attempts < MAX_ATTEMPTS
+        )
+        .order_by(AnalysisJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalars().first()
+
+    if job is None:
+        # Keep the sweep
+        await db.commit()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = datetime.utcnow()
+    await db.commit()
+    return job
+
+
+async def run_job(db: AsyncSession, job: AnalysisJob) -> None:
+    invoice = await db.get(Invoice, job.invoice_id)
+
+    try:
+        if invoice is None:
+            raise LookupError("Invoice not found")
+        result = await analyze_invoice_record(db, invoice)
+    except Exception as exc:
+        logger.exception("Analysis job %s failed", job.id)
+        await db.rollback()
+        job.status = "failed"
+        job.error = str(exc)
+    else:
+        job.status = "done"
+        job.analysis_id = result["analysis_id"]
+        job.error = None
+
+    job.finished_at = datetime.utcnow()
+    await db.commit()
+
+
+async def _worker_loop(worker_id: int) -> None:
+    while True:
+        if not is_ready("database"):
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await claim_next_job(db)
+                if job is not None:
+                    await run_job(db, job)
+                    continue
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Analysis worker %s crashed while polling", worker_id)
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), POLL_INTERVAL)
+            _wakeup.clear()
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_workers() -> None:
+    global _wakeup
+    if _workers or ANALYSIS_WORKERS <= 0:
+        return
+
+    _wakeup = asyncio.Event()
+    for worker_id in range(ANALYSIS_WORKERS):
+        _workers.append(asyncio.create_task(_worker_loop(worker_id)))
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+AI_PIPELINE_DIR = Path(__file__).resolve().parents[2] / "ai_pipeline"
+MODEL_DIR = AI_PIPELINE_DIR / "saved_models"
+MODEL_PATH = MODEL_DIR / "anomaly_model.pkl"
+STATS_PATH = MODEL_DIR / "embedding_stats.json"
+# First tier of the scoring cascade (advanced.cascade)
+BASELINE_MODEL_PATH = MODEL_DIR / "baseline_model.pkl"
+BASELINE_STATS_PATH = MODEL_DIR / "baseline_stats.json"
+
+MODEL_FAMILY = "layoutlmv3-isolation-forest"
+BASELINE_FAMILY = "text-stats-isolation-forest"
+
+# How often (seconds) the artifact files are re-stat'ed for changes.
+RELOAD_CHECK_INTERVAL = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    detector: object
+    centroid: np.ndarray
+    mean_distance: float
+    std_distance: float
+    stats: dict
+    version: str
+    file_signature: tuple = field(repr=False)
+
+    @property
+    def model_version(self) -> str:
+        return f"{MODEL_FAMILY}@{self.version}"
+
+
+@dataclass(frozen=True)
+class BaselineSnapshot:
+    detector: object
+    stats: dict
+    version: str
+    file_signature: tuple = field(repr=False)
+
+    @property
+    def model_version(self) -> str:
+        return f"{BASELINE_FAMILY}@{self.version}"
+
+
+def _file_signature(*paths: Path) -> Optional[tuple]:
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _read_artifacts(model_path: Path, stats_path: Path) -> tuple:
+    model_bytes = model_path.read_bytes()
+    stats_bytes = stats_path.read_bytes()
+
+    digest = hashlib.sha256()
+    digest.update(model_bytes)
+    digest.update(stats_bytes)
+
+    return pickle.loads(model_bytes), json.loads(stats_bytes), digest.hexdigest()[:12]
+
+
+def _load_snapshot(model_path: Path, stats_path: Path, signature: tuple) -> ModelSnapshot:
+    detector, stats, version = _read_artifacts(model_path, stats_path)
+
+    centroid = np.asarray(stats["centroid"], dtype=np.float64)
+    centroid.setflags(write=False)
+
+    return ModelSnapshot(
+        detector=detector,
+        centroid=centroid,
+        mean_distance=float(stats["mean_distance"]),
+        std_distance=float(stats["std_distance"]),
+        stats=stats,
+        version=version,
+        file_signature=signature
+    )
+
+
+def _load_baseline_snapshot(model_path: Path, stats_path: Path, signature: tuple) -> BaselineSnapshot:
+    detector, stats, version = _read_artifacts(model_path, stats_path)
+
+    missing = [key for key in ("centroid", "scale", "mean_distance", "std_distance") if key not in stats]
+    if missing:
+        # Trained before the distance override; scoring without it would
+        # let structurally odd invoices through the first tier
+        raise ValueError(f"First-tier stats lack {', '.join(missing)}; retrain with --baseline-only")
+
+    return BaselineSnapshot(
+        detector=detector,
+        stats=stats,
+        version=version,
+        file_signature=signature
+    )
+
+
+class ModelRegistry:
+    """
+    Keeps the anomaly detector and embedding statistics resident in memory.
+
+    Artifacts are loaded once and swapped atomically for a new snapshot when
+    the files on disk change, so readers always see a consistent
+    detector/stats pair. `loader` turns the two files into a snapshot.
+    """
+
+    def __init__(self, model_path: Path = MODEL_PATH, stats_path: Path = STATS_PATH, loader=_load_snapshot):
+        self.model_path = Path(model_path)
+        self.stats_path = Path(stats_path)
+        self._loader = loader
+        self._snapshot: Optional[ModelSnapshot] = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    def get(self) -> Optional[ModelSnapshot]:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return snapshot
+
+        self._last_check = now
+        signature = _file_signature(self.model_path, self.stats_path)
+        if signature is None:
+            return snapshot
+        if snapshot is not None and snapshot.file_signature == signature:
+            return snapshot
+
+        return self._reload(signature)
+
+    def _reload(self, signature: tuple) -> Optional[ModelSnapshot]:
+        with self._lock:
+            current = self._snapshot
+            if current is not None and current.file_signature == signature:
+                return current
+
+            try:
+                snapshot = self._loader(self.model_path, self.stats_path, signature)
+            except Exception:
+                # A half-written artifact must not take down a working model.
+                logger.exception("Failed to load model artifacts; keeping previous version")
+                return current
+
+            self._snapshot = snapshot
+            logger.info("Loaded anomaly model %s", snapshot.model_version)
+            return snapshot
+
+
+_tool_paths: Optional[dict] = None
+_tool_lock = threading.Lock()
+
+
+def check_tools() -> dict:
+    """
+    Resolves the external binaries needed for AI analysis once per process.
+    """
+    global _tool_paths
+    if _tool_paths is None:
+        with _tool_lock:
+            if _tool_paths is None:
+                _tool_paths = {
+                    "tesseract": os.getenv("TESSERACT_CMD") or shutil.which("tesseract"),
+                    "pdftoppm": shutil.which("pdftoppm"),
+                    "pdftotext": shutil.which("pdftotext")
+                }
+    return _tool_paths
+
+
+registry = ModelRegistry()
+baseline_registry = ModelRegistry(BASELINE_MODEL_PATH, BASELINE_STATS_PATH, loader=_load_baseline_snapshot)
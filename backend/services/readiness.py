@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from conn_db import engine
+from services.schema import upgrade_schema
+
+# Create/upgrade the schema during warm-up (disable when migrations
+# are managed elsewhere).
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "1") == "1"
+# Load LayoutLMv3 and run a dummy inference during warm-up.
+WARMUP_LAYOUTLM = os.getenv("WARMUP_LAYOUTLM", "1") == "1"
+# Delay between database connection attempts while it is unreachable.
+DB_RETRY_SECONDS = float(os.getenv("DB_RETRY_SECONDS", "5"))
+
+# Postgres advisory lock key every worker takes around the schema upgrade
+SCHEMA_LOCK_KEY = 0x7665726970
+
+logger = logging.getLogger(__name__)
+
+SUBSYSTEMS = ("database", "vendor_index", "tools", "anomaly_model", "layoutlm")
+
+_state = {
+    name: {"status": "pending", "detail": None, "elapsed_ms": None}
+    for name in SUBSYSTEMS
+}
+_state_lock = threading.Lock()
+_warmup_threads: list[threading.Thread] = []
+
+
+def _set(name: str, status: str, detail: str | None = None, elapsed: float | None = None) -> None:
+    with _state_lock:
+        _state[name] = {
+            "status": status,
+            "detail": detail,
+            "elapsed_ms": round(elapsed * 1000, 1) if elapsed is not None else None
+        }
+
+
+def is_ready(name: str) -> bool:
+    with _state_lock:
+        return _state[name]["status"] in ("ready", "skipped")
+
+
+def readiness_report() -> dict:
+    with _state_lock:
+        subsystems = {name: dict(state) for name, state in _state.items()}
+    ready = all(state["status"] in ("ready", "skipped") for state in subsystems.values())
+    return {"ready": ready, "subsystems": subsystems}
+
+
+def _check(name: str, fn) -> None:
+    started = time.perf_counter()
+    _set(name, "loading")
+    try:
+        outcome = fn()
+    except Exception as exc:
+        logger.exception("Warm-up of %s failed", name)
+        _set(name, "failed", str(exc), time.perf_counter() - started)
+        return
+
+    status, detail = outcome if isinstance(outcome, tuple) else ("ready", outcome)
+    _set(name, status, detail, time.perf_counter() - started)
+
+
+@contextmanager
+def _schema_lock():
+    """
+    Serializes the schema upgrade across worker processes (and hosts):
+    concurrent CREATE TABLE / ALTER TABLE race on the catalog. Waiters
+    find the work done and return immediately.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+
+    with engine.connect() as conn:
+        # Waiting out another worker's upgrade is not a slow statement
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+def _warm_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    if DB_CREATE_ALL:
+        with _schema_lock():
+            upgrade_schema(engine)
+    return None
+
+
+def _warm_vendor_index():
+    from services.vendor_index import start_vendor_index
+
+    return f"{start_vendor_index()} vendors"
+
+
+def _warm_tools():
+    from services.model_registry import check_tools
+
+    tools = check_tools()
+    missing = [name for name, path in tools.items() if not path]
+    if missing:
+        # Analysis still degrades gracefully; report rather than block.
+        return "ready", f"missing: {', '.join(missing)}"
+    return None
+
+
+def _warm_anomaly_model():
+    from services.analysis_service import CASCADE_ENABLED, embedding_mismatch
+    from services.model_registry import baseline_registry, registry
+
+    snapshot = registry.get()
+    if snapshot is None:
+        raise RuntimeError("AI model files are missing. Train or copy saved_models first.")
+    mismatch = embedding_mismatch(snapshot)
+    if mismatch:
+        raise RuntimeError(mismatch)
+    if CASCADE_ENABLED:
+        baseline = baseline_registry.get()
+        if baseline is None:
+            # Analysis still works, just without the cheap first tier
+            return "ready", f"{snapshot.model_version}; cascade off: baseline model missing"
+        return f"{snapshot.model_version}; cascade first tier {baseline.model_version}"
+    return snapshot.model_version
+
+
+def _warm_layoutlm():
+    if not WARMUP_LAYOUTLM:
+        return "skipped", "WARMUP_LAYOUTLM=0"
+
+    from services.analysis_service import warm_up_layoutlm
+
+    warm_up_layoutlm()
+    return None
+
+
+def _warm_up_database() -> None:
+    # Keep retrying: the API may well boot before Postgres does.
+    while True:
+        _check("database", _warm_database)
+        if is_ready("database"):
+            _check("vendor_index", _warm_vendor_index)
+            return
+        time.sleep(DB_RETRY_SECONDS)
+
+
+def _warm_up_models() -> None:
+    _check("tools", _warm_tools)
+    _check("anomaly_model", _warm_anomaly_model)
+    _check("layoutlm", _warm_layoutlm)
+
+
+def start_warm_up() -> None:
+    """
+    Warms every subsystem on background threads so the worker starts
+    accepting connections immediately; /ready reports progress.
+    """
+    if _warmup_threads:
+        return
+
+    for target, name in ((_warm_up_database, "warm-up-db"), (_warm_up_models, "warm-up-models")):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        _warmup_threads.append(thread)
+        thread.start()
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conn_db import AsyncSessionLocal
+from models.analysis_result import AnalysisResult
+from models.invoice import Invoice
+from services.invoice_analysis import build_analysis_result, supersede_analyses
+from services.job_queue import enqueue_analyses
+
+# Invoices analyzed concurrently. Their AI stages meet in the LayoutLM
+# micro-batcher, so this is also the effective embedding batch size.
+REANALYZE_CONCURRENCY = int(os.getenv("REANALYZE_CONCURRENCY", "8"))
+# Invoices per page; each page is one SELECT and one bulk INSERT + commit,
+# and the checkpoint advances page by page.
+REANALYZE_BATCH_SIZE = int(os.getenv("REANALYZE_BATCH_SIZE", "100"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReanalysisFilter:
+    status: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    # Only invoices whose latest analysis was produced by this model version
+    model_version: str | None = None
+
+    def to_json(self) -> dict:
+        return {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in asdict(self).items()
+        }
+
+
+async def select_invoices(db: AsyncSession, filters: ReanalysisFilter, after_id: int = 0, limit: int = REANALYZE_BATCH_SIZE) -> list[Invoice]:
+    """
+    Next page of matching invoices in invoice_id order (keyset, so pages
+    stay cheap however deep into the archive the run is).
+    """
+    query = select(Invoice).where(Invoice.invoice_id > after_id)
+
+    if filters.status:
+        query = query.where(Invoice.status == filters.status)
+    if filters.created_from:
+        query = query.where(Invoice.created_at >= filters.created_from)
+    if filters.created_to:
+        query = query.where(Invoice.created_at < filters.created_to)
+
+    if filters.model_version:
+        latest = (
+            select(func.max(AnalysisResult.id).label("id"))
+            .group_by(AnalysisResult.invoice_id)
+            .subquery()
+        )
+        query = (
+            query.join(AnalysisResult, AnalysisResult.invoice_id == Invoice.invoice_id)
+            .join(latest, latest.c.id == AnalysisResult.id)
+            .where(AnalysisResult.model_version == filters.model_version)
+        )
+
+    result = await db.execute(query.order_by(Invoice.invoice_id).limit(limit))
+    return list(result.scalars().all())
+
+
+def load_checkpoint(path: str, filters: ReanalysisFilter) -> dict:
+    if not os.path.exists(path):
+        return {"last_invoice_id": 0, "processed": 0, "failed": 0, "failed_ids": []}
+
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("filters") != filters.to_json():
+        raise ValueError(
+            f"Checkpoint {path} was written for different filters; "
+            "delete it or pass a new --checkpoint path"
+        )
+    return checkpoint
+
+
+def save_checkpoint(path: str, filters: ReanalysisFilter, state: dict) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({**state, "filters": filters.to_json()}, f, indent=2)
+    os.replace(temp_path, path)
+
+
+async def _analyze_page(invoices: list[Invoice], concurrency: int) -> tuple[list[AnalysisResult], list[int]]:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def analyze(invoice: Invoice):
+        # An AsyncSession runs one statement at a time, so each concurrent
+        # analysis gets its own for the vendor lookup
+        async with limit, AsyncSessionLocal() as db:
+            return await build_analysis_result(db, invoice)
+
+    outcomes = await asyncio.gather(
+        *(analyze(invoice) for invoice in invoices),
+        return_exceptions=True
+    )
+
+    results, failed = [], []
+    for invoice, outcome in zip(invoices, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Re-analysis of invoice %s failed: %s", invoice.invoice_id, outcome)
+            failed.append(invoice.invoice_id)
+        else:
+            results.append(outcome)
+    return results, failed
+
+
+async def reanalyze(
+    db: AsyncSession,
+    filters: ReanalysisFilter,
+    checkpoint_path: str | None = None,
+    batch_size: int = REANALYZE_BATCH_SIZE,
+    concurrency: int = REANALYZE_CONCURRENCY,
+    progress=None
+) -> dict:
+    """
+    Re-scores every invoice matching `filters`, a page at a time.
+
+    Each page is analyzed concurrently, its AnalysisResult rows are
+    inserted with a single commit, and only then is the checkpoint moved
+    past it - an interrupted run resumes at the first unfinished page.
+    Embeddings are served from the embedding store when only the
+    detector or thresholds changed, so a re-score mostly costs rules and
+    scoring.
+    """
+    state = (
+        load_checkpoint(checkpoint_path, filters)
+        if checkpoint_path else
+        {"last_invoice_id": 0, "processed": 0, "failed": 0, "failed_ids": []}
+    )
+    started = time.perf_counter()
+
+    while True:
+        invoices = await select_invoices(db, filters, state["last_invoice_id"], batch_size)
+        if not invoices:
+            break
+
+        last_invoice_id = invoices[-1].invoice_id
+        results, failed = await _analyze_page(invoices, concurrency)
+
+        if results:
+            await supersede_analyses(db, [result.invoice_id for result in results])
+        db.add_all(results)
+        await db.commit()
+
+        state["last_invoice_id"] = last_invoice_id
+        state["processed"] += len(results)
+        state["failed"] += len(failed)
+        state["failed_ids"] += failed
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, filters, state)
+
+        # Drop the page's ORM objects; a full archive does not fit the identity map
+        db.expunge_all()
+
+        if progress:
+            progress(state, time.perf_counter() - started)
+
+    return {**state, "elapsed_seconds": round(time.perf_counter() - started, 1)}
+
+
+async def enqueue_reanalysis(db: AsyncSession, filters: ReanalysisFilter, batch_size: int = 1000) -> int:
+    """
+    Queues an analysis job for every matching invoice, a page of rows per
+    INSERT. The analysis workers then drain them like any async analyze.
+    """
+    queued = 0
+    after_id = 0
+
+    while True:
+        invoices = await select_invoices(db, filters, after_id, batch_size)
+        if not invoices:
+            break
+
+        invoice_ids = [invoice.invoice_id for invoice in invoices]
+        await enqueue_analyses(db, invoice_ids)
+
+        queued += len(invoice_ids)
+        after_id = invoice_ids[-1]
+        db.expunge_all()
+
+    return queued
@@ -1,7 +1,7 @@
 import re
-from typing import Optional, Tuple
+from typing import Optional
 
-from PyPDF2 import PdfReader
+from extraction.document_context import DocumentContext
 
 AMOUNT_RE = re.compile(r"(?<!\d)(?:\$?\s?\d{1,3}(?:,\d{3})*(?:\.\d{2})|\$?\s?\d+\.\d{2})(?!\d)")
 
@@ -9,6 +9,10 @@ TOTAL_KEYWORDS = ("total", "amount due", "balance due", "invoice total")
 SUBTOTAL_KEYWORDS = ("subtotal",)
 TAX_KEYWORDS = ("tax", "hst", "gst", "vat")
 
+# Bump whenever a check or its thresholds change: stored analyses are only
+# reused when they were produced by the same rules version.
+RULES_VERSION = "1"
+
 
 def _parse_amount(raw: str) -> Optional[float]:
     cleaned = raw.replace("$", "").replace(",", "").strip()
@@ -18,40 +22,9 @@ def _parse_amount(raw: str) -> Optional[float]:
         return None
 
 
-def _extract_text_and_fonts(pdf_path: str) -> Tuple[str, list[str]]:
-    reader = PdfReader(pdf_path)
-    text_parts = []
-    fonts = set()
-
-    for page in reader.pages:
-        try:
-            text_parts.append(page.extract_text() or "")
-        except Exception:
-            text_parts.append("")
-
-        resources = page.get("/Resources")
-        try:
-            resources_obj = resources.get_object() if resources else None
-        except Exception:
-            resources_obj = resources
-
-        if resources_obj and "/Font" in resources_obj:
-            font_dict = resources_obj["/Font"]
-            try:
-                font_keys = font_dict.keys()
-            except Exception:
-                try:
-                    font_keys = font_dict.get_object().keys()
-                except Exception:
-                    font_keys = []
-            for key in font_keys:
-                fonts.add(str(key))
-
-    return "\n".join(text_parts).strip(), sorted(fonts)
-
-
-def run_rules_checks(pdf_path: str) -> dict:
-    text, fonts = _extract_text_and_fonts(pdf_path)
+def run_rules_checks(pdf_path: str, doc: DocumentContext | None = None) -> dict:
+    doc = doc or DocumentContext(pdf_path)
+    text, fonts = doc.text, doc.fonts
     words = [word for word in text.split() if word.strip()]
     word_count = len(words)
 
@@ -0,0 +1,103 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import JSON
+
+from conn_db import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _backfill_analysis_columns(conn) -> None:
+    """
+    Copies the hot fields out of the JSON documents of analyses stored
+    before they became columns, and marks each invoice's newest analysis.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    conn.execute(text("""
+        UPDATE analysis_results SET
+            risk_level = ai_json->>'risk_level',
+            review_required = (ai_json->>'review_required')::boolean,
+            anomaly_score = (ai_json->>'anomaly_score')::float,
+            signer_identity = crypto_json->>'signer_identity',
+            rules_status = rules_json->>'status',
+            subtotal_matches_items = (rules_json->'checks'->>'subtotal_matches_items')::boolean,
+            total_matches_subtotal_tax = (rules_json->'checks'->>'total_matches_subtotal_tax')::boolean
+    """))
+    conn.execute(text("""
+        UPDATE analysis_results a SET vendor_id = v.vendor_id
+        FROM vendors v
+        WHERE v.public_key_fingerprint = a.crypto_json->>'signer_fingerprint'
+    """))
+    conn.execute(text("""
+        UPDATE analysis_results SET is_latest = id IN (
+            SELECT max(id) FROM analysis_results GROUP BY invoice_id
+        )
+    """))
+
+
+# Run once, in the same transaction that adds the (table, column) key
+BACKFILLS = {
+    ("analysis_results", "is_latest"): _backfill_analysis_columns
+}
+
+
+def _add_missing_columns(engine) -> list[tuple[str, str]]:
+    """
+    create_all skips tables that already exist, so nullable columns added
+    to a model later are added here with a plain ALTER TABLE.
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+                ))
+                added.append((table.name, column.name))
+
+        for key in added:
+            if key in BACKFILLS:
+                logger.info("Backfilling %s.%s", *key)
+                BACKFILLS[key](conn)
+    return added
+
+
+def _convert_json_to_jsonb(engine) -> None:
+    if engine.dialect.name != "postgresql":
+        return
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            current = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                wanted = column.type.dialect_impl(engine.dialect)
+                found = current.get(column.name)
+                if isinstance(wanted, JSONB) and isinstance(found, JSON) and not isinstance(found, JSONB):
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} ALTER COLUMN "{column.name}" '
+                        f'TYPE jsonb USING "{column.name}"::jsonb'
+                    ))
+
+
+def upgrade_schema(engine) -> None:
+    """
+    Brings an existing database up to the models: new tables, new
+    nullable columns (with their backfills), JSON -> JSONB, new indexes.
+    Every step is a no-op once applied.
+    """
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _convert_json_to_jsonb(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
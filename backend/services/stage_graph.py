@@ -0,0 +1,129 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from utils.metrics import observe_stage
+
+# Shared executor for blocking stages. Every stage either releases the
+# GIL (torch, subprocess-based OCR/rendering) or shares in-process state
+# (the parsed document, loaded models), so threads rather than processes.
+STAGE_THREADS = int(os.getenv("STAGE_THREADS", str(min(8, (os.cpu_count() or 2) * 2))))
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=STAGE_THREADS,
+            thread_name_prefix="stage"
+        )
+    return _thread_pool
+
+
+@dataclass
+class Stage:
+    """
+    One node of a stage graph.
+
+    `fn` receives a dict of its dependencies' values keyed by stage name.
+    `soft_deps` are awaited too, but one that did not complete passes
+    None instead of skipping this stage. `executor` is one of "async"
+    (fn is a coroutine function), "inline" (sync, runs on the event loop -
+    only for cheap work) or "thread".
+    """
+    name: str
+    fn: Callable[[dict], Any]
+    deps: tuple = ()
+    soft_deps: tuple = ()
+    executor: str = "thread"
+    timeout: Optional[float] = None
+
+
+@dataclass
+class StageResult:
+    status: str  # "ok" | "error" | "timeout" | "skipped"
+    value: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+async def _invoke(stage: Stage, inputs: dict):
+    if stage.executor == "async":
+        return await stage.fn(inputs)
+    if stage.executor == "inline":
+        return stage.fn(inputs)
+
+    loop = asyncio.get_running_loop()
+    call = functools.partial(stage.fn, inputs)
+    # run_in_executor does not carry context variables into the worker
+    # thread; copy them so timers inside the stage reach the request
+    return await loop.run_in_executor(get_thread_pool(), contextvars.copy_context().run, call)
+
+
+async def run_stage_graph(stages: list[Stage]) -> dict[str, StageResult]:
+    """
+    Runs every stage as soon as its dependencies have finished, so
+    independent stages overlap and wall time tracks the slowest path
+    rather than the sum.
+
+    Failures and timeouts never abort the graph: the stage is recorded as
+    "error"/"timeout" and stages depending on it are "skipped", leaving
+    the caller with partial results.
+    """
+    declared = set()
+    for stage in stages:
+        missing = [dep for dep in stage.deps + stage.soft_deps if dep not in declared]
+        if missing:
+            raise ValueError(
+                f"Stage {stage.name!r} depends on {missing}, which must be declared before it"
+            )
+        declared.add(stage.name)
+
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run(stage: Stage) -> StageResult:
+        dep_results = [await tasks[dep] for dep in stage.deps]
+        if not all(result.ok for result in dep_results):
+            return StageResult(status="skipped", error="dependency did not complete")
+
+        inputs = {dep: result.value for dep, result in zip(stage.deps, dep_results)}
+        for dep in stage.soft_deps:
+            result = await tasks[dep]
+            inputs[dep] = result.value if result.ok else None
+        started = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(_invoke(stage, inputs), stage.timeout)
+            status, error = "ok", None
+        except asyncio.TimeoutError:
+            value, status = None, "timeout"
+            error = f"{stage.name} exceeded {stage.timeout}s"
+        except Exception as exc:
+            value, status, error = None, "error", str(exc)
+
+        elapsed = time.perf_counter() - started
+        observe_stage(stage.name, elapsed, status)
+        return StageResult(
+            status=status,
+            value=value,
+            error=error,
+            elapsed=elapsed
+        )
+
+    # Declaration order is topological, so every dependency's task exists
+    # before the stages that await it.
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+
+    await asyncio.gather(*tasks.values())
+    return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,149 @@
+import os
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.analysis_result import AnalysisResult
+from services.model_registry import AI_PIPELINE_DIR
+
+if str(AI_PIPELINE_DIR) not in sys.path:
+    sys.path.append(str(AI_PIPELINE_DIR))
+
+# Same definition the AI cascade escalates on
+from advanced.cascade import rules_failed
+
+
+def _csv(value: str) -> frozenset:
+    return frozenset(item.strip() for item in value.split(",") if item.strip())
+
+
+# Per-invoice stage policy. Off: every stage always runs.
+STAGE_POLICY_ENABLED = os.getenv("STAGE_POLICY", "0") == "1"
+# Trust models (verify_vendor_identity's signer_trust_model) whose
+# verified signature from a registered vendor skips the AI stage, or
+# defers it to the analysis job queue.
+SKIP_AI_TRUST = _csv(os.getenv("STAGE_POLICY_SKIP_AI_TRUST", "ca_signed"))
+DEFER_AI_TRUST = _csv(os.getenv("STAGE_POLICY_DEFER_AI_TRUST", "self_signed"))
+
+# Bump whenever a decision rule changes; stored with every decision.
+POLICY_VERSION = "1"
+
+RUN, SKIP, DEFER = "run", "skip", "defer"
+
+
+async def flagged_before(db: AsyncSession, file_hash: str | None) -> bool:
+    """
+    Whether any earlier analysis of these exact bytes asked for review.
+    """
+    if not file_hash:
+        return False
+    result = await db.execute(
+        select(AnalysisResult.id)
+        .where(
+            AnalysisResult.file_hash == file_hash,
+            AnalysisResult.review_required.is_(True)
+        )
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+def _ai_decision(crypto: dict | None, rules: dict | None, flagged: bool) -> tuple[str, str]:
+    if crypto is None:
+        return RUN, "integrity_unavailable"
+    if crypto.get("signature_integrity") == "error":
+        # Signature validation crashed: nothing is known about the document
+        return RUN, "integrity_error"
+    if rules is None:
+        return RUN, "rules_unavailable"
+    if rules_failed(rules):
+        return RUN, "rules_failed"
+    if flagged:
+        return RUN, "flagged_before"
+    if crypto.get("signature_integrity") != "valid" or crypto.get("signer_identity") != "verified":
+        return RUN, "unverified_signer"
+    # A valid signature only vouches for the revision it signed; content
+    # appended by a later incremental update is unsigned
+    if crypto.get("signature_coverage") != "entire_file":
+        return RUN, "modified_after_signing"
+
+    trust = crypto.get("signer_trust_model")
+    if trust in SKIP_AI_TRUST:
+        return SKIP, f"verified_signer:{trust}"
+    if trust in DEFER_AI_TRUST:
+        return DEFER, f"verified_signer:{trust}"
+    return RUN, f"untrusted_model:{trust}"
+
+
+def decide_stages(
+    crypto: dict | None,
+    rules: dict | None,
+    flagged: bool,
+    allow_defer: bool = True
+) -> dict:
+    """
+    Run / skip / defer per policed stage, with the inputs behind it, in
+    the form stored on AnalysisResult.stage_decisions. `crypto` is the
+    vendor stage result and `rules` the rules stage result (None when
+    they did not complete, which always means run). Without
+    `allow_defer` (queued or batch work) a deferral runs right away.
+    """
+    action, reason = _ai_decision(crypto, rules, flagged)
+    if action == DEFER and not allow_defer:
+        action, reason = RUN, f"{reason}:deferred_work"
+
+    crypto = crypto or {}
+    return {
+        "version": POLICY_VERSION,
+        "stages": {
+            "ai": {"action": action, "reason": reason}
+        },
+        "inputs": {
+            "signature_integrity": crypto.get("signature_integrity"),
+            "signer_identity": crypto.get("signer_identity"),
+            "signer_trust_model": crypto.get("signer_trust_model"),
+            "signature_coverage": crypto.get("signature_coverage"),
+            "rules_failed": rules_failed(rules),
+            "flagged_before": flagged
+        }
+    }
+
+
+def policy_failure(error: str | None) -> dict:
+    """
+    Decisions recorded when the policy stage itself did not complete:
+    everything ran.
+    """
+    return {
+        "version": POLICY_VERSION,
+        "stages": {
+            "ai": {"action": RUN, "reason": "policy_unavailable"}
+        },
+        "error": error
+    }
+
+
+def stage_action(decisions: dict | None, stage: str) -> str:
+    if not decisions:
+        return RUN
+    return decisions["stages"].get(stage, {}).get("action", RUN)
+
+
+def deferred_stages(decisions: dict | None) -> list[str]:
+    if not decisions:
+        return []
+    return [stage for stage, decision in decisions["stages"].items() if decision["action"] == DEFER]
+
+
+def policy_outcome(decisions: dict, stage: str) -> dict:
+    """
+    Stage result stored in place of a stage the policy did not run.
+    """
+    decision = decisions["stages"][stage]
+    verb = "skipped" if decision["action"] == SKIP else "deferred"
+    return {
+        "status": verb,
+        "reason": decision["reason"],
+        "message": f"{stage} stage {verb} by stage policy ({decision['reason']})."
+    }
@@ -0,0 +1,191 @@
+import logging
+import os
+import select as select_module
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conn_db import SessionLocal, engine
+from models.vendor import Vendor
+from utils.metrics import timed
+
+# Full reload interval (seconds). Postgres LISTEN/NOTIFY normally applies
+# changes from other workers within milliseconds; the periodic reload
+# covers missed notifications and non-Postgres databases.
+VENDOR_INDEX_TTL = float(os.getenv("VENDOR_INDEX_TTL_SECONDS", "300"))
+VENDOR_CHANNEL = "vendor_changed"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VendorSnapshot:
+    """
+    Detached, immutable copy of a Vendor row; verify_vendor_identity
+    only needs these attributes.
+    """
+    vendor_id: int
+    vendor_name: str
+    public_key_fingerprint: str
+    status: str
+
+    @classmethod
+    def from_row(cls, vendor: Vendor) -> "VendorSnapshot":
+        return cls(
+            vendor_id=vendor.vendor_id,
+            vendor_name=vendor.vendor_name,
+            public_key_fingerprint=vendor.public_key_fingerprint,
+            status=vendor.status
+        )
+
+
+class VendorIndex:
+    """
+    Process-wide fingerprint -> vendor map. Reads are a dict lookup;
+    reloads build a new dict and swap it in, so readers never see a
+    half-loaded index.
+    """
+
+    def __init__(self):
+        self._by_fingerprint: dict[str, VendorSnapshot] | None = None
+        self._lock = threading.Lock()
+        self.loaded_at: float | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._by_fingerprint is not None
+
+    def get(self, fingerprint: str) -> VendorSnapshot | None:
+        return self._by_fingerprint.get(fingerprint)
+
+    def reload(self) -> int:
+        db = SessionLocal()
+        try:
+            vendors = db.query(Vendor).all()
+            index = {
+                vendor.public_key_fingerprint: VendorSnapshot.from_row(vendor)
+                for vendor in vendors
+            }
+        finally:
+            db.close()
+
+        with self._lock:
+            self._by_fingerprint = index
+            self.loaded_at = time.monotonic()
+        return len(index)
+
+    def upsert(self, vendor: Vendor) -> None:
+        if not self.loaded:
+            return
+        with self._lock:
+            index = dict(self._by_fingerprint)
+            index[vendor.public_key_fingerprint] = VendorSnapshot.from_row(vendor)
+            self._by_fingerprint = index
+
+
+vendor_index = VendorIndex()
+
+
+async def lookup_vendor(db: AsyncSession, fingerprint: str | None):
+    """
+    Vendor registered for a signer fingerprint. Served from memory once
+    the index is loaded; before that (startup) it falls back to the DB.
+    """
+    if not fingerprint:
+        return None
+    with timed("vendor_lookup"):
+        if vendor_index.loaded:
+            return vendor_index.get(fingerprint)
+
+        result = await db.execute(
+            select(Vendor).where(Vendor.public_key_fingerprint == fingerprint)
+        )
+        return result.scalars().first()
+
+
+async def notify_vendor_changed(db: AsyncSession, fingerprint: str) -> None:
+    """
+    Tells every worker's index about a vendor change. Sent inside the
+    caller's transaction, so it is delivered only if the change commits.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    await db.execute(
+        text("SELECT pg_notify(:channel, :fingerprint)"),
+        {"channel": VENDOR_CHANNEL, "fingerprint": fingerprint}
+    )
+
+
+def _listen_connection():
+    """
+    Dedicated autocommit connection LISTENing for vendor changes, or None
+    when the database has no LISTEN/NOTIFY.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+
+    # Detached from the pool: it lives as long as the listener and must
+    # never sit inside a transaction
+    raw = engine.raw_connection()
+    raw.detach()
+    conn = raw.driver_connection
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {VENDOR_CHANNEL}")
+    return conn
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _maintain(conn) -> None:
+    while True:
+        try:
+            if conn is None:
+                conn = _listen_connection()
+
+            if conn is None:
+                time.sleep(VENDOR_INDEX_TTL)
+            else:
+                timeout = max(0.0, vendor_index.loaded_at + VENDOR_INDEX_TTL - time.monotonic())
+                ready, _, _ = select_module.select([conn], [], [], timeout)
+                if ready:
+                    # A burst of registrations collapses into one reload
+                    conn.poll()
+                    conn.notifies.clear()
+
+            vendor_index.reload()
+        except Exception:
+            logger.exception("Vendor index refresh failed; retrying")
+            if conn is not None:
+                _close_quietly(conn)
+                conn = None
+            time.sleep(min(VENDOR_INDEX_TTL, 5))
+
+
+def start_vendor_index() -> int:
+    """
+    Loads the index and starts the thread keeping it coherent. LISTEN is
+    issued before the initial load so no change can slip in between.
+    """
+    conn = None
+    try:
+        conn = _listen_connection()
+    except Exception:
+        logger.exception("LISTEN %s failed; falling back to periodic reloads", VENDOR_CHANNEL)
+
+    count = vendor_index.reload()
+    threading.Thread(
+        target=_maintain,
+        args=(conn,),
+        name="vendor-index",
+        daemon=True
+    ).start()
+    return count
@@ -0,0 +1,36 @@
+import os
+
+from .base import InvoiceStore
+from .local import LocalInvoiceStore
+from .s3 import S3_SCHEME, S3InvoiceStore
+
+# "local" (default) or "s3"
+INVOICE_STORE = os.getenv("INVOICE_STORE", "local").lower()
+INVOICE_STORE_ROOT = os.getenv("INVOICE_STORE_ROOT", "invoices")
+
+_store: InvoiceStore | None = None
+
+
+def get_invoice_store() -> InvoiceStore:
+    global _store
+    if _store is None:
+        if INVOICE_STORE == "s3":
+            _store = S3InvoiceStore(
+                bucket=os.environ["INVOICE_S3_BUCKET"],
+                prefix=os.getenv("INVOICE_S3_PREFIX", "invoices"),
+                endpoint_url=os.getenv("INVOICE_S3_ENDPOINT_URL"),
+                cache_dir=os.getenv("INVOICE_CACHE_DIR", "invoice_cache")
+            )
+        else:
+            _store = LocalInvoiceStore(INVOICE_STORE_ROOT)
+    return _store
+
+
+def resolve_local_path(location: str) -> str:
+    """
+    Maps an Invoice.file_path to a readable local path. Rows written
+    before content addressing hold plain relative paths and pass through.
+    """
+    if location.startswith(S3_SCHEME):
+        return get_invoice_store().local_path(location)
+    return location
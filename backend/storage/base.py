@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+
+
+class InvoiceStore(ABC):
+    """
+    Write-once, content-addressed storage for invoice files.
+
+    Objects are keyed by their SHA-256 and fanned out over two directory
+    levels (ab/cd/abcd...ef.pdf), so no directory grows past a few hundred
+    entries and identical bytes are only ever stored once. `put` returns
+    the location string that is persisted in Invoice.file_path.
+    """
+
+    FANOUT_LEVELS = 2
+    FANOUT_WIDTH = 2
+
+    def key_for(self, file_hash: str, extension: str) -> str:
+        parts = [
+            file_hash[i * self.FANOUT_WIDTH:(i + 1) * self.FANOUT_WIDTH]
+            for i in range(self.FANOUT_LEVELS)
+        ]
+        return "/".join(parts + [f"{file_hash}{extension}"])
+
+    @property
+    @abstractmethod
+    def staging_dir(self) -> str:
+        """Local directory where uploads are streamed before `put`."""
+
+    @abstractmethod
+    def put(self, staged_path: str, file_hash: str, extension: str) -> str:
+        """
+        Moves a fully written local file into the store and returns its
+        location. If the object already exists the staged file is dropped.
+        """
+
+    @abstractmethod
+    def exists(self, location: str) -> bool:
+        ...
+
+    @abstractmethod
+    def local_path(self, location: str) -> str:
+        """Returns a local filesystem path with the object's bytes."""
@@ -0,0 +1,58 @@
+import os
+
+from storage.base import InvoiceStore
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LocalInvoiceStore(InvoiceStore):
+    def __init__(self, root: str):
+        self.root = root
+        self._staging_dir = os.path.join(root, ".staging")
+        os.makedirs(self._staging_dir, exist_ok=True)
+
+    @property
+    def staging_dir(self) -> str:
+        return self._staging_dir
+
+    def put(self, staged_path: str, file_hash: str, extension: str) -> str:
+        dest = os.path.join(self.root, *self.key_for(file_hash, extension).split("/"))
+
+        if os.path.exists(dest):
+            os.unlink(staged_path)
+            return dest
+
+        # Data must be durable before the name becomes visible
+        with open(staged_path, "rb") as f:
+            os.fsync(f.fileno())
+
+        dest_dir = os.path.dirname(dest)
+        os.makedirs(dest_dir, exist_ok=True)
+
+        try:
+            # link() never clobbers, so a concurrent writer of the same
+            # hash cannot replace an object that is already visible.
+            os.link(staged_path, dest)
+            os.unlink(staged_path)
+        except FileExistsError:
+            os.unlink(staged_path)
+        except (AttributeError, NotImplementedError, PermissionError):
+            os.replace(staged_path, dest)
+
+        _fsync_dir(dest_dir)
+        return dest
+
+    def exists(self, location: str) -> bool:
+        return os.path.exists(location)
+
+    def local_path(self, location: str) -> str:
+        return location
@@ -0,0 +1,76 @@
+import os
+
+from storage.base import InvoiceStore
+
+S3_SCHEME = "s3://"
+
+
+class S3InvoiceStore(InvoiceStore):
+    """
+    S3-compatible object store (AWS S3, MinIO, Ceph RGW, ...).
+
+    Objects are read through a local cache directory because the
+    extraction and AI stages need a filesystem path. Requires boto3.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None, cache_dir: str = "invoice_cache"):
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError("INVOICE_STORE=s3 requires boto3 (pip install boto3)") from exc
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.cache_dir = cache_dir
+        self._staging_dir = os.path.join(cache_dir, ".staging")
+        os.makedirs(self._staging_dir, exist_ok=True)
+
+    @property
+    def staging_dir(self) -> str:
+        return self._staging_dir
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _split(self, location: str) -> tuple[str, str]:
+        bucket, _, object_key = location[len(S3_SCHEME):].partition("/")
+        return bucket, object_key
+
+    def _cache_path(self, object_key: str) -> str:
+        return os.path.join(self.cache_dir, *object_key.split("/"))
+
+    def put(self, staged_path: str, file_hash: str, extension: str) -> str:
+        object_key = self._object_key(self.key_for(file_hash, extension))
+        location = f"{S3_SCHEME}{self.bucket}/{object_key}"
+
+        if not self.exists(location):
+            self.client.upload_file(staged_path, self.bucket, object_key)
+
+        # Keep the bytes we already have as the local read cache
+        cache_path = self._cache_path(object_key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        os.replace(staged_path, cache_path)
+        return location
+
+    def exists(self, location: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        bucket, object_key = self._split(location)
+        try:
+            self.client.head_object(Bucket=bucket, Key=object_key)
+            return True
+        except ClientError:
+            return False
+
+    def local_path(self, location: str) -> str:
+        bucket, object_key = self._split(location)
+        cache_path = self._cache_path(object_key)
+        if os.path.exists(cache_path):
+            return cache_path
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.part"
+        self.client.download_file(bucket, object_key, temp_path)
+        os.replace(temp_path, cache_path)
+        return cache_path
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# conn_db builds its engines at import time; tests never connect to them
+for key, value in (
+    ("DB_USER", "test"),
+    ("DB_PASSWORD", "test"),
+    ("DB_HOST", "localhost"),
+    ("DB_PORT", "5432"),
+    ("DB_NAME", "test")
+):
+    os.environ.setdefault(key, value)
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+
+# Claim backend's utils before services append ai_pipeline (which has its
+# own utils package) to sys.path, as importing main does in the app
+import utils.hashing  # noqa: E402,F401
+
+
+@pytest.fixture
+def run_with_db():
+    """
+    Runs `fn(db)` against a fresh in-memory SQLite schema and returns its
+    result.
+    """
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    import models  # noqa: F401 - registers every table on Base.metadata
+    from conn_db import Base
+
+    def run(fn):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            try:
+                async with session() as db:
+                    return await fn(db)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    An async_sessionmaker on a fresh SQLite file. Connections are not
+    pooled, so sessions can be opened from any event loop (TestClient and
+    asyncio.run each bring their own).
+    """
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    import models  # noqa: F401 - registers every table on Base.metadata
+    from conn_db import Base
+
+    path = tmp_path / "test.db"
+    schema_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(schema_engine)
+    schema_engine.dispose()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
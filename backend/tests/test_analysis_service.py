@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from services import analysis_service
+from services.analysis_service import embedding_mismatch
+
+
+def snapshot(**stats):
+    return SimpleNamespace(stats=stats, model_version="detector@1")
+
+
+def test_detector_trained_on_current_embeddings_scores():
+    assert embedding_mismatch(snapshot(embedding_model_id=analysis_service.embedding_model_id())) is None
+
+
+def test_detector_trained_on_other_embeddings_is_refused():
+    assert "retrain" in embedding_mismatch(snapshot(embedding_model_id="other:r1")).lower()
+
+
+def test_detector_without_embedding_id_is_refused(monkeypatch):
+    monkeypatch.setattr(analysis_service.registry, "get", lambda: snapshot())
+    monkeypatch.setattr(
+        analysis_service, "check_tools", lambda: {"tesseract": "tesseract", "pdftoppm": "pdftoppm"}
+    )
+    result = analysis_service.run_ai_analysis("invoice.pdf")
+    assert result["status"] == "error"
+    assert "does not record" in result["message"]
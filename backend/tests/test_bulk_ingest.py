@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from models.invoice import Invoice
+from services import bulk_ingest
+from services.bulk_ingest import ingest_bulk, stage_bulk_files
+from storage.local import LocalInvoiceStore
+
+UNSIGNED = {
+    "signature_present": False,
+    "signature_integrity": "not_signed",
+    "certificate_trust": "none",
+    "signer_fingerprint": None
+}
+
+
+def upload(name, data):
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalInvoiceStore(str(tmp_path))
+
+
+@pytest.fixture
+def ingest(store, session_factory, monkeypatch):
+    """Runs ingest_bulk on SQLite with integrity checks stubbed out."""
+    def store_only(store, item):
+        return store.put(item.staged.temp_path, item.staged.file_hash, item.extension), dict(UNSIGNED)
+
+    monkeypatch.setattr(bulk_ingest, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(bulk_ingest, "_store_and_check", store_only)
+
+    def run(files):
+        async def main():
+            items = await stage_bulk_files(files, store)
+            return [json.loads(line) async for line in ingest_bulk(items, store)]
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_parts_and_archive_members_are_staged(store):
+    files = [
+        upload("a.pdf", b"%PDF a"),
+        upload("notes.txt", b"text"),
+        upload("empty.pdf", b""),
+        upload("batch.zip", archive({"b.pdf": b"%PDF b", "scans/c.png": b"png", "readme.md": b"#"}))
+    ]
+    items = asyncio.run(stage_bulk_files(files, store))
+
+    outcome = {item.name: item.error or item.file_category for item in items}
+    assert outcome == {
+        "a.pdf": "pdf",
+        "notes.txt": "Unsupported file type",
+        "empty.pdf": "Empty file",
+        "b.pdf": "pdf",
+        "scans/c.png": "image",
+        "readme.md": "Unsupported file type"
+    }
+    staged = {item.name: item.staged.file_hash for item in items if item.staged}
+    assert staged["b.pdf"] == hashlib.sha256(b"%PDF b").hexdigest()
+
+
+def test_invalid_archive_is_reported(store):
+    items = asyncio.run(stage_bulk_files([upload("broken.zip", b"not a zip")], store))
+    assert [(item.name, item.error) for item in items] == [("broken.zip", "Invalid ZIP archive")]
+
+
+def test_every_file_gets_one_line_and_duplicates_are_not_stored(ingest, session_factory):
+    async def add_old():
+        async with session_factory() as db:
+            db.add(Invoice(file_path="old.pdf", file_hash=hashlib.sha256(b"%PDF old").hexdigest()))
+            await db.commit()
+
+    asyncio.run(add_old())
+
+    lines = ingest([
+        upload("a.pdf", b"%PDF a"),
+        upload("copy-of-a.pdf", b"%PDF a"),
+        upload("old.pdf", b"%PDF old"),
+        upload("batch.zip", archive({"b.pdf": b"%PDF b", "notes.txt": b"text"}))
+    ])
+
+    summary = lines.pop()["summary"]
+    assert summary == {"stored": 2, "duplicate": 2, "error": 1}
+    status = {line["file"]: line["status"] for line in lines}
+    assert status == {
+        "a.pdf": "stored",
+        "copy-of-a.pdf": "duplicate",
+        "old.pdf": "duplicate",
+        "b.pdf": "stored",
+        "notes.txt": "error"
+    }
+    by_file = {line["file"]: line for line in lines}
+    assert by_file["copy-of-a.pdf"]["duplicate_of"] == "a.pdf"
+
+    async def count():
+        async with session_factory() as db:
+            return await db.scalar(select(func.count()).select_from(Invoice))
+
+    assert asyncio.run(count()) == 3
+
+
+def test_failed_files_are_reported_and_cleaned_up(ingest, store, monkeypatch):
+    def broken(store, item):
+        raise RuntimeError("integrity check crashed")
+
+    monkeypatch.setattr(bulk_ingest, "_store_and_check", broken)
+    lines = ingest([upload("a.pdf", b"%PDF a")])
+
+    assert lines[0] == {"file": "a.pdf", "status": "error", "message": "integrity check crashed"}
+    assert lines[1]["summary"]["error"] == 1
+    assert os.listdir(store.staging_dir) == []
@@ -0,0 +1,73 @@
+import pytest
+
+# ai_pipeline is importable once analysis_service has put it on sys.path
+import services.analysis_service  # noqa: F401
+from advanced.cascade import (
+    escalation_reason,
+    first_tier_risk,
+    rules_failed,
+    score_first_tier,
+    train_first_tier
+)
+
+RULES_OK = {
+    "status": "ok",
+    "checks": {"subtotal_matches_items": True, "total_matches_subtotal_tax": True}
+}
+
+
+def reason(score, words=100, rules=RULES_OK):
+    return escalation_reason(score, words, rules, margin=0.05, min_words=20)
+
+
+@pytest.mark.parametrize("score", [0.0, 0.34, 0.46, 0.55, 0.64, 0.76, 0.9])
+def test_confident_score_stands(score):
+    assert reason(score) is None
+
+
+@pytest.mark.parametrize("score", [0.36, 0.4, 0.44, 0.66, 0.7, 0.74])
+def test_score_near_a_risk_threshold_escalates(score):
+    assert reason(score) == "uncertain_score"
+
+
+def test_sparse_text_layer_escalates_first():
+    assert reason(0.1, words=19) == "sparse_text_layer"
+    assert reason(0.1, words=19, rules=None) == "sparse_text_layer"
+    assert reason(0.1, words=20) is None
+
+
+@pytest.mark.parametrize("rules", [
+    None,
+    {"status": "error", "message": "boom"},
+    {**RULES_OK, "status": "insufficient_amounts"},
+    {"status": "ok", "checks": {"subtotal_matches_items": False, "total_matches_subtotal_tax": True}},
+    {"status": "ok", "checks": {"subtotal_matches_items": True, "total_matches_subtotal_tax": None}},
+    {"status": "ok", "checks": {}},
+])
+def test_rules_not_passing_escalate(rules):
+    assert rules_failed(rules)
+    assert reason(0.1, rules=rules) == "rules_failed"
+
+
+def test_passing_rules_ignore_deltas():
+    rules = {"status": "ok", "checks": {**RULES_OK["checks"], "subtotal_delta": 0.0, "total_delta": 0.0}}
+    assert not rules_failed(rules)
+
+
+def test_structural_deviation_overrides_a_low_first_tier_score():
+    assert first_tier_risk({"score": 0.1, "distance_z": 0.0}) == ("LOW", False)
+    assert first_tier_risk({"score": 0.1, "distance_z": 2.5}) == ("HIGH", True)
+
+
+def test_first_tier_distance_is_measured_against_the_references():
+    texts = [
+        f"Invoice {n} Acme Ltd consulting services subtotal {100 + n}.00 tax {10 + n}.00 total {110 + 2 * n}.00"
+        for n in range(12)
+    ]
+    detector, stats = train_first_tier(texts)
+
+    typical = score_first_tier(detector, stats, texts[3])
+    odd = score_first_tier(detector, stats, "x " * 500 + "9" * 400)
+    assert typical["distance_z"] < 2.5
+    assert odd["distance_z"] >= 2.5
+    assert first_tier_risk(odd)[0] == "HIGH"
@@ -0,0 +1,76 @@
+import pytest
+
+from models.analysis_result import AnalysisResult
+from models.invoice import Invoice
+from services import invoice_analysis
+from services.invoice_analysis import find_reusable_analysis
+from services.rules_service import RULES_VERSION
+
+MODEL_VERSION = "detector@1/test"
+
+
+@pytest.fixture(autouse=True)
+def loaded_model(monkeypatch):
+    monkeypatch.setattr(invoice_analysis, "current_model_version", lambda: MODEL_VERSION)
+
+
+def result(invoice, **overrides):
+    fields = {
+        "invoice_id": invoice.invoice_id,
+        "file_hash": invoice.file_hash,
+        "model_version": MODEL_VERSION,
+        "rules_version": RULES_VERSION,
+        "rules_status": "ok",
+        "prediction": 0,
+        "confidence": 0.9,
+        "crypto_json": {},
+        "ai_json": {},
+        "rules_json": {}
+    }
+    fields.update(overrides)
+    return AnalysisResult(**fields)
+
+
+def find(run_with_db, *overrides):
+    """
+    Stores one analysis per entry of `overrides` and returns the index of
+    the one find_reusable_analysis picks (None when it picks none).
+    """
+    async def scenario(db):
+        invoice = Invoice(file_path="invoice.pdf", file_hash="a" * 64)
+        db.add(invoice)
+        await db.flush()
+        rows = [result(invoice, **fields) for fields in overrides]
+        db.add_all(rows)
+        await db.commit()
+
+        reusable = await find_reusable_analysis(db, invoice)
+        return None if reusable is None else [row.id for row in rows].index(reusable.id)
+
+    return run_with_db(scenario)
+
+
+def test_latest_matching_result_is_reused(run_with_db):
+    assert find(run_with_db, {}, {}) == 1
+
+
+@pytest.mark.parametrize("overrides", [
+    {"model_version": "detector@0/test"},
+    {"rules_version": "0"},
+    {"file_hash": "b" * 64},
+    {"rules_status": "error"},
+    {"rules_status": "timeout"},
+    {"rules_status": "skipped"},
+    {"rules_status": None},
+])
+def test_mismatched_or_failed_results_are_not_reused(run_with_db, overrides):
+    assert find(run_with_db, overrides) is None
+
+
+def test_failed_rerun_does_not_hide_an_older_good_result(run_with_db):
+    assert find(run_with_db, {}, {"rules_status": "error"}) == 0
+
+
+def test_nothing_is_reused_without_a_model(run_with_db, monkeypatch):
+    monkeypatch.setattr(invoice_analysis, "current_model_version", lambda: None)
+    assert find(run_with_db, {}) is None
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from dependencies import get_async_db
+from models.invoice import Invoice
+from routers import invoice
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def client(session_factory):
+    invoices = [
+        Invoice(
+            file_path=f"{n}.pdf",
+            file_hash=f"{n:064x}",
+            is_signed=n % 2 == 0,
+            status="analyzed" if n % 3 == 0 else "uploaded",
+            created_at=START + timedelta(days=n)
+        )
+        for n in range(1, 8)
+    ]
+
+    async def add_invoices():
+        async with session_factory() as db:
+            db.add_all(invoices)
+            await db.commit()
+
+    async def get_test_db():
+        async with session_factory() as db:
+            yield db
+
+    asyncio.run(add_invoices())
+    app = FastAPI()
+    app.include_router(invoice.router)
+    app.dependency_overrides[get_async_db] = get_test_db
+    return TestClient(app)
+
+
+def pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/invoices/", params=query)
+        assert response.status_code == 200
+        ids.append([row["invoice_id"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+def test_cursor_walks_every_invoice_newest_first(client):
+    assert pages(client, limit=3) == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_last_full_page_has_no_cursor(client):
+    response = client.get("/invoices/", params={"limit": 7})
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_filters_apply_across_pages(client):
+    assert pages(client, limit=2, is_signed=True) == [[6, 4], [2]]
+    assert pages(client, status="analyzed") == [[6, 3]]
+    created = {"created_from": (START + timedelta(days=2)).isoformat(), "created_to": (START + timedelta(days=4)).isoformat()}
+    assert pages(client, **created) == [[3, 2]]
+
+
+def test_fields_select_a_subset(client):
+    rows = client.get("/invoices/", params={"limit": 1, "fields": "status,file_hash"}).json()
+    assert rows == [{"status": "uploaded", "file_hash": f"{7:064x}"}]
+
+    response = client.get("/invoices/", params={"fields": "file_path"})
+    assert response.status_code == 400
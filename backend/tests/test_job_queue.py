@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models.analysis_job import AnalysisJob
+from models.invoice import Invoice
+from services.job_queue import MAX_ATTEMPTS, STALE_AFTER, claim_next_job
+
+STALE = timedelta(seconds=STALE_AFTER + 60)
+
+
+async def add_jobs(db, *jobs):
+    invoice = Invoice(file_path="invoice.pdf", file_hash="a" * 64)
+    db.add(invoice)
+    await db.flush()
+    rows = [AnalysisJob(invoice_id=invoice.invoice_id, **fields) for fields in jobs]
+    db.add_all(rows)
+    await db.commit()
+    return [row.id for row in rows]
+
+
+async def statuses(db):
+    jobs = (await db.execute(select(AnalysisJob).order_by(AnalysisJob.id))).scalars()
+    return [(job.status, job.attempts) for job in jobs]
+
+
+def test_oldest_queued_job_is_claimed_once(run_with_db):
+    async def scenario(db):
+        first, _ = await add_jobs(db, {"status": "queued"}, {"status": "queued"})
+        job = await claim_next_job(db)
+        assert job.id == first
+        assert job.status == "running"
+        assert job.attempts == 1
+        assert job.started_at is not None
+
+        await claim_next_job(db)
+        assert await claim_next_job(db) is None
+        return await statuses(db)
+
+    assert run_with_db(scenario) == [("running", 1), ("running", 1)]
+
+
+def test_stale_running_job_is_retried(run_with_db):
+    async def scenario(db):
+        stale, _ = await add_jobs(
+            db,
+            {"status": "running", "attempts": 1, "started_at": datetime.utcnow() - STALE},
+            {"status": "running", "attempts": 1, "started_at": datetime.utcnow()}
+        )
+        job = await claim_next_job(db)
+        assert job.id == stale
+        assert await claim_next_job(db) is None
+        return await statuses(db)
+
+    assert run_with_db(scenario) == [("running", 2), ("running", 1)]
+
+
+def test_exhausted_stale_job_is_failed(run_with_db):
+    async def scenario(db):
+        await add_jobs(
+            db,
+            {"status": "running", "attempts": MAX_ATTEMPTS, "started_at": datetime.utcnow() - STALE},
+            {"status": "running", "attempts": MAX_ATTEMPTS, "started_at": datetime.utcnow()},
+            {"status": "done", "attempts": MAX_ATTEMPTS}
+        )
+        assert await claim_next_job(db) is None
+        jobs = (await db.execute(select(AnalysisJob).order_by(AnalysisJob.id))).scalars().all()
+        assert jobs[0].error
+        assert jobs[0].finished_at is not None
+        return [job.status for job in jobs]
+
+    assert run_with_db(scenario) == ["failed", "running", "done"]
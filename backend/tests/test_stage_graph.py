@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from services.stage_graph import Stage, run_stage_graph
+
+
+def run(stages):
+    return asyncio.run(run_stage_graph(stages))
+
+
+def fail(_):
+    raise RuntimeError("boom")
+
+
+def test_dependencies_receive_values():
+    results = run([
+        Stage("a", lambda _: 1, executor="inline"),
+        Stage("b", lambda inputs: inputs["a"] + 1, deps=("a",), executor="inline")
+    ])
+    assert results["b"].ok
+    assert results["b"].value == 2
+
+
+def test_failed_dependency_skips_dependents():
+    results = run([
+        Stage("a", fail, executor="inline"),
+        Stage("b", lambda _: 1, deps=("a",), executor="inline"),
+        Stage("c", lambda _: 1, deps=("b",), executor="inline"),
+        Stage("d", lambda _: 1, executor="inline")
+    ])
+    assert results["a"].status == "error"
+    assert results["a"].error == "boom"
+    assert results["b"].status == "skipped"
+    assert results["c"].status == "skipped"
+    assert results["d"].ok
+
+
+def test_failed_soft_dependency_passes_none():
+    results = run([
+        Stage("a", fail, executor="inline"),
+        Stage("b", lambda _: 1, executor="inline"),
+        Stage("c", lambda inputs: inputs, soft_deps=("a", "b"), executor="inline")
+    ])
+    assert results["c"].ok
+    assert results["c"].value == {"a": None, "b": 1}
+
+
+def test_timeout_is_recorded_and_skips_dependents():
+    async def slow(_):
+        await asyncio.sleep(1)
+
+    started = time.perf_counter()
+    results = run([
+        Stage("slow", slow, executor="async", timeout=0.05),
+        Stage("after", lambda _: 1, deps=("slow",), executor="inline"),
+        Stage("soft", lambda inputs: inputs["slow"], soft_deps=("slow",), executor="inline")
+    ])
+    assert time.perf_counter() - started < 0.5
+    assert results["slow"].status == "timeout"
+    assert results["after"].status == "skipped"
+    assert results["soft"].ok
+    assert results["soft"].value is None
+
+
+def test_thread_stages_overlap():
+    def sleep(_):
+        time.sleep(0.2)
+
+    started = time.perf_counter()
+    results = run([Stage(name, sleep) for name in ("a", "b", "c")])
+    assert all(result.ok for result in results.values())
+    assert time.perf_counter() - started < 0.5
+
+
+def test_undeclared_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        run([Stage("b", lambda _: 1, deps=("a",), executor="inline")])
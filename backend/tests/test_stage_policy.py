@@ -0,0 +1,75 @@
+import pytest
+
+from services import stage_policy
+from services.stage_policy import DEFER, RUN, SKIP, decide_stages
+
+RULES_OK = {
+    "status": "ok",
+    "checks": {"subtotal_matches_items": True, "total_matches_subtotal_tax": True}
+}
+
+
+def crypto(**overrides):
+    return {
+        "signature_integrity": "valid",
+        "signer_identity": "verified",
+        "signer_trust_model": "ca_signed",
+        "signature_coverage": "entire_file",
+        **overrides
+    }
+
+
+@pytest.fixture(autouse=True)
+def trust_models(monkeypatch):
+    monkeypatch.setattr(stage_policy, "SKIP_AI_TRUST", frozenset({"ca_signed"}))
+    monkeypatch.setattr(stage_policy, "DEFER_AI_TRUST", frozenset({"self_signed"}))
+
+
+def ai(decisions):
+    return decisions["stages"]["ai"]
+
+
+def test_verified_ca_signer_skips_ai():
+    decisions = decide_stages(crypto(), RULES_OK, flagged=False)
+    assert ai(decisions) == {"action": SKIP, "reason": "verified_signer:ca_signed"}
+    assert decisions["version"] == stage_policy.POLICY_VERSION
+    assert decisions["inputs"] == {
+        "signature_integrity": "valid",
+        "signer_identity": "verified",
+        "signer_trust_model": "ca_signed",
+        "signature_coverage": "entire_file",
+        "rules_failed": False,
+        "flagged_before": False
+    }
+
+
+def test_self_signed_defers_only_when_allowed():
+    assert ai(decide_stages(crypto(signer_trust_model="self_signed"), RULES_OK, False))["action"] == DEFER
+
+    decision = ai(decide_stages(crypto(signer_trust_model="self_signed"), RULES_OK, False, allow_defer=False))
+    assert decision == {"action": RUN, "reason": "verified_signer:self_signed:deferred_work"}
+
+
+@pytest.mark.parametrize("signed, rules, flagged, reason", [
+    (None, RULES_OK, False, "integrity_unavailable"),
+    (crypto(signature_integrity="error"), RULES_OK, False, "integrity_error"),
+    (crypto(), None, False, "rules_unavailable"),
+    (crypto(), {**RULES_OK, "status": "insufficient_amounts"}, False, "rules_failed"),
+    (crypto(), {"status": "ok", "checks": {"subtotal_matches_items": True, "total_matches_subtotal_tax": None}}, False, "rules_failed"),
+    (crypto(), {"status": "ok", "checks": {"subtotal_matches_items": False, "total_matches_subtotal_tax": True}}, False, "rules_failed"),
+    (crypto(), RULES_OK, True, "flagged_before"),
+    (crypto(signature_integrity="invalid"), RULES_OK, False, "unverified_signer"),
+    (crypto(signer_identity="unknown_signer"), RULES_OK, False, "unverified_signer"),
+    (crypto(signature_coverage="entire_revision"), RULES_OK, False, "modified_after_signing"),
+    (crypto(signature_coverage=None), RULES_OK, False, "modified_after_signing"),
+    (crypto(signer_trust_model="none"), RULES_OK, False, "untrusted_model:none"),
+])
+def test_ai_runs(signed, rules, flagged, reason):
+    assert ai(decide_stages(signed, rules, flagged)) == {"action": RUN, "reason": reason}
+
+
+def test_policy_failure_runs_everything():
+    decisions = stage_policy.policy_failure("boom")
+    assert stage_policy.stage_action(decisions, "ai") == RUN
+    assert stage_policy.deferred_stages(decisions) == []
+    assert stage_policy.stage_action(None, "ai") == RUN
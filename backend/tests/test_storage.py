@@ -0,0 +1,98 @@
+import os
+import sys
+import types
+
+import pytest
+
+from storage import resolve_local_path
+from storage.local import LocalInvoiceStore
+from storage.s3 import S3InvoiceStore
+
+FILE_HASH = "abcdef" + "0" * 58
+
+
+def stage(store, data=b"%PDF-1.4"):
+    path = os.path.join(store.staging_dir, "upload.pdf")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_keys_fan_out_by_hash(tmp_path):
+    store = LocalInvoiceStore(str(tmp_path))
+    assert store.key_for(FILE_HASH, ".pdf") == f"ab/cd/{FILE_HASH}.pdf"
+
+
+def test_local_put_is_content_addressed_and_write_once(tmp_path):
+    store = LocalInvoiceStore(str(tmp_path))
+    location = store.put(stage(store, b"first"), FILE_HASH, ".pdf")
+    assert location == os.path.join(str(tmp_path), "ab", "cd", f"{FILE_HASH}.pdf")
+    assert store.exists(location)
+    assert store.local_path(location) == location
+
+    # The same hash again keeps the stored object and drops the upload
+    assert store.put(stage(store, b"second"), FILE_HASH, ".pdf") == location
+    assert open(location, "rb").read() == b"first"
+    assert os.listdir(store.staging_dir) == []
+
+
+def test_legacy_paths_resolve_unchanged():
+    assert resolve_local_path("invoices/old.pdf") == "invoices/old.pdf"
+
+
+class ClientError(Exception):
+    pass
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+        self.downloads = 0
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError("404")
+
+    def upload_file(self, path, bucket, key):
+        self.uploads += 1
+        with open(path, "rb") as f:
+            self.objects[(bucket, key)] = f.read()
+
+    def download_file(self, bucket, key, path):
+        self.downloads += 1
+        with open(path, "wb") as f:
+            f.write(self.objects[(bucket, key)])
+
+
+@pytest.fixture
+def s3_store(tmp_path, monkeypatch):
+    client = FakeS3Client()
+    boto3 = types.SimpleNamespace(client=lambda service, endpoint_url=None: client)
+    exceptions = types.SimpleNamespace(ClientError=ClientError)
+    monkeypatch.setitem(sys.modules, "boto3", boto3)
+    monkeypatch.setitem(sys.modules, "botocore", types.SimpleNamespace(exceptions=exceptions))
+    monkeypatch.setitem(sys.modules, "botocore.exceptions", exceptions)
+    return S3InvoiceStore("bucket", prefix="/invoices/", cache_dir=str(tmp_path / "cache"))
+
+
+def test_s3_put_uploads_once_and_keeps_a_local_copy(s3_store):
+    location = s3_store.put(stage(s3_store), FILE_HASH, ".pdf")
+    assert location == f"s3://bucket/invoices/ab/cd/{FILE_HASH}.pdf"
+    assert s3_store.exists(location)
+
+    assert s3_store.put(stage(s3_store), FILE_HASH, ".pdf") == location
+    assert s3_store.client.uploads == 1
+
+    assert open(s3_store.local_path(location), "rb").read() == b"%PDF-1.4"
+    assert s3_store.client.downloads == 0
+
+
+def test_s3_local_path_downloads_missing_objects(s3_store):
+    location = s3_store.put(stage(s3_store, b"stored"), FILE_HASH, ".pdf")
+    os.unlink(s3_store.local_path(location))
+
+    path = s3_store.local_path(location)
+    assert open(path, "rb").read() == b"stored"
+    assert s3_store.client.downloads == 1
+    assert not os.path.exists(f"{path}.part")
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from utils.uploads import UPLOAD_CHUNK_SIZE, UploadTooLarge, stage_upload
+
+DATA = os.urandom(UPLOAD_CHUNK_SIZE * 2 + 123)
+
+
+def upload(data, size=None):
+    return UploadFile(file=io.BytesIO(data), filename="invoice.pdf", size=size)
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.startswith(".upload-")]
+
+
+def test_staged_upload_is_hashed_while_streaming(tmp_path):
+    staged = asyncio.run(stage_upload(upload(DATA), str(tmp_path), suffix=".pdf"))
+    assert staged.file_hash == hashlib.sha256(DATA).hexdigest()
+    assert staged.size == len(DATA)
+    assert staged.temp_path.endswith(".pdf")
+    assert open(staged.temp_path, "rb").read() == DATA
+
+
+def test_declared_size_over_the_cap_is_rejected_before_writing(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(stage_upload(upload(b"x", size=101), str(tmp_path), max_bytes=100))
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_over_the_cap_is_rejected_and_removed(tmp_path):
+    # No declared size, so the cap is enforced while streaming
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(stage_upload(upload(DATA), str(tmp_path), max_bytes=UPLOAD_CHUNK_SIZE + 1))
+    assert leftovers(tmp_path) == []
+
+
+def test_discard_removes_the_temp_file(tmp_path):
+    staged = asyncio.run(stage_upload(upload(b"%PDF-1.4"), str(tmp_path)))
+    staged.discard()
+    staged.discard()
+    assert leftovers(tmp_path) == []
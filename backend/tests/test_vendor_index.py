@@ -0,0 +1,72 @@
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from conn_db import Base
+from models.vendor import Vendor
+from services import vendor_index as vendor_index_module
+from services.vendor_index import VendorIndex, VendorSnapshot, lookup_vendor, notify_vendor_changed
+
+
+def vendor(n):
+    return Vendor(vendor_id=n, vendor_name=f"Vendor {n}", public_key_fingerprint=f"fp{n}", status="active")
+
+
+def test_reload_swaps_in_a_complete_index(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vendors.db'}")
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    with sessions() as db:
+        db.add_all([vendor(1), vendor(2)])
+        db.commit()
+    monkeypatch.setattr(vendor_index_module, "SessionLocal", sessions)
+
+    index = VendorIndex()
+    assert not index.loaded
+    assert index.reload() == 2
+    assert index.loaded
+    assert index.get("fp1") == VendorSnapshot(1, "Vendor 1", "fp1", "active")
+    assert index.get("unknown") is None
+    engine.dispose()
+
+
+def test_upsert_is_copy_on_write():
+    index = VendorIndex()
+    index.upsert(vendor(1))
+    assert not index.loaded  # nothing to update before the first load
+
+    index._by_fingerprint = {}
+    before = index._by_fingerprint
+    index.upsert(vendor(1))
+    assert before == {}
+    assert index.get("fp1").vendor_id == 1
+
+
+def test_lookup_falls_back_to_the_database_until_loaded(monkeypatch, run_with_db):
+    index = VendorIndex()
+    monkeypatch.setattr(vendor_index_module, "vendor_index", index)
+
+    async def scenario(db):
+        db.add(vendor(1))
+        await db.commit()
+        from_db = await lookup_vendor(db, "fp1")
+
+        index._by_fingerprint = {"fp1": VendorSnapshot.from_row(from_db)}
+        await db.execute(delete(Vendor))
+        await db.commit()
+        from_index = await lookup_vendor(db, "fp1")
+
+        return from_db.vendor_id, from_index, await lookup_vendor(db, None)
+
+    vendor_id, from_index, missing = run_with_db(scenario)
+    assert vendor_id == 1
+    assert from_index == VendorSnapshot(1, "Vendor 1", "fp1", "active")
+    assert missing is None
+
+
+def test_notify_is_a_no_op_without_postgres(run_with_db):
+    async def scenario(db):
+        await notify_vendor_changed(db, "fp1")
+        return True
+
+    assert run_with_db(scenario)
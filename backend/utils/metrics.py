@@ -0,0 +1,260 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; covers a ~1 ms cache hit up to a cold LayoutLM pass
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def render_histogram(name: str, labels: str, buckets: dict, count: int, total: float) -> list[str]:
+    """
+    Prometheus text lines for one cumulative histogram series. `labels`
+    is the rendered label set without braces ("" for none).
+    """
+    prefix = f"{labels}," if labels else ""
+    lines = [
+        f'{name}_bucket{{{prefix}le="{bound}"}} {value}'
+        for bound, value in buckets.items()
+    ]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {total}")
+    lines.append(f"{name}_count{suffix} {count}")
+    return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket, labelled histogram. An observation is one lock and a
+    short loop, so it is cheap enough to leave on for every request.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., count, sum]
+                series = self._series[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, values in sorted(series.items()):
+            labels = _format_labels(self.labelnames, key)[1:-1]
+            buckets = dict(zip(self.buckets, values[:len(self.buckets)]))
+            lines += render_histogram(self.name, labels, buckets, values[-2], values[-1])
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "veripay_stage_seconds",
+    "Wall time of one processing stage.",
+    labelnames=("stage",)
+)
+STAGE_TOTAL = Counter(
+    "veripay_stage_total",
+    "Processing stage executions by outcome.",
+    labelnames=("stage", "status")
+)
+HTTP_SECONDS = Histogram(
+    "veripay_http_request_seconds",
+    "HTTP request latency (until response headers).",
+    labelnames=("method", "route", "status")
+)
+DB_SECONDS = Histogram(
+    "veripay_db_statement_seconds",
+    "Database statement execution time.",
+    labelnames=("operation",)
+)
+
+_METRICS = [STAGE_SECONDS, STAGE_TOTAL, HTTP_SECONDS, DB_SECONDS]
+# Callables returning extra exposition lines (e.g. the LayoutLM batcher)
+_collectors = []
+
+# Per-request stage timings feeding the Server-Timing header. The dict is
+# shared by reference with tasks and threads spawned for the request, so
+# every read-modify-write and every read of it holds _timings_lock.
+_request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+def register_collector(collector) -> None:
+    _collectors.append(collector)
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def collect_timings():
+    """
+    Gathers the stage timings of the enclosed block (outside any HTTP
+    request), e.g. for the benchmark harness.
+    """
+    timings: dict = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Times a block into veripay_stage_seconds / veripay_stage_total and,
+    inside a request, into its Server-Timing header.
+    """
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        STAGE_TOTAL.inc(stage=stage, status=status)
+        record_timing(stage, elapsed)
+
+
+def observe_stage(stage: str, seconds: float, status: str) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    STAGE_TOTAL.inc(stage=stage, status=status)
+    record_timing(stage, seconds)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    for collector in _collectors:
+        try:
+            lines += collector()
+        except Exception:
+            # A broken collector must not take /metrics down with it
+            continue
+    return "\n".join(lines) + "\n"
+
+
+def instrument_engine(engine) -> None:
+    """
+    Times every statement of a (sync) SQLAlchemy engine; pass
+    `async_engine.sync_engine` for the async one.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_SECONDS.observe(elapsed, operation=operation)
+        record_timing("db", elapsed)
+
+
+def _server_timing_header(timings: dict, total: float) -> str:
+    with _timings_lock:
+        items = list(timings.items())
+    entries = [
+        f"{stage.replace(' ', '_')};dur={seconds * 1000:.1f}"
+        for stage, seconds in items
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: records request latency and adds a
+    Server-Timing header listing the stages the request went through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                route = scope.get("route")
+                HTTP_SECONDS.observe(
+                    total,
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(message["status"])
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing_header(timings, total).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from utils.metrics import timed
+
+# Hard cap on a single uploaded invoice (bytes).
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StagedUpload:
+    temp_path: str
+    file_hash: str
+    size: int
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+async def stage_upload(
+    file: UploadFile,
+    dest_dir: str,
+    suffix: str = "",
+    max_bytes: int | None = None
+) -> StagedUpload:
+    """
+    Streams an upload to a temp file in `dest_dir` chunk by chunk,
+    hashing as it goes, so the whole file is never held in memory.
+
+    Raises UploadTooLarge as soon as the size limit is crossed; the
+    partial temp file is removed.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge()
+
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=suffix)
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        with timed("upload_hash"), os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                sha256.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return StagedUpload(temp_path=temp_path, file_hash=sha256.hexdigest(), size=size)
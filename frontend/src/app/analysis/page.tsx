@@ -63,6 +63,8 @@ export default function AnalysisPage() {
   const autoRun = searchParams.get("run") === "1";
 
   const [invoices, setInvoices] = useState<InvoiceSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingInvoices, setLoadingInvoices] = useState(false);
   const [selectedId, setSelectedId] = useState<string>(presetId ?? "");
   const [status, setStatus] = useState("");
   const [result, setResult] = useState<AnalysisResult | null>(null);
@@ -70,21 +72,31 @@ export default function AnalysisPage() {
 
   const canAnalyze = useMemo(() => selectedId.trim().length > 0, [selectedId]);
 
-  useEffect(() => {
-    const loadInvoices = async () => {
-      try {
-        const response = await fetch(`${API_BASE}/invoices/`);
-        if (!response.ok) {
-          throw new Error("Unable to load invoices");
-        }
-        const data = (await response.json()) as InvoiceSummary[];
-        setInvoices(data);
-      } catch (_error) {
-        setStatus("Unable to fetch invoices from the API.");
+  // The list is paginated: load the newest page up front and the next one
+  // (X-Next-Cursor) only when asked for
+  const loadInvoices = async (cursor: string | null) => {
+    setLoadingInvoices(true);
+    try {
+      const query = new URLSearchParams();
+      if (cursor) {
+        query.set("cursor", cursor);
       }
-    };
+      const response = await fetch(`${API_BASE}/invoices/?${query}`);
+      if (!response.ok) {
+        throw new Error("Unable to load invoices");
+      }
+      const data = (await response.json()) as InvoiceSummary[];
+      setInvoices((loaded) => (cursor ? [...loaded, ...data] : data));
+      setNextCursor(response.headers.get("X-Next-Cursor"));
+    } catch (_error) {
+      setStatus("Unable to fetch invoices from the API.");
+    } finally {
+      setLoadingInvoices(false);
+    }
+  };
 
-    loadInvoices();
+  useEffect(() => {
+    loadInvoices(null);
   }, []);
 
   useEffect(() => {
@@ -165,6 +177,16 @@ export default function AnalysisPage() {
               </option>
             ))}
           </select>
+          {nextCursor ? (
+            <button
+              className="button outline"
+              type="button"
+              disabled={loadingInvoices}
+              onClick={() => loadInvoices(nextCursor)}
+            >
+              {loadingInvoices ? "Loading..." : "Load older invoices"}
+            </button>
+          ) : null}
         </div>
         <div className="actions">
           <button className="button" type="button" onClick={handleAnalyze}>